@@ -2,6 +2,12 @@
 ASGI config for api project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP goes to Django; WebSocket connections (``/ws/chat/``) go to the chat
+handler in ``myapp.chat``.
+
+Run with ``gunicorn api.asgi:application -k uvicorn_worker.UvicornWorker``
+(see the ``web-asgi`` entry in the Procfile, which also sets ``ASYNC_VIEWS=1``
+and ``DB_POOL=1``).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +19,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Se importa después de inicializar Django (usa modelos y settings)
+from myapp.chat import websocket_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        return await websocket_application(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -64,13 +64,21 @@ INSTALLED_APPS = [
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'myapp.authentication.CustomHeaderAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'myapp.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
+    # Usados por myapp.throttling en LoginAPIView
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': os.environ.get('LOGIN_RATE_IP', '30/min'),
+        'login_account': os.environ.get('LOGIN_RATE_ACCOUNT', '10/hour'),
+    },
 }
 
+# Alias de CACHES para contar intentos de login ('default' = memoria del proceso)
+LOGIN_THROTTLE_CACHE = os.environ.get('LOGIN_THROTTLE_CACHE', 'default')
+
 
 # ============================================================
 # 6. MIDDLEWARE
@@ -82,6 +90,7 @@ MIDDLEWARE = [
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'myapp.db_router.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -89,6 +98,9 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'api.urls'
 
+# Crea las tablas legacy (managed=False) en la base de datos de pruebas
+TEST_RUNNER = 'myapp.test_runner.LegacyTablesTestRunner'
+
 
 # ============================================================
 # 7. TEMPLATES
@@ -120,6 +132,8 @@ WSGI_APPLICATION = 'api.wsgi.application'
 # ============================================================
 # 9. DATABASE CONFIG (FINAL & CORRECTA PARA RENDER)
 # ============================================================
+# PostgreSQL 15 o superior: las ventas diarias usan UNIQUE NULLS NOT DISTINCT
+# (ver myapp.models.VentaDiaria).
 
 DATABASES = {
     'default': dj_database_url.config(
@@ -132,6 +146,47 @@ DATABASES = {
     )
 }
 
+# Réplicas de lectura: DATABASE_REPLICA_URLS="postgres://...,postgres://..."
+# Los GET/HEAD leen de una réplica (myapp.db_router); las escrituras y las
+# lecturas de una sesión que acaba de escribir van al primario.
+DATABASE_REPLICAS = []
+for _i, _url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(','))):
+    _alias = f'replica_{_i}'
+    DATABASES[_alias] = dj_database_url.parse(_url.strip(), conn_max_age=600, ssl_require=not DEBUG)
+    # En pruebas la réplica es la misma base de datos que el primario
+    DATABASES[_alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(_alias)
+
+DATABASE_ROUTERS = ['myapp.db_router.ReplicaRouter']
+
+# Pool de conexiones (opcional, DB_POOL=1): pool nativo de Django 5 sobre
+# psycopg_pool, en lugar de una conexión persistente por worker. El pool es
+# por proceso: con gunicorn sync conviene un max_size chico; rinde más con
+# workers gthread o ASGI. Estadísticas en /api/internal/db-pool/.
+DB_POOL = os.environ.get('DB_POOL', '').lower() in ('1', 'true', 'yes')
+if DB_POOL:
+    for _config in DATABASES.values():
+        # El pool no admite conexiones persistentes de Django
+        _config['CONN_MAX_AGE'] = 0
+        # Cada conexión se valida al salir del pool (ConnectionPool.check_connection)
+        _config['CONN_HEALTH_CHECKS'] = True
+        _config.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+            # Segundos que un request espera una conexión antes de fallar
+            'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),
+            'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', '300')),
+            # Recicla conexiones viejas (failover, balanceadores, memoria del backend)
+            'max_lifetime': float(os.environ.get('DB_POOL_MAX_LIFETIME', '3600')),
+        }
+
+# Segundos que una sesión lee del primario después de escribir (lag de replicación)
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', '5'))
+# Alias de CACHES donde se marca a las sesiones fijadas al primario. Con réplicas
+# tiene que ser compartido entre workers (Redis, Memcached, DatabaseCache): el
+# system check myapp.E001 rechaza el 'default' en memoria del proceso.
+REPLICA_PIN_CACHE = os.environ.get('REPLICA_PIN_CACHE', 'default')
+
 
 # ============================================================
 # 10. PASSWORD VALIDATION
@@ -191,8 +246,13 @@ CORS_ALLOW_HEADERS = [
     'x-csrftoken',
     'x-requested-with',
     'x-user-id',
+    # Checkout (POST /api/pedidos/checkout/): reintentos sin duplicar el pedido
+    'idempotency-key',
 ]
 
+# Headers de respuesta que el frontend puede leer desde JavaScript
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed']
+
 
 # ============================================================
 # 15. CSRF TRUSTED ORIGINS (FINAL)
@@ -205,3 +265,174 @@ CSRF_TRUSTED_ORIGINS = [
     'https://vendigosv.com',
     'https://api.vendigosv.com',
 ]
+
+
+# ============================================================
+# 16. PAGINACIÓN DEL CATÁLOGO
+# ============================================================
+
+PRODUCTOS_PAGE_SIZE = int(os.environ.get('PRODUCTOS_PAGE_SIZE', '50'))
+PRODUCTOS_MAX_PAGE_SIZE = int(os.environ.get('PRODUCTOS_MAX_PAGE_SIZE', '200'))
+# Listado de pedidos (GET /api/pedidos/), del más nuevo al más viejo
+PEDIDOS_PAGE_SIZE = int(os.environ.get('PEDIDOS_PAGE_SIZE', '50'))
+
+
+# ============================================================
+# 17. CACHE DE RESPUESTAS DEL CATÁLOGO
+# ============================================================
+# BACKEND: 'lru' (memoria del proceso), 'django' (usa CACHES[CACHE_ALIAS],
+# recomendado con varios workers y un cache compartido) o 'none'.
+
+RESPONSE_CACHE = {
+    'BACKEND': os.environ.get('RESPONSE_CACHE_BACKEND', 'lru'),
+    'CACHE_ALIAS': os.environ.get('RESPONSE_CACHE_ALIAS', 'default'),
+    'TIMEOUT': int(os.environ.get('RESPONSE_CACHE_TIMEOUT', '60')),
+    'MAXSIZE': int(os.environ.get('RESPONSE_CACHE_MAXSIZE', '1024')),
+}
+
+
+# ============================================================
+# 18. PROCESAMIENTO DE IMÁGENES
+# ============================================================
+# Las fotos subidas se procesan en un pool de hilos (myapp.images).
+# SYNC=True las procesa dentro del request (tests / depuración).
+
+IMAGE_PROCESSING = {
+    'WORKERS': int(os.environ.get('IMAGE_PROCESSING_WORKERS', '2')),
+    'SYNC': os.environ.get('IMAGE_PROCESSING_SYNC', 'False') == 'True',
+    'WIDTHS': (320, 640, 1280),
+    'MAX_WIDTH': int(os.environ.get('IMAGE_MAX_WIDTH', '2048')),
+    'QUALITY': int(os.environ.get('IMAGE_QUALITY', '82')),
+}
+
+
+# ============================================================
+# 19. IMPORTACIÓN MASIVA
+# ============================================================
+
+BULK_IMPORT_BATCH_SIZE = int(os.environ.get('BULK_IMPORT_BATCH_SIZE', '500'))
+
+
+# ============================================================
+# 20. CACHE DE USUARIOS AUTENTICADOS
+# ============================================================
+# TTL del nivel local (por proceso). SHARED_ALIAS activa un segundo nivel en
+# CACHES[alias], que las señales invalidan para todos los workers.
+
+AUTH_USER_CACHE = {
+    'TTL': int(os.environ.get('AUTH_USER_CACHE_TTL', '30')),
+    'MAXSIZE': int(os.environ.get('AUTH_USER_CACHE_MAXSIZE', '10000')),
+    'SHARED_ALIAS': os.environ.get('AUTH_USER_CACHE_SHARED_ALIAS') or None,
+    'SHARED_TTL': int(os.environ.get('AUTH_USER_CACHE_SHARED_TTL', '300')),
+}
+
+
+# ============================================================
+# 21. CHAT
+# ============================================================
+# Broker del pub/sub de mensajes (ver myapp.chat.BaseBroker). El de memoria solo
+# entrega a WebSockets del mismo proceso ASGI.
+
+CHAT_BROKER = os.environ.get('CHAT_BROKER', 'myapp.chat.InProcessBroker')
+MENSAJES_PAGE_SIZE = int(os.environ.get('MENSAJES_PAGE_SIZE', '50'))
+
+
+# ============================================================
+# 22. MODO ASGI (VISTAS ASYNC)
+# ============================================================
+# Con ASYNC_VIEWS los GET de productos, categorías y perfil usan las vistas
+# async de myapp.async_views. Lo activa el proceso `web-asgi` del Procfile
+# (junto con DB_POOL: bajo ASGI cada request puede correr en un hilo distinto y
+# las conexiones persistentes son por hilo); bajo WSGI conviene dejarlo
+# apagado (cada vista async necesitaría su propio event loop).
+
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', '').lower() in ('1', 'true', 'yes')
+
+
+# ============================================================
+# 23. MÉTRICAS POR REQUEST
+# ============================================================
+# REQUEST_METRICS=1 agrega myapp.metricas.MetricasMiddleware: Server-Timing,
+# una línea JSON por request en el logger "myapp.metricas" e histogramas por
+# vista en /api/internal/metricas/. Más de N_MAS_1_UMBRAL consultas en un
+# request se marca como posible N+1 (warning con la sentencia más repetida).
+
+REQUEST_METRICS = {
+    'ENABLED': os.environ.get('REQUEST_METRICS', '').lower() in ('1', 'true', 'yes'),
+    'N_MAS_1_UMBRAL': int(os.environ.get('REQUEST_METRICS_N_MAS_1', '20')),
+    'SERVER_TIMING': os.environ.get('REQUEST_METRICS_SERVER_TIMING', '1').lower() in ('1', 'true', 'yes'),
+    'VENTANA_SEGUNDOS': int(os.environ.get('REQUEST_METRICS_VENTANA_SEGUNDOS', '60')),
+    'VENTANAS': int(os.environ.get('REQUEST_METRICS_VENTANAS', '5')),
+}
+
+if REQUEST_METRICS['ENABLED']:
+    # Primero en la cadena para que el tiempo total incluya a los demás middlewares
+    MIDDLEWARE.insert(0, 'myapp.metricas.MetricasMiddleware')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {'mensaje': {'format': '%(message)s'}},
+    'handlers': {'consola': {'class': 'logging.StreamHandler', 'formatter': 'mensaje'}},
+    'loggers': {
+        'myapp.metricas': {
+            'handlers': ['consola'],
+            'level': os.environ.get('REQUEST_METRICS_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+
+# ============================================================
+# 24. RENDIMIENTO DE RESPUESTAS JSON
+# ============================================================
+# RENDERER: orjson en lugar del JSONRenderer de DRF (myapp.renderers).
+# PROYECCION: los listados de campos planos se leen con values() y conversores
+# precompilados en vez de instanciar modelos y serializar campo por campo
+# (myapp.proyeccion). Mismo JSON en ambos casos.
+
+FAST_JSON = {
+    'RENDERER': os.environ.get('FAST_JSON_RENDERER', '1').lower() in ('1', 'true', 'yes'),
+    'PROYECCION': os.environ.get('FAST_JSON_PROYECCION', '1').lower() in ('1', 'true', 'yes'),
+}
+
+if FAST_JSON['RENDERER']:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = (
+        'myapp.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    )
+
+# Compresión brotli/gzip negociada por Accept-Encoding (myapp.compresion).
+# Solo respuestas de al menos MIN_BYTES; niveles bajos porque en listados
+# grandes el costo de CPU de gzip -9 / brotli 11 no compensa.
+
+RESPONSE_COMPRESSION = {
+    'ENABLED': os.environ.get('RESPONSE_COMPRESSION', '1').lower() in ('1', 'true', 'yes'),
+    'MIN_BYTES': int(os.environ.get('RESPONSE_COMPRESSION_MIN_BYTES', '1024')),
+    'GZIP_LEVEL': int(os.environ.get('RESPONSE_COMPRESSION_GZIP_LEVEL', '6')),
+    'BROTLI_QUALITY': int(os.environ.get('RESPONSE_COMPRESSION_BROTLI_QUALITY', '4')),
+}
+
+if RESPONSE_COMPRESSION['ENABLED']:
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+        'myapp.compresion.CompresionMiddleware',
+    )
+
+
+# ============================================================
+# 25. CONTEO EN LOS LISTADOS PAGINADOS
+# ============================================================
+# `count` de las respuestas paginadas (myapp.conteo): estimación de
+# PostgreSQL sin filtros, COUNT exacto hasta EXACT_THRESHOLD filas y, por
+# encima, estimación del planificador (`count_exact: false`). Los totales
+# por categoría se cachean en CACHES[CACHE_ALIAS] solo si es un cache
+# compartido (Redis, Memcached...) y se invalidan al confirmar cada cambio;
+# CACHE_TIMEOUT acota lo que duran las cargas por SQL directo.
+
+LIST_COUNT = {
+    'EXACT_THRESHOLD': int(os.environ.get('LIST_COUNT_EXACT_THRESHOLD', '1000')),
+    'CACHE_ALIAS': os.environ.get('LIST_COUNT_CACHE_ALIAS', 'default'),
+    'CACHE_TIMEOUT': int(os.environ.get('LIST_COUNT_CACHE_TIMEOUT', '300')),
+}
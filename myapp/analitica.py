@@ -0,0 +1,195 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .estadisticas import COMPLETADO
+from .models import Categoria, Detalle, Pedido, ResumenDiario, VentaDiaria
+
+AGRUPACIONES = {'dia': 'fecha', 'categoria': 'category_id', 'vendedor': 'id_user'}
+
+# Lo que hace falta de un Detalle para sumarlo o restarlo (ver registrar_linea)
+LINEA = (
+    'producto_id', 'cantidad', 'precio_unidad', 'pedido__estado', 'pedido__fecha_pedido',
+    'producto__category_id', 'producto__id_user',
+)
+
+
+def _limites(desde, hasta):
+    """Días `[desde, hasta]` -> `(inicio, fin)` aware, con `fin` exclusivo."""
+    return (
+        timezone.make_aware(datetime.combine(desde, time.min)),
+        timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min)),
+    )
+
+
+def _por_grupo(detalles, *campos):
+    """Totales de un queryset de Detalle por (`*campos`, categoría, vendedor)."""
+    return detalles.values(*campos, 'producto__category_id', 'producto__id_user').annotate(
+        unidades=Sum('cantidad'),
+        ingresos=Sum(F('cantidad') * F('precio_unidad')),
+        lineas=Count('pk'),
+    )
+
+
+# ==========================================
+# 1. ACTUALIZACIÓN INCREMENTAL
+# ==========================================
+def _sumar(fecha, grupos, pedidos):
+    """Suma al día `fecha` los `grupos` (ya con signo) y `pedidos` pedidos.
+
+    Como en myapp.estadisticas: filas creadas con INSERT ... ON CONFLICT DO
+    NOTHING y sumas con UPDATE ... SET x = x + delta, en orden fijo. Cada
+    UPDATE bloquea su fila hasta el commit, así que dos requests que tocan el
+    mismo día se encolan en vez de pisarse.
+    """
+    grupos = sorted(grupos, key=lambda g: (g['producto__category_id'] or '', g['producto__id_user'] or 0))
+    with transaction.atomic():
+        ResumenDiario.objects.bulk_create([ResumenDiario(fecha=fecha)], ignore_conflicts=True)
+        ResumenDiario.objects.filter(pk=fecha).update(
+            pedidos=F('pedidos') + pedidos,
+            unidades=F('unidades') + sum(g['unidades'] for g in grupos),
+            ingresos=F('ingresos') + sum((g['ingresos'] for g in grupos), Decimal('0')),
+        )
+        VentaDiaria.objects.bulk_create(
+            [
+                VentaDiaria(fecha=fecha, category_id=g['producto__category_id'], id_user=g['producto__id_user'])
+                for g in grupos
+            ],
+            ignore_conflicts=True,
+        )
+        for g in grupos:
+            VentaDiaria.objects.filter(
+                fecha=fecha, category_id=g['producto__category_id'], id_user=g['producto__id_user'],
+            ).update(
+                unidades=F('unidades') + g['unidades'],
+                ingresos=F('ingresos') + g['ingresos'],
+                lineas=F('lineas') + g['lineas'],
+            )
+
+
+def registrar_pedido(pedido, signo, fecha=None):
+    """Suma (`signo=1`) o resta (`signo=-1`) un pedido a las ventas de su día
+    (o de `fecha`, para restarlo del día en que estaba antes de moverlo)."""
+    grupos = [
+        {**g, 'unidades': signo * g['unidades'], 'ingresos': signo * g['ingresos'], 'lineas': signo * g['lineas']}
+        for g in _por_grupo(Detalle.objects.filter(pedido_id=pedido.pk))
+    ]
+    _sumar(fecha or timezone.localdate(pedido.fecha_pedido), grupos, signo)
+
+
+def registrar_linea(linea, signo):
+    """Suma o resta una línea de un pedido completado (un dict de `LINEA`).
+
+    Para altas, bajas y cambios de Detalle: se resta la línea como estaba y
+    se suma como quedó, sin recalcular el resto del día.
+    """
+    _sumar(timezone.localdate(linea['pedido__fecha_pedido']), [{
+        'producto__category_id': linea['producto__category_id'],
+        'producto__id_user': linea['producto__id_user'],
+        'unidades': signo * linea['cantidad'],
+        'ingresos': signo * linea['cantidad'] * linea['precio_unidad'],
+        'lineas': signo,
+    }], 0)
+
+
+# ==========================================
+# 2. RECONSTRUCCIÓN POR RANGO DE DÍAS
+# ==========================================
+def reconstruir_dias(desde, hasta):
+    """Recalcula desde Pedido/Detalle las ventas de los días `[desde, hasta]`.
+
+    Dos consultas agregadas (usan el índice (estado, fecha_pedido)) y el
+    reemplazo de las filas del rango, todo en una transacción. Devuelve
+    cuántos días con ventas quedaron.
+    """
+    inicio, fin = _limites(desde, hasta)
+    grupos = _por_grupo(
+        Detalle.objects.filter(
+            pedido__estado=COMPLETADO, pedido__fecha_pedido__gte=inicio, pedido__fecha_pedido__lt=fin,
+        ).annotate(fecha=TruncDate('pedido__fecha_pedido')),
+        'fecha',
+    )
+    pedidos = (
+        Pedido.objects.filter(estado=COMPLETADO, fecha_pedido__gte=inicio, fecha_pedido__lt=fin)
+        .annotate(fecha=TruncDate('fecha_pedido'))
+        .values('fecha')
+        .annotate(pedidos=Count('pk'))
+        .values_list('fecha', 'pedidos')
+    )
+
+    ventas = []
+    resumenes = {fecha: ResumenDiario(fecha=fecha, pedidos=n, ingresos=Decimal('0')) for fecha, n in pedidos}
+    for g in grupos:
+        ventas.append(VentaDiaria(
+            fecha=g['fecha'], category_id=g['producto__category_id'], id_user=g['producto__id_user'],
+            unidades=g['unidades'], ingresos=g['ingresos'], lineas=g['lineas'],
+        ))
+        resumen = resumenes[g['fecha']]
+        resumen.unidades += g['unidades']
+        resumen.ingresos += g['ingresos']
+
+    with transaction.atomic():
+        VentaDiaria.objects.filter(fecha__range=(desde, hasta)).delete()
+        ResumenDiario.objects.filter(fecha__range=(desde, hasta)).delete()
+        VentaDiaria.objects.bulk_create(ventas, batch_size=2000)
+        ResumenDiario.objects.bulk_create(resumenes.values(), batch_size=2000)
+    return len(resumenes)
+
+
+# ==========================================
+# 3. CONSULTAS
+# ==========================================
+def _decimal(valor):
+    return format(valor or Decimal('0'), '.2f')
+
+
+def consultar_ventas(desde, hasta, agrupar='dia', categoria=None, vendedor=None):
+    """Ventas de `[desde, hasta]` agrupadas por día, categoría o vendedor.
+
+    Solo lee las tablas de agregados (a lo sumo días x categorías x
+    vendedores filas). `pedidos` sale únicamente sin filtros y por día, de
+    ResumenDiario: en los demás cortes no es sumable y se informan `lineas`.
+    """
+    clave = AGRUPACIONES[agrupar]
+    filtrado = categoria is not None or vendedor is not None
+    if agrupar == 'dia' and not filtrado:
+        filas = [
+            {'fecha': r.fecha, 'pedidos': r.pedidos, 'unidades': r.unidades, 'ingresos': _decimal(r.ingresos)}
+            for r in ResumenDiario.objects.filter(fecha__range=(desde, hasta)).order_by('fecha')
+        ]
+    else:
+        ventas = VentaDiaria.objects.filter(fecha__range=(desde, hasta))
+        if categoria is not None:
+            ventas = ventas.filter(category_id=categoria)
+        if vendedor is not None:
+            ventas = ventas.filter(id_user=vendedor)
+        filas = list(
+            ventas.values(clave)
+            .annotate(unidades=Sum('unidades'), ingresos=Sum('ingresos'), lineas=Sum('lineas'))
+            .order_by(clave if agrupar == 'dia' else '-ingresos')
+        )
+        for fila in filas:
+            fila['ingresos'] = _decimal(fila['ingresos'])
+        if agrupar == 'categoria':
+            nombres = dict(
+                Categoria.objects.filter(pk__in=[f['category_id'] for f in filas if f['category_id']])
+                .values_list('category_id', 'category_name')
+            )
+            for fila in filas:
+                fila['category_name'] = nombres.get(fila['category_id'])
+
+    if filtrado:
+        totales = ventas.aggregate(unidades=Sum('unidades'), ingresos=Sum('ingresos'), lineas=Sum('lineas'))
+        totales['lineas'] = totales['lineas'] or 0
+    else:
+        totales = ResumenDiario.objects.filter(fecha__range=(desde, hasta)).aggregate(
+            pedidos=Sum('pedidos'), unidades=Sum('unidades'), ingresos=Sum('ingresos'),
+        )
+        totales['pedidos'] = totales['pedidos'] or 0
+    totales['unidades'] = totales['unidades'] or 0
+    totales['ingresos'] = _decimal(totales['ingresos'])
+    return {'desde': desde, 'hasta': hasta, 'agrupar': agrupar, 'resultados': filas, 'totales': totales}
@@ -6,4 +6,5 @@ class MyappConfig(AppConfig):
     name = 'myapp'
 
     def ready(self):
+        import myapp.checks  # noqa: F401
         import myapp.signals  # noqa: F401
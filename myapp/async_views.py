@@ -0,0 +1,179 @@
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse
+from django.urls import URLPattern
+from rest_framework import exceptions
+from rest_framework.settings import api_settings
+
+from .cache import CachedResponseMixin, LRUResponseCache, get_response_cache
+from .conditional import agregar_validadores, make_etag, validar_condicional
+from .models import UserProfile
+from .renderers import get_json_renderer
+
+
+# ==========================================
+# VISTAS ASYNC PARA LAS LECTURAS CALIENTES (modo ASGI)
+# ==========================================
+# Bajo ASGI (settings.ASYNC_VIEWS) los GET de catálogo, categorías y perfil
+# se atienden sin ocupar el worker mientras esperan a la base. No es el ORM
+# async: es la vista DRF síncrona corriendo en el hilo de la base con
+# sync_to_async (que es lo que hacen por dentro `aget()` y compañía). Antes de
+# servir corre `initial()` de DRF (autenticación, permisos, throttling,
+# negociación); todo lo demás (queryset, filtros, serializer, paginación,
+# ETag, tags del cache) es la vista DRF misma (ver `_vista`), así que
+# responden lo mismo. Los demás métodos, ?format=, los renderers que no son
+# JSON y los errores se delegan a la vista DRF de siempre.
+
+def _json(data, status=200, headers=None):
+    return HttpResponse(
+        get_json_renderer().render(data), status=status,
+        content_type='application/json', headers=headers,
+    )
+
+
+def _vista(vista_drf, request, **kwargs):
+    """Instancia de la vista DRF, armada como en `as_view()` + `dispatch()`.
+
+    Las vistas async usan sus métodos (queryset, filtros, serializer,
+    paginación, validadores del GET condicional y tags del cache) en lugar de
+    copiarlos, así que ambos caminos no se pueden separar.
+    """
+    vista = vista_drf.cls(**vista_drf.initkwargs)
+    vista.action_map = {'head': vista_drf.actions.get('get'), **vista_drf.actions}
+    vista.args, vista.kwargs = (), kwargs
+    vista.format_kwarg = None
+    vista.request = vista.initialize_request(request, **kwargs)
+    return vista
+
+
+def _iniciar(vista):
+    """`initial()` de la vista (autenticación, permisos, throttles, negociación).
+
+    Devuelve False si el renderer negociado no es JSON; las excepciones de DRF
+    (401/403/406/429) las deja pasar.
+    """
+    vista.initial(vista.request)
+    return vista.request.accepted_renderer.format == 'json'
+
+
+def _datos(vista):
+    """`response.data` de la acción de la vista, sin las capas de GET condicional y
+    cache de respuestas (esas corren en `_respuesta`)."""
+    accion = getattr(super(CachedResponseMixin, vista), vista.action)
+    return accion(vista.request, **vista.kwargs).data
+
+
+async def _en_cache(cache, funcion, *args):
+    # El LRU es memoria del proceso; un cache remoto (Redis...) se consulta en un hilo
+    if isinstance(cache, LRUResponseCache):
+        return funcion(*args)
+    return await sync_to_async(funcion)(*args)
+
+
+async def _respuesta(vista, validadores):
+    """Flujo de ConditionalGetMixin + CachedResponseMixin con esperas async.
+
+    `validadores` es `get_list_validators` o `get_object_validators` de la
+    vista. Devuelve None si la vista DRF tiene que armar la respuesta (401,
+    406, 429, 404, cursor o parámetros inválidos, renderer que no es JSON...).
+    """
+    try:
+        if not await sync_to_async(_iniciar)(vista):
+            return None
+    except exceptions.APIException:
+        return None
+    request = vista.request
+    etag = timestamp = None
+    fingerprint, last_modified = await sync_to_async(validadores)()
+    if fingerprint is not None:
+        etag = make_etag(request, vista.get_serializer_class(), fingerprint)
+        response, timestamp = validar_condicional(request, etag, last_modified)
+        if response is not None:
+            return agregar_validadores(response, etag, timestamp)
+
+    cache = get_response_cache()
+    key = None
+    if cache is not None:
+        key = await _en_cache(cache, vista.get_cache_key, request, vista.get_cache_tags(), cache)
+        data = await _en_cache(cache, cache.get, key)
+        if data is not None:
+            response = _json(data, headers={'X-Cache': 'HIT'})
+            return agregar_validadores(response, etag, timestamp) if etag else response
+
+    try:
+        data = await sync_to_async(_datos)(vista)
+    except (exceptions.APIException, Http404):
+        return None
+    response = _json(data)
+    if cache is not None:
+        await _en_cache(cache, cache.set, key, data)
+        response['X-Cache'] = 'MISS'
+    return agregar_validadores(response, etag, timestamp) if etag else response
+
+
+# ==========================================
+# 1. CATÁLOGO
+# ==========================================
+async def listado(request, vista_drf):
+    vista = _vista(vista_drf, request)
+    return await _respuesta(vista, vista.get_list_validators)
+
+
+async def detalle(request, vista_drf, **kwargs):
+    vista = _vista(vista_drf, request, **kwargs)
+    return await _respuesta(vista, vista.get_object_validators)
+
+
+# ==========================================
+# 2. PERFIL (me)
+# ==========================================
+async def perfil_me(request, vista_drf):
+    vista = _vista(vista_drf, request)
+    try:
+        # La autenticación casi siempre es un acierto del cache de usuarios (myapp.auth_cache)
+        if not await sync_to_async(_iniciar)(vista):
+            return None
+    except exceptions.APIException:
+        return None  # la vista DRF arma la respuesta de error de siempre
+    profile, _ = await UserProfile.objects.aget_or_create(user=vista.request.user)
+    return _json(vista.serializer_class(profile).data)
+
+
+# ==========================================
+# 4. ENRUTAMIENTO
+# ==========================================
+VISTAS_ASYNC = {
+    'producto-list': listado,
+    'producto-detail': detalle,
+    'categoria-list': listado,
+    'user-profile-get-or-update-profile': perfil_me,
+}
+
+
+def hibrida(vista_async, vista_drf):
+    """Vista async que atiende los GET y delega el resto a la vista DRF."""
+
+    async def vista(request, *args, **kwargs):
+        formato = 'format' in kwargs or api_settings.URL_FORMAT_OVERRIDE in request.GET
+        if request.method in ('GET', 'HEAD') and not formato:
+            response = await vista_async(request, vista_drf, *args, **kwargs)
+            if response is not None:
+                return response
+        return await sync_to_async(vista_drf)(request, *args, **kwargs)
+
+    vista.csrf_exempt = True
+    vista.cls = getattr(vista_drf, 'cls', None)
+    vista.vista_drf = vista_drf
+    return vista
+
+
+def con_vistas_async(patrones):
+    """Reemplaza en las URLs del router las vistas de VISTAS_ASYNC (mismo regex y nombre)."""
+    resultado = []
+    for patron in patrones:
+        vista_async = VISTAS_ASYNC.get(getattr(patron, 'name', None))
+        if vista_async is not None:
+            patron = URLPattern(
+                patron.pattern, hibrida(vista_async, patron.callback), patron.default_args, patron.name,
+            )
+        resultado.append(patron)
+    return resultado
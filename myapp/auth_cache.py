@@ -0,0 +1,134 @@
+import pickle
+import threading
+from functools import lru_cache
+
+from cachetools import TTLCache
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+
+
+# ==========================================
+# CACHE DE USUARIOS AUTENTICADOS
+# ==========================================
+class UserCache:
+    """Cache de dos niveles para los usuarios que resuelven las autenticaciones.
+
+    - Nivel local: TTLCache del proceso (TTL corto, porque las señales solo
+      limpian el proceso que hizo la escritura).
+    - Nivel compartido (opcional): CACHES[SHARED_ALIAS], que sí se invalida
+      para todos los workers.
+
+    Los usuarios se guardan serializados con pickle y cada acierto devuelve una
+    instancia nueva, así nada que una vista cachee en `request.user` (p. ej.
+    `user.profile`) pasa al siguiente request.
+    """
+
+    def __init__(self, ttl, maxsize, shared_alias=None, shared_ttl=None):
+        self._local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._shared = caches[shared_alias] if shared_alias else None
+        self._shared_ttl = shared_ttl
+        self._stats = {'hits_local': 0, 'hits_shared': 0, 'misses': 0}
+
+    # --- acceso genérico a los dos niveles ---
+    def _contar(self, nombre):
+        with self._lock:
+            self._stats[nombre] += 1
+
+    def _get(self, key):
+        with self._lock:
+            valor = self._local.get(key)
+        if valor is not None:
+            self._contar('hits_local')
+            return valor
+        if self._shared is not None:
+            valor = self._shared.get(key)
+            if valor is not None:
+                with self._lock:
+                    self._local[key] = valor
+                self._contar('hits_shared')
+                return valor
+        self._contar('misses')
+        return None
+
+    def _set(self, key, valor):
+        with self._lock:
+            self._local[key] = valor
+        if self._shared is not None:
+            self._shared.set(key, valor, self._shared_ttl)
+
+    def _delete(self, key):
+        with self._lock:
+            self._local.pop(key, None)
+        if self._shared is not None:
+            self._shared.delete(key)
+
+    # --- usuarios ---
+    @staticmethod
+    def _user_key(user_id):
+        return f'auth-user:{user_id}'
+
+    @staticmethod
+    def _token_key(key):
+        return f'auth-token:{key}'
+
+    def remember_user(self, user):
+        self._set(self._user_key(user.pk), pickle.dumps(user))
+
+    def get_user(self, user_id):
+        """Devuelve el usuario (de cache o de la BD) o None si no existe."""
+        datos = self._get(self._user_key(user_id))
+        if datos is not None:
+            return pickle.loads(datos)
+        user = get_user_model().objects.filter(pk=user_id).first()
+        if user is not None:
+            self.remember_user(user)
+        return user
+
+    def get_token_user(self, key, loader):
+        """Devuelve el usuario del token `key`.
+
+        El token se cachea como `key -> user_id` y el usuario aparte, así que
+        invalidar un usuario también invalida lo que se resuelve por su token.
+        `loader(key)` se llama en un fallo y debe devolver el Token con su user.
+        """
+        user_id = self._get(self._token_key(key))
+        if user_id is not None:
+            datos = self._get(self._user_key(user_id))
+            if datos is not None:
+                return pickle.loads(datos)
+        token = loader(key)
+        self._set(self._token_key(key), token.user_id)
+        self.remember_user(token.user)
+        return token.user
+
+    def invalidate_user(self, user_id):
+        self._delete(self._user_key(user_id))
+
+    def invalidate_token(self, key):
+        self._delete(self._token_key(key))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        total = sum(stats.values())
+        hits = stats['hits_local'] + stats['hits_shared']
+        stats['hit_rate'] = round(hits / total, 4) if total else None
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+            self._stats = dict.fromkeys(self._stats, 0)
+
+
+@lru_cache(maxsize=None)
+def get_user_cache():
+    config = settings.AUTH_USER_CACHE
+    return UserCache(
+        ttl=config['TTL'],
+        maxsize=config['MAXSIZE'],
+        shared_alias=config['SHARED_ALIAS'],
+        shared_ttl=config['SHARED_TTL'],
+    )
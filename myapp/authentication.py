@@ -1,7 +1,9 @@
-from rest_framework.authentication import BaseAuthentication
+from rest_framework.authentication import BaseAuthentication, TokenAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from django.contrib.auth import get_user_model
 
+from .auth_cache import get_user_cache
+
 # Obtenemos el modelo de usuario por defecto (auth_user)
 User = get_user_model() 
 
@@ -10,6 +12,9 @@ class CustomHeaderAuthentication(BaseAuthentication):
     Autenticación personalizada que revisa el header 'X-User-Id' para
     encontrar y autenticar a un usuario, permitiendo pasar el chequeo 
     de permisos de DRF.
+
+    El usuario se busca en el cache de usuarios (myapp.auth_cache) antes de
+    ir a la base de datos.
     """
     def authenticate(self, request):
         user_id = request.headers.get('X-User-Id')
@@ -21,11 +26,34 @@ class CustomHeaderAuthentication(BaseAuthentication):
         try:
             # Intentamos convertir la ID a entero y buscar el usuario en auth_user
             user_id = int(user_id)
-            user = User.objects.get(pk=user_id)
-        except (ValueError, User.DoesNotExist):
+        except ValueError:
+            user = None
+        else:
+            user = get_user_cache().get_user(user_id)
+
+        if user is None:
             # Si la ID es inválida o el usuario no existe, lanzamos un error de autenticación
             raise AuthenticationFailed('Invalid user ID provided in X-User-Id header.')
 
         # Si encontramos al usuario, lo devolvemos junto con None (token/auth data)
         # Esto establece request.user = user para las vistas de DRF.
         return (user, None)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication de DRF sin la consulta token+usuario en cada request.
+
+    `request.auth` es la clave del token (los endpoints no usan el objeto Token).
+    """
+
+    def _cargar_token(self, key):
+        try:
+            return self.get_model().objects.select_related('user').get(key=key)
+        except self.get_model().DoesNotExist:
+            raise AuthenticationFailed('Invalid token.')
+
+    def authenticate_credentials(self, key):
+        user = get_user_cache().get_token_user(key, self._cargar_token)
+        if not user.is_active:
+            raise AuthenticationFailed('User inactive or deleted.')
+        return (user, key)
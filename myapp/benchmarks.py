@@ -0,0 +1,44 @@
+from contextlib import contextmanager
+
+from django.db import connections
+
+
+# ==========================================
+# UTILIDADES DE MEDICIÓN (comandos bench_* y carga_http)
+# ==========================================
+def percentil(ordenadas, p):
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not ordenadas:
+        return None
+    indice = max(0, min(len(ordenadas) - 1, round(p / 100 * len(ordenadas) + 0.5) - 1))
+    return ordenadas[indice]
+
+
+def _redondear(valor):
+    return round(valor, 2) if valor is not None else None
+
+
+def resumen_latencias(latencias_ms, segundos):
+    """Throughput y percentiles de una lista de latencias en milisegundos."""
+    ordenadas = sorted(latencias_ms)
+    return {
+        'requests': len(ordenadas),
+        'rps': round(len(ordenadas) / segundos, 1) if segundos else None,
+        'p50_ms': _redondear(percentil(ordenadas, 50)),
+        'p95_ms': _redondear(percentil(ordenadas, 95)),
+        'p99_ms': _redondear(percentil(ordenadas, 99)),
+        'max_ms': _redondear(ordenadas[-1] if ordenadas else None),
+    }
+
+
+@contextmanager
+def contar_consultas(alias='default'):
+    """Cuenta las consultas SQL ejecutadas en `alias` (sin el tope de CaptureQueriesContext)."""
+    contador = [0]
+
+    def wrapper(execute, *args):
+        contador[0] += 1
+        return execute(*args)
+
+    with connections[alias].execute_wrapper(wrapper):
+        yield contador
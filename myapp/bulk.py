@@ -0,0 +1,166 @@
+import csv
+import io
+import json
+from collections import Counter
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, transaction
+
+from .cache import invalidate_tags
+from .conditional import subir_versiones
+from .conteo import invalidar_conteos
+from .estadisticas import sumar_productos
+from .models import Categoria, Producto
+from .serializers import ProductoImportSerializer
+
+FORMATOS = ('csv', 'ndjson')
+
+COLUMNAS_EXPORTACION = [
+    'product_id', 'product_name', 'description', 'category_id',
+    'id_user', 'state', 'price', 'updated_at',
+]
+
+
+def detectar_formato(nombre_archivo, formato=None):
+    if formato:
+        return formato.lower()
+    if nombre_archivo.lower().endswith('.csv'):
+        return 'csv'
+    if nombre_archivo.lower().endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return None
+
+
+# ==========================================
+# 1. IMPORTACIÓN
+# ==========================================
+def _leer_filas(archivo, formato):
+    """Genera `(numero_de_fila, dict | None)` leyendo el archivo línea a línea."""
+    texto = io.TextIOWrapper(archivo.file, encoding='utf-8-sig', newline='')
+    if formato == 'csv':
+        for numero, fila in enumerate(csv.DictReader(texto), start=1):
+            # En CSV no existe null: una celda vacía es "sin valor"
+            yield numero, {k: (v if v != '' else None) for k, v in fila.items()}
+    else:
+        for numero, linea in enumerate(texto, start=1):
+            if not linea.strip():
+                continue
+            try:
+                fila = json.loads(linea)
+            except ValueError:
+                fila = None
+            yield numero, fila if isinstance(fila, dict) else None
+
+
+def importar_productos(archivo, formato):
+    """Valida cada fila y crea los productos con `bulk_create` por lotes.
+
+    Cada lote va en su propia transacción: un error de base de datos solo
+    descarta ese lote (queda en `errores` con sus filas) y la importación
+    sigue. Devuelve el resumen con los errores por fila.
+    """
+    tamano_lote = settings.BULK_IMPORT_BATCH_SIZE
+    contexto = {'categorias': set(Categoria.objects.values_list('category_id', flat=True))}
+    creados = 0
+    errores = []
+    categorias_afectadas = set()
+    vendedores_afectados = Counter()
+    lote, filas = [], []
+
+    def guardar(lote, filas):
+        categorias = {p.category_id for p in lote} - {None}
+        try:
+            with transaction.atomic():
+                Producto.objects.bulk_create(lote, batch_size=tamano_lote)
+                # bulk_create no dispara señales: el ETag de los listados cambia con el lote
+                subir_versiones('productos', *(f'categoria:{c}' for c in categorias))
+        except DatabaseError as exc:
+            errores.append({'filas': filas, 'errores': {'non_field_errors': [f'Lote descartado: {exc}']}})
+            return 0
+        categorias_afectadas.update(categorias)
+        vendedores_afectados.update(p.id_user for p in lote)
+        return len(lote)
+
+    try:
+        for numero, fila in _leer_filas(archivo, formato):
+            if fila is None:
+                errores.append({'fila': numero, 'errores': {'non_field_errors': ['JSON inválido.']}})
+                continue
+            serializer = ProductoImportSerializer(data=fila, context=contexto)
+            if not serializer.is_valid():
+                errores.append({'fila': numero, 'errores': serializer.errors})
+                continue
+            datos = serializer.validated_data
+            datos['category_id'] = datos.pop('category', None)
+            lote.append(Producto(**datos))
+            filas.append(numero)
+            if len(lote) >= tamano_lote:
+                creados += guardar(lote, filas)
+                lote, filas = [], []
+        if lote:
+            creados += guardar(lote, filas)
+    finally:
+        # bulk_create no dispara señales: invalidamos los caches y contamos a mano,
+        # también por los lotes ya guardados si algo cortó la importación
+        if creados:
+            invalidate_tags('productos', *(f'categoria-productos:{c}' for c in categorias_afectadas))
+            sumar_productos(vendedores_afectados)
+            invalidar_conteos(*(f'categoria:{c}' for c in categorias_afectadas))
+    return {'creados': creados, 'errores': errores}
+
+
+# ==========================================
+# 2. EXPORTACIÓN
+# ==========================================
+class _Eco:
+    """Buffer de escritura que devuelve lo escrito (para csv.writer)."""
+
+    def write(self, value):
+        return value
+
+
+def _lineas(formato):
+    """`(cabecera, linea)`: la primera línea del archivo (o None) y la función
+    que convierte cada fila de `values_list(*COLUMNAS_EXPORTACION)`."""
+    if formato == 'csv':
+        writer = csv.writer(_Eco())
+        return writer.writerow(COLUMNAS_EXPORTACION), writer.writerow
+    return None, lambda fila: json.dumps(dict(zip(COLUMNAS_EXPORTACION, fila)), cls=DjangoJSONEncoder) + '\n'
+
+
+def _filas(queryset):
+    return queryset.order_by().values_list(*COLUMNAS_EXPORTACION)
+
+
+def exportar_productos(queryset, formato):
+    """Generador de líneas CSV/NDJSON con memoria constante.
+
+    `iterator()` usa un cursor del lado del servidor en PostgreSQL, así que
+    nunca se cargan todas las filas a la vez.
+    """
+    cabecera, linea = _lineas(formato)
+    if cabecera is not None:
+        yield cabecera
+    for fila in _filas(queryset).iterator(chunk_size=2000):
+        yield linea(fila)
+
+
+async def aexportar_productos(queryset, formato):
+    """Lo mismo que `exportar_productos` para servir bajo ASGI.
+
+    Django consume un generador sync en un hilo y lo junta entero en memoria
+    antes de enviarlo (`StreamingHttpResponse.__aiter__`); este trae las filas
+    de a bloques desde el hilo de la base. No usa `aiterator()`: con
+    `values_list()` ejecuta la consulta dentro del event loop.
+    """
+    cabecera, linea = _lineas(formato)
+    if cabecera is not None:
+        yield cabecera
+    filas = _filas(queryset).iterator(chunk_size=2000)
+    siguiente_bloque = sync_to_async(lambda: list(islice(filas, 2000)))
+    while bloque := await siguiente_bloque():
+        for fila in bloque:
+            yield linea(fila)
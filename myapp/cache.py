@@ -0,0 +1,215 @@
+import hashlib
+import threading
+import time
+from functools import lru_cache
+
+from cachetools import TTLCache
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+
+# ==========================================
+# 1. BACKENDS DEL CACHE DE RESPUESTAS
+# ==========================================
+# Cada entrada se guarda con una clave que incluye la versión actual de sus
+# "tags" (p. ej. 'productos', 'producto:<id>'). Invalidar un tag es subir su
+# versión: las claves viejas dejan de coincidir y expiran solas. Así funciona
+# igual en memoria que en un cache compartido (Redis, Memcached...).
+
+class BaseResponseCache:
+    """Interfaz que deben implementar los backends del cache de respuestas."""
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value):
+        raise NotImplementedError
+
+    def get_tag_versions(self, tags):
+        raise NotImplementedError
+
+    def invalidate_tags(self, tags):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class LRUResponseCache(BaseResponseCache):
+    """Cache en memoria del proceso (LRU con TTL de cachetools).
+
+    Ojo: cada worker de gunicorn tiene su propia copia y las señales solo
+    invalidan el proceso que atendió la escritura; en los demás la entrada
+    vive hasta que expira el TIMEOUT.
+    """
+
+    def __init__(self, maxsize, timeout):
+        self._entries = TTLCache(maxsize=maxsize, ttl=timeout)
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return self._entries.get(key)
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+
+    def get_tag_versions(self, tags):
+        with self._lock:
+            return [self._versions.get(tag, 0) for tag in tags]
+
+    def invalidate_tags(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+
+class DjangoResponseCache(BaseResponseCache):
+    """Cache sobre el framework de cache de Django (CACHES[alias])."""
+
+    def __init__(self, alias, timeout):
+        self._cache = caches[alias]
+        self._timeout = timeout
+
+    @staticmethod
+    def _tag_key(tag):
+        return f'resp-tag:{tag}'
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value):
+        self._cache.set(key, value, self._timeout)
+
+    def get_tag_versions(self, tags):
+        keys = [self._tag_key(tag) for tag in tags]
+        versions = self._cache.get_many(keys)
+        for key in keys:
+            if key not in versions:
+                # Si el tag fue desalojado no puede volver a 0 (serviría entradas
+                # viejas): arranca desde un valor que no se haya usado antes.
+                self._cache.add(key, time.time_ns(), None)
+                versions[key] = self._cache.get(key)
+        return [versions[key] for key in keys]
+
+    def invalidate_tags(self, tags):
+        for tag in tags:
+            key = self._tag_key(tag)
+            try:
+                self._cache.incr(key)
+            except ValueError:
+                self._cache.set(key, time.time_ns(), None)
+
+    def clear(self):
+        self._cache.clear()
+
+
+@lru_cache(maxsize=None)
+def get_response_cache():
+    """Devuelve el backend configurado en settings.RESPONSE_CACHE (o None)."""
+    config = settings.RESPONSE_CACHE
+    backend = config['BACKEND']
+    if backend == 'lru':
+        return LRUResponseCache(config['MAXSIZE'], config['TIMEOUT'])
+    if backend == 'django':
+        return DjangoResponseCache(config['CACHE_ALIAS'], config['TIMEOUT'])
+    return None
+
+
+# ==========================================
+# 2. INVALIDACIÓN (usada desde signals.py)
+# ==========================================
+def invalidate_tags(*tags):
+    """Sube la versión de `tags` al confirmar la transacción en curso.
+
+    Antes del commit otro request todavía lee las filas viejas: con la versión
+    ya subida las guardaría bajo la clave nueva y se servirían hasta TIMEOUT.
+    """
+    cache = get_response_cache()
+    if cache is not None and tags:
+        transaction.on_commit(lambda: cache.invalidate_tags(tags))
+
+
+def invalidar_producto(product_id, *category_ids):
+    tags = ['productos', f'producto:{product_id}']
+    tags += [f'categoria-productos:{category_id}' for category_id in set(category_ids) if category_id]
+    invalidate_tags(*tags)
+
+
+def invalidar_categoria(category_id):
+    invalidate_tags('categorias', f'categoria:{category_id}')
+
+
+# ==========================================
+# 3. MIXIN PARA LAS VISTAS DE SOLO LECTURA
+# ==========================================
+def make_cache_key(request, serializer_class, tags, cache):
+    partes = [
+        request.path,
+        '&'.join(f'{k}={v}' for k, v in sorted(request.GET.lists())),
+        f'{serializer_class.__module__}.{serializer_class.__qualname__}',
+        str(getattr(serializer_class, 'cache_version', 1)),
+        ','.join(f'{tag}={version}' for tag, version in zip(tags, cache.get_tag_versions(tags))),
+    ]
+    return 'resp:' + hashlib.sha1('|'.join(partes).encode()).hexdigest()
+
+
+class CachedResponseMixin:
+    """Cachea las respuestas de `list` y `retrieve`.
+
+    La clave combina la ruta, los query params ordenados, el serializer (y su
+    atributo `cache_version`) y la versión de los tags que devuelve
+    `get_cache_tags()`. Solo se cachean respuestas 200.
+    """
+
+    def get_cache_tags(self):
+        raise NotImplementedError
+
+    def get_cache_key(self, request, tags, cache):
+        return make_cache_key(request, self.get_serializer_class(), tags, cache)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        cache = get_response_cache()
+        if cache is None:
+            return handler(request, *args, **kwargs)
+
+        key = self.get_cache_key(request, self.get_cache_tags(), cache)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data, headers={'X-Cache': 'HIT'})
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data)
+            response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+
+# ==========================================
+# 4. CACHES COMPARTIDOS ENTRE WORKERS
+# ==========================================
+def es_cache_compartido(alias):
+    """True si CACHES[alias] lo ven todos los workers (Redis, Memcached, base de datos...).
+
+    LocMemCache es por proceso y DummyCache no guarda nada: sirven para datos
+    que se pueden perder, no para coordinar workers.
+    """
+    from django.core.cache.backends.dummy import DummyCache
+    from django.core.cache.backends.locmem import LocMemCache
+
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
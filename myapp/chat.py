@@ -0,0 +1,162 @@
+import asyncio
+import json
+import logging
+import threading
+from functools import lru_cache
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+# ==========================================
+# 1. BROKER DE MENSAJES (PUB/SUB)
+# ==========================================
+def canales_de_mensaje(mensaje):
+    """Canales a los que se publica un Mensaje: los dos lados de la conversación."""
+    return [f'cliente:{mensaje.cliente_id}', f'vendedor:{mensaje.vendedor_id}']
+
+
+class BaseBroker:
+    """Interfaz del broker del chat.
+
+    `publish` se llama desde código síncrono (señales de Django, en cualquier
+    hilo). `subscribe` devuelve un asyncio.Queue que recibe los payloads de los
+    canales pedidos; `unsubscribe` lo libera. Un broker entre procesos (Redis
+    pub/sub, Postgres LISTEN/NOTIFY...) implementa estos tres métodos y se
+    activa con settings.CHAT_BROKER.
+    """
+
+    def publish(self, canal, payload):
+        raise NotImplementedError
+
+    def subscribe(self, canales):
+        raise NotImplementedError
+
+    def unsubscribe(self, queue):
+        raise NotImplementedError
+
+
+class InProcessBroker(BaseBroker):
+    """Broker en memoria: solo entrega a conexiones del mismo proceso.
+
+    Sirve cuando el API y los WebSockets corren en el mismo worker ASGI.
+    """
+
+    def __init__(self, queue_size=100):
+        self._queue_size = queue_size
+        self._canales = {}
+        self._lock = threading.Lock()
+
+    def publish(self, canal, payload):
+        with self._lock:
+            suscriptores = list(self._canales.get(canal, ()))
+        for loop, queue in suscriptores:
+            loop.call_soon_threadsafe(self._encolar, queue, payload)
+
+    @staticmethod
+    def _encolar(queue, payload):
+        if queue.full():
+            # Cliente lento: se descarta lo más viejo, nunca se bloquea al que publica
+            queue.get_nowait()
+        queue.put_nowait(payload)
+
+    def subscribe(self, canales):
+        queue = asyncio.Queue(maxsize=self._queue_size)
+        queue.canales = list(canales)
+        entrada = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            for canal in queue.canales:
+                self._canales.setdefault(canal, set()).add(entrada)
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            for canal in queue.canales:
+                suscriptores = self._canales.get(canal, set())
+                suscriptores.difference_update({e for e in suscriptores if e[1] is queue})
+                if not suscriptores:
+                    self._canales.pop(canal, None)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(settings.CHAT_BROKER)()
+
+
+def publicar_mensaje(mensaje, payload):
+    broker = get_broker()
+    for canal in canales_de_mensaje(mensaje):
+        broker.publish(canal, payload)
+
+
+# ==========================================
+# 2. WEBSOCKET /ws/chat/
+# ==========================================
+# Handler ASGI puro (sin Channels): cada conexión es una corrutina que espera
+# en su cola, así miles de conexiones inactivas no ocupan hilos.
+#
+#   ws://host/ws/chat/?token=<token>               -> mensajes del cliente (request.user)
+#   ws://host/ws/chat/?token=<token>&vendedor=<id> -> además los de un vendedor (solo staff)
+
+def _autenticar(token):
+    from rest_framework.exceptions import AuthenticationFailed
+    from .authentication import CachedTokenAuthentication
+
+    try:
+        user, _ = CachedTokenAuthentication().authenticate_credentials(token)
+    except AuthenticationFailed:
+        return None
+    return user
+
+
+async def chat_websocket(scope, receive, send):
+    evento = await receive()
+    if evento['type'] != 'websocket.connect':
+        return
+
+    params = parse_qs(scope.get('query_string', b'').decode())
+    token = params.get('token', [None])[0]
+    user = await sync_to_async(_autenticar)(token) if token else None
+    if user is None:
+        await send({'type': 'websocket.close', 'code': 4401})
+        return
+
+    canales = [f'cliente:{user.pk}']
+    vendedor = params.get('vendedor', [None])[0]
+    if vendedor:
+        if not user.is_staff or not vendedor.isdigit():
+            await send({'type': 'websocket.close', 'code': 4403})
+            return
+        canales.append(f'vendedor:{vendedor}')
+
+    broker = get_broker()
+    queue = broker.subscribe(canales)
+    await send({'type': 'websocket.accept'})
+    recibir = asyncio.ensure_future(receive())
+    try:
+        while True:
+            siguiente = asyncio.ensure_future(queue.get())
+            hecho, _ = await asyncio.wait({recibir, siguiente}, return_when=asyncio.FIRST_COMPLETED)
+            if siguiente in hecho:
+                await send({'type': 'websocket.send', 'text': json.dumps(siguiente.result())})
+            else:
+                siguiente.cancel()
+            if recibir in hecho:
+                if recibir.result()['type'] == 'websocket.disconnect':
+                    break
+                # Los mensajes se envían por POST /api/mensajes/; lo entrante se ignora
+                recibir = asyncio.ensure_future(receive())
+    finally:
+        recibir.cancel()
+        broker.unsubscribe(queue)
+
+
+async def websocket_application(scope, receive, send):
+    if scope['path'].rstrip('/') == '/ws/chat':
+        return await chat_websocket(scope, receive, send)
+    await receive()
+    await send({'type': 'websocket.close', 'code': 4404})
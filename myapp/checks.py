@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.cache import InvalidCacheBackendError
+from django.core.checks import Error, Tags, register
+
+from .cache import es_cache_compartido
+
+
+# ==========================================
+# SYSTEM CHECKS (manage.py check / arranque)
+# ==========================================
+@register(Tags.caches, Tags.database)
+def revisar_cache_de_replicas(app_configs, **kwargs):
+    """Con réplicas, REPLICA_PIN_CACHE tiene que ser compartido.
+
+    El pin que fija una sesión al primario después de escribir lo pone el
+    worker que atendió la escritura; si el cache es por proceso, el siguiente
+    GET puede caer en otro worker, leer de la réplica y no ver lo escrito.
+    """
+    if not settings.DATABASE_REPLICAS:
+        return []
+    alias = settings.REPLICA_PIN_CACHE
+    try:
+        compartido = es_cache_compartido(alias)
+    except InvalidCacheBackendError:
+        compartido = False
+    if compartido:
+        return []
+    return [Error(
+        f'REPLICA_PIN_CACHE ({alias!r}) no es un cache compartido entre workers.',
+        hint='Configure en CACHES un backend compartido (Redis, Memcached o DatabaseCache) '
+             'y apunte REPLICA_PIN_CACHE a ese alias.',
+        id='myapp.E001',
+    )]
@@ -0,0 +1,80 @@
+import gzip
+
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # dependencia opcional: sin ella solo gzip
+    brotli = None
+
+
+# ==========================================
+# COMPRESIÓN DE RESPUESTAS (brotli / gzip)
+# ==========================================
+def _calidades(accept_encoding):
+    """`'br;q=1, gzip;q=0.8'` -> `{'br': 1.0, 'gzip': 0.8}`."""
+    calidades = {}
+    for parte in accept_encoding.split(','):
+        codificacion, _, parametros = parte.strip().partition(';')
+        q = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith('q='):
+            try:
+                q = float(parametros[2:])
+            except ValueError:
+                q = 0.0
+        if codificacion:
+            calidades[codificacion.strip().lower()] = q
+    return calidades
+
+
+def elegir_codificacion(accept_encoding):
+    """'br', 'gzip' o None según lo que acepta el cliente (brotli gana en empate)."""
+    calidades = _calidades(accept_encoding)
+    opciones = [('gzip', calidades.get('gzip', 0.0))]
+    if brotli is not None:
+        opciones.append(('br', calidades.get('br', 0.0)))
+    codificacion, q = max(opciones, key=lambda opcion: (opcion[1], opcion[0] == 'br'))
+    return codificacion if q > 0 else None
+
+
+def comprimir(contenido, codificacion):
+    config = settings.RESPONSE_COMPRESSION
+    if codificacion == 'br':
+        return brotli.compress(contenido, quality=config['BROTLI_QUALITY'])
+    return gzip.compress(contenido, compresslevel=config['GZIP_LEVEL'], mtime=0)
+
+
+class CompresionMiddleware(GZipMiddleware):
+    """GZipMiddleware con brotli, nivel configurable y umbral de tamaño.
+
+    - Solo comprime respuestas de al menos MIN_BYTES (por debajo no compensa
+      y se evita comprimir respuestas chicas con secretos, como el login).
+    - Negocia `br` o `gzip` con Accept-Encoding (respetando `q=`).
+    - Las respuestas en streaming (exportar) siguen con el gzip de Django.
+    """
+
+    def process_response(self, request, response):
+        if response.streaming:
+            return super().process_response(request, response)
+        if response.has_header('Content-Encoding') or len(response.content) < settings.RESPONSE_COMPRESSION['MIN_BYTES']:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        codificacion = elegir_codificacion(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if codificacion is None:
+            return response
+        comprimido = comprimir(response.content, codificacion)
+        if len(comprimido) >= len(response.content):
+            return response
+
+        response.content = comprimido
+        response.headers['Content-Length'] = str(len(comprimido))
+        # Como en GZipMiddleware: el ETag fuerte pasa a débil (RFC 9110 8.8.1)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = codificacion
+        return response
@@ -0,0 +1,123 @@
+import hashlib
+
+from django.db import transaction
+from django.db.models import Count, F, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .models import VersionListado
+
+
+# ==========================================
+# GET CONDICIONAL (ETag / Last-Modified)
+# ==========================================
+def make_etag(request, serializer_class, fingerprint):
+    partes = [
+        request.get_full_path(),
+        f'{serializer_class.__module__}.{serializer_class.__qualname__}',
+        str(getattr(serializer_class, 'cache_version', 1)),
+        fingerprint,
+    ]
+    return '"%s"' % hashlib.md5('|'.join(partes).encode()).hexdigest()
+
+
+def validar_condicional(request, etag, last_modified):
+    """Devuelve `(respuesta_304_o_None, timestamp)` para los validadores dados."""
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp), timestamp
+
+
+def agregar_validadores(response, etag, timestamp):
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+    return response
+
+
+# ==========================================
+# VERSIONES DE LISTADOS
+# ==========================================
+# MAX(updated_at) no ve los borrados ni las filas que salen de un filtro, y el
+# COUNT(*) que lo complementaba recorre todo el listado en cada GET. En su
+# lugar cada listado tiene un contador en la base (VersionListado) que suben
+# las señales de Producto y las cargas masivas.
+
+def version_listado(nombre):
+    return VersionListado.objects.filter(pk=nombre).values_list('version', flat=True).first() or 0
+
+
+def _incrementar(nombres):
+    VersionListado.objects.bulk_create([VersionListado(nombre=n) for n in nombres], ignore_conflicts=True)
+    for nombre in nombres:
+        VersionListado.objects.filter(pk=nombre).update(version=F('version') + 1)
+
+
+def subir_versiones(*nombres):
+    """Incrementa los contadores de `nombres` al confirmar la transacción en curso.
+
+    Fuera de la transacción de la escritura: dentro, el UPDATE de la fila
+    'productos' la dejaría bloqueada hasta el commit y todas las escrituras
+    del catálogo (importación, checkout...) se harían de a una. Después del
+    commit cada UPDATE va en autocommit y suelta el bloqueo enseguida; un
+    GET entre el commit y el incremento puede dar un 304 viejo una vez.
+    Filas en orden fijo para no provocar deadlocks.
+    """
+    nombres = sorted(set(nombres))
+    if nombres:
+        transaction.on_commit(lambda: _incrementar(nombres))
+
+
+class ConditionalGetMixin:
+    """Responde 304 Not Modified en `list` y `retrieve` sin serializar nada.
+
+    Los validadores salen de consultas baratas y no del cuerpo de la respuesta:
+    - list: la versión del listado (`get_version_listado()`) y `MAX(updated_at)`
+      del queryset ya filtrado; sin versión, `COUNT(*)` y `MAX(updated_at)`.
+    - retrieve: el `updated_at` de la fila pedida.
+
+    Las vistas sin columna `updated_at` sobrescriben `get_list_validators` /
+    `get_object_validators` y devuelven `(fingerprint, last_modified)`.
+    """
+    updated_field = 'updated_at'
+    version_listado = None
+
+    def get_version_listado(self):
+        return self.version_listado
+
+    def get_list_validators(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        nombre = self.get_version_listado()
+        if nombre is None:
+            resumen = queryset.aggregate(total=Count('pk'), ultimo=Max(self.updated_field))
+            return f"{resumen['total']}:{resumen['ultimo']}", resumen['ultimo']
+        ultimo = queryset.aggregate(ultimo=Max(self.updated_field))['ultimo']
+        return f'v{version_listado(nombre)}:{ultimo}', ultimo
+
+    def get_object_validators(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        filtro = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        ultimo = (
+            self.get_queryset().model.objects.filter(**filtro)
+            .values_list(self.updated_field, flat=True).first()
+        )
+        if ultimo is None:
+            return None, None
+        return str(ultimo), ultimo
+
+    def conditional_response(self, handler, get_validators, request, *args, **kwargs):
+        fingerprint, last_modified = get_validators()
+        if fingerprint is None:
+            return handler(request, *args, **kwargs)
+
+        etag = make_etag(request, self.get_serializer_class(), fingerprint)
+        response, timestamp = validar_condicional(request, etag, last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        return agregar_validadores(response, etag, timestamp)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, self.get_list_validators, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, self.get_object_validators, request, *args, **kwargs)
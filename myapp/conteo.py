@@ -0,0 +1,102 @@
+import json
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections, transaction
+
+from .cache import es_cache_compartido
+
+
+# ==========================================
+# CONTEO BARATO PARA LOS LISTADOS PAGINADOS
+# ==========================================
+# Un COUNT(*) exacto recorre todas las filas que cumplen el filtro: en tablas
+# grandes cuesta más que la página misma. La estrategia, de más barata a más
+# cara:
+#   1. Sin filtros: la estimación de PostgreSQL (`pg_class.reltuples`, la
+#      actualizan ANALYZE y autovacuum). No es parte del ETag (ver
+#      myapp.conditional): un 304 puede conservar una estimación vieja.
+#   2. Con filtros: COUNT exacto pero con LIMIT umbral + 1; si se pasa, la
+#      estimación del planificador (EXPLAIN).
+#   3. Por debajo del umbral siempre es exacto.
+# Las vistas con un total precalculado (conversaciones, facetas) o cacheado
+# (categorías) lo devuelven en `get_conteo()`.
+
+class Conteo(NamedTuple):
+    total: int
+    exacto: bool
+
+
+def _postgres(queryset):
+    return connections[queryset.db].vendor == 'postgresql'
+
+
+def estimar_tabla(model, using):
+    """Filas estimadas de la tabla de `model`, o None si nunca se analizó."""
+    with connections[using].cursor() as cursor:
+        cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [model._meta.db_table])
+        fila = cursor.fetchone()
+    # reltuples = -1: tabla sin ANALYZE todavía
+    return fila[0] if fila and fila[0] >= 0 else None
+
+
+def estimar_consulta(queryset):
+    """Filas que el planificador espera para `queryset` (EXPLAIN, sin ejecutarlo)."""
+    plan = json.loads(queryset.explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def contar(queryset):
+    """`Conteo` de `queryset` según la estrategia de arriba."""
+    umbral = settings.LIST_COUNT['EXACT_THRESHOLD']
+    queryset = queryset.order_by()
+    postgres = _postgres(queryset)
+
+    if postgres and not queryset.query.where:
+        estimado = estimar_tabla(queryset.model, queryset.db)
+        if estimado is not None and estimado > umbral:
+            return Conteo(estimado, False)
+
+    if not postgres or umbral <= 0:
+        return Conteo(queryset.count(), True)
+    # Solo la clave en la subconsulta: el LIMIT no necesita leer las demás columnas
+    total = queryset.values('pk')[:umbral + 1].count()
+    if total <= umbral:
+        return Conteo(total, True)
+    return Conteo(max(estimar_consulta(queryset), total), False)
+
+
+# ==========================================
+# CONTEOS CACHEADOS (p. ej. productos por categoría)
+# ==========================================
+def _clave(nombre):
+    return f'conteo:{nombre}'
+
+
+def contar_cacheado(nombre, queryset):
+    """COUNT exacto guardado en cache hasta que se invalide `nombre` (o expire).
+
+    Solo con un cache compartido (myapp.cache.es_cache_compartido): con uno
+    por proceso, la invalidación de un worker no llegaría a los demás y cada
+    uno serviría su total viejo. Si no, cuenta con `contar`.
+    """
+    alias = settings.LIST_COUNT['CACHE_ALIAS']
+    if not es_cache_compartido(alias):
+        return contar(queryset)
+    cache = caches[alias]
+    total = cache.get(_clave(nombre))
+    if total is None:
+        total = queryset.order_by().count()
+        cache.set(_clave(nombre), total, settings.LIST_COUNT['CACHE_TIMEOUT'])
+    return Conteo(total, True)
+
+
+def invalidar_conteos(*nombres):
+    """Borra los totales cacheados al confirmar la transacción en curso.
+
+    Antes del commit otro request podría volver a cachear el total viejo (aún
+    no ve la escritura) y quedaría hasta CACHE_TIMEOUT.
+    """
+    claves = [_clave(nombre) for nombre in nombres]
+    transaction.on_commit(lambda: caches[settings.LIST_COUNT['CACHE_ALIAS']].delete_many(claves))
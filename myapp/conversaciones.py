@@ -0,0 +1,138 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Conversacion, Mensaje
+
+LARGO_RESUMEN = Conversacion._meta.get_field('ultimo_texto').max_length
+
+
+# ==========================================
+# 1. ACTUALIZACIÓN INCREMENTAL
+# ==========================================
+def aplicar_mensaje(conversacion, mensaje):
+    """Suma `mensaje` al resumen en memoria (no guarda).
+
+    Es la única regla del resumen: la usan tanto la señal de Mensaje como la
+    reconstrucción, así que las dos llegan siempre al mismo resultado.
+    Quien escribe ya leyó todo lo anterior de la conversación.
+    """
+    conversacion.total_mensajes += 1
+    if conversacion.ultimo_mensaje_id is None or mensaje.fecha >= conversacion.ultima_fecha:
+        conversacion.ultimo_mensaje_id = mensaje.pk
+        conversacion.ultimo_texto = mensaje.texto[:LARGO_RESUMEN]
+        conversacion.ultimo_es_vendedor = mensaje.es_vendedor
+        conversacion.ultima_fecha = mensaje.fecha
+
+    if mensaje.es_vendedor:
+        if conversacion.cliente_leido_hasta is None or mensaje.fecha > conversacion.cliente_leido_hasta:
+            conversacion.no_leidos_cliente += 1
+        conversacion.vendedor_leido_hasta = _max(conversacion.vendedor_leido_hasta, mensaje.fecha)
+        conversacion.no_leidos_vendedor = 0
+    else:
+        if conversacion.vendedor_leido_hasta is None or mensaje.fecha > conversacion.vendedor_leido_hasta:
+            conversacion.no_leidos_vendedor += 1
+        conversacion.cliente_leido_hasta = _max(conversacion.cliente_leido_hasta, mensaje.fecha)
+        conversacion.no_leidos_cliente = 0
+    return conversacion
+
+
+def _max(actual, fecha):
+    return fecha if actual is None or fecha > actual else actual
+
+
+def registrar_mensaje(mensaje):
+    """Actualiza el resumen de la conversación de un Mensaje recién creado.
+
+    La fila se bloquea con SELECT ... FOR UPDATE, así dos mensajes simultáneos
+    de la misma conversación no pierden incrementos. Va en la misma transacción
+    que el INSERT del mensaje.
+    """
+    with transaction.atomic():
+        conversacion, _ = Conversacion.objects.select_for_update().get_or_create(
+            vendedor_id=mensaje.vendedor_id,
+            cliente_id=mensaje.cliente_id,
+            producto_id=mensaje.producto_id,
+            defaults={'ultima_fecha': mensaje.fecha},
+        )
+        aplicar_mensaje(conversacion, mensaje)
+        conversacion.save()
+
+
+def actualizar_texto(mensaje):
+    """Si se edita el último mensaje, el resumen muestra el texto nuevo."""
+    Conversacion.objects.filter(ultimo_mensaje_id=mensaje.pk).update(
+        ultimo_texto=mensaje.texto[:LARGO_RESUMEN],
+    )
+
+
+def marcar_leida(conversacion, lado):
+    """Deja en cero los no leídos de `lado` ('cliente' o 'vendedor')."""
+    setattr(conversacion, f'{lado}_leido_hasta', timezone.now())
+    setattr(conversacion, f'no_leidos_{lado}', 0)
+    conversacion.save(update_fields=[f'{lado}_leido_hasta', f'no_leidos_{lado}'])
+
+
+# ==========================================
+# 2. RECONSTRUCCIÓN
+# ==========================================
+def _clave(objeto):
+    return (objeto.vendedor_id, objeto.cliente_id, objeto.producto_id)
+
+
+def reconstruir_conversaciones(vendedor_ids):
+    """Recalcula desde Mensaje los resúmenes de los vendedores indicados.
+
+    Recorre sus mensajes en orden cronológico con `iterator()` y les aplica
+    `aplicar_mensaje`. Conserva las marcas de lectura ya guardadas (los
+    mensajes no registran si se leyeron) y borra las conversaciones que ya no
+    tienen mensajes. Devuelve cuántas conversaciones quedaron.
+    """
+    with transaction.atomic():
+        existentes = {
+            _clave(c): c
+            for c in Conversacion.objects.select_for_update().filter(vendedor_id__in=vendedor_ids)
+        }
+        resumenes = {}
+        mensajes = (
+            Mensaje.objects.filter(vendedor_id__in=vendedor_ids)
+            .only('pk', 'vendedor_id', 'cliente_id', 'producto_id', 'texto', 'fecha', 'es_vendedor')
+            .order_by('fecha', 'pk')
+            .iterator(chunk_size=2000)
+        )
+        for mensaje in mensajes:
+            clave = _clave(mensaje)
+            conversacion = resumenes.get(clave)
+            if conversacion is None:
+                anterior = existentes.get(clave)
+                conversacion = resumenes[clave] = Conversacion(
+                    vendedor_id=mensaje.vendedor_id,
+                    cliente_id=mensaje.cliente_id,
+                    producto_id=mensaje.producto_id,
+                    ultima_fecha=mensaje.fecha,
+                    cliente_leido_hasta=anterior.cliente_leido_hasta if anterior else None,
+                    vendedor_leido_hasta=anterior.vendedor_leido_hasta if anterior else None,
+                )
+            aplicar_mensaje(conversacion, mensaje)
+
+        Conversacion.objects.filter(vendedor_id__in=vendedor_ids).delete()
+        Conversacion.objects.bulk_create(resumenes.values(), batch_size=1000)
+    return len(resumenes)
+
+
+def recalcular_conversacion(vendedor_id, cliente_id, producto_id):
+    """Recalcula una sola conversación (al borrar un mensaje o su producto)."""
+    filtro = {'vendedor_id': vendedor_id, 'cliente_id': cliente_id, 'producto_id': producto_id}
+    with transaction.atomic():
+        anterior = Conversacion.objects.select_for_update().filter(**filtro).first()
+        conversacion = Conversacion(
+            pk=anterior.pk if anterior else None,
+            cliente_leido_hasta=anterior.cliente_leido_hasta if anterior else None,
+            vendedor_leido_hasta=anterior.vendedor_leido_hasta if anterior else None,
+            **filtro,
+        )
+        for mensaje in Mensaje.objects.filter(**filtro).order_by('fecha', 'pk').iterator():
+            aplicar_mensaje(conversacion, mensaje)
+        if conversacion.total_mensajes:
+            conversacion.save()
+        elif anterior is not None:
+            anterior.delete()
@@ -0,0 +1,147 @@
+import hashlib
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Estado del request en curso: {'usar_replica': bool, 'escribio': bool}.
+# Fuera de un request (comandos, workers, WebSockets) es None y todo va al primario.
+_estado = ContextVar('replica_estado', default=None)
+
+
+# ==========================================
+# 1. ROUTER
+# ==========================================
+def _en_transaccion():
+    # Dentro de una transacción se lee del primario (consistencia y locks)
+    return connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+
+class ReplicaRouter:
+    """Manda las lecturas de los requests de solo lectura a una réplica.
+
+    Sin DATABASE_REPLICAS configuradas no hace nada (todo va a 'default').
+    """
+
+    def db_for_read(self, model, **hints):
+        estado = _estado.get()
+        if not estado or not estado['usar_replica'] or not settings.DATABASE_REPLICAS:
+            return None
+        if _en_transaccion():
+            return None
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        estado = _estado.get()
+        if estado:
+            # Lo que se lea después en este request debe ver la escritura
+            estado['usar_replica'] = False
+            estado['escribio'] = True
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplicas y primario tienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+# ==========================================
+# 2. MIDDLEWARE (MÉTODO HTTP + STICKINESS)
+# ==========================================
+def _clave_sesion(request):
+    """Identifica al cliente por sus credenciales (token, X-User-Id o cookie de sesión)."""
+    credencial = (
+        request.headers.get('Authorization')
+        or request.headers.get('X-User-Id')
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    )
+    if not credencial:
+        return None
+    return 'replica-pin:' + hashlib.sha256(credencial.encode()).hexdigest()
+
+
+class ReplicaRoutingMiddleware:
+    """Decide por request si las lecturas pueden ir a una réplica.
+
+    - Solo GET/HEAD/OPTIONS; una vista puede excluirse con `usar_replica = False`.
+    - Después de escribir, la sesión queda fijada al primario por
+      REPLICA_STICKY_SECONDS para que lea lo que acaba de escribir aunque la
+      réplica vaya atrasada.
+
+    Funciona en modo sync y async: bajo ASGI no obliga a las vistas async a
+    saltar a un hilo.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            self.process_view = self._aprocess_view
+
+    def _iniciar(self, request, fijado):
+        return {'usar_replica': request.method in SAFE_METHODS and not fijado, 'escribio': False}
+
+    @staticmethod
+    def _debe_fijar(request, clave, estado):
+        return clave is not None and (estado['escribio'] or request.method not in SAFE_METHODS)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        pines = caches[settings.REPLICA_PIN_CACHE]
+        clave = _clave_sesion(request)
+        estado = self._iniciar(request, clave is not None and pines.get(clave) is not None)
+        token = _estado.set(estado)
+        try:
+            response = self.get_response(request)
+        finally:
+            _estado.reset(token)
+
+        if self._debe_fijar(request, clave, estado):
+            pines.set(clave, 1, settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return await self.get_response(request)
+
+        pines = caches[settings.REPLICA_PIN_CACHE]
+        clave = _clave_sesion(request)
+        estado = self._iniciar(request, clave is not None and await pines.aget(clave) is not None)
+        token = _estado.set(estado)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _estado.reset(token)
+
+        if self._debe_fijar(request, clave, estado):
+            await pines.aset(clave, 1, settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    @staticmethod
+    def _revisar_vista(view_func):
+        estado = _estado.get()
+        vista = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+        if estado and not getattr(vista, 'usar_replica', True):
+            estado['usar_replica'] = False
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self._revisar_vista(view_func)
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        self._revisar_vista(view_func)
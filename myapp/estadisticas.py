@@ -0,0 +1,133 @@
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Detalle, EstadisticaVendedor, Producto, UserProfile
+
+COMPLETADO = 'Completado'
+CAMPOS_VENTAS = ('unidades_vendidas', 'ingresos', 'pedidos_completados')
+
+
+# ==========================================
+# 1. ACTUALIZACIÓN INCREMENTAL
+# ==========================================
+def _ventas_por_vendedor(detalles):
+    """`{id_user: {'unidades_vendidas', 'ingresos', 'pedidos_completados'}}` de un queryset de Detalle."""
+    filas = detalles.values('producto__id_user').annotate(
+        unidades_vendidas=Sum('cantidad'),
+        ingresos=Sum(F('cantidad') * F('precio_unidad')),
+        pedidos_completados=Count('pedido_id', distinct=True),
+    )
+    return {
+        fila.pop('producto__id_user'): fila
+        for fila in filas
+        if fila['producto__id_user'] is not None
+    }
+
+
+def _incrementar(cambios):
+    """Suma `{id_user: {campo: delta}}` a las estadísticas con UPDATE ... SET campo = campo + delta.
+
+    El UPDATE es atómico en la base, así que dos pedidos simultáneos del mismo
+    vendedor no pierden incrementos. Las filas se tocan en orden de id_user
+    para no provocar deadlocks. `UserProfile.products_sold` queda como espejo
+    de `unidades_vendidas` (lo siguen leyendo los clientes del perfil).
+    """
+    cambios = {id_user: deltas for id_user, deltas in cambios.items() if id_user is not None and any(deltas.values())}
+    if not cambios:
+        return
+    ahora = timezone.now()
+    with transaction.atomic():
+        EstadisticaVendedor.objects.bulk_create(
+            [EstadisticaVendedor(id_user=id_user) for id_user in sorted(cambios)],
+            ignore_conflicts=True,
+        )
+        for id_user in sorted(cambios):
+            deltas = cambios[id_user]
+            EstadisticaVendedor.objects.filter(pk=id_user).update(
+                actualizado=ahora,
+                **{campo: F(campo) + delta for campo, delta in deltas.items()},
+            )
+            if deltas.get('unidades_vendidas'):
+                UserProfile.objects.filter(user_id=id_user).update(
+                    products_sold=Coalesce(F('products_sold'), 0) + deltas['unidades_vendidas'],
+                )
+
+
+def sumar_productos(conteo):
+    """`{id_user: n}` productos publicados (n negativo al borrar)."""
+    _incrementar({id_user: {'productos_publicados': n} for id_user, n in conteo.items()})
+
+
+def registrar_pedido(pedido_id, signo):
+    """Suma (`signo=1`) o resta (`signo=-1`) las ventas de un pedido a sus vendedores.
+
+    Se llama cuando el pedido entra o sale del estado Completado.
+    """
+    ventas = _ventas_por_vendedor(Detalle.objects.filter(pedido_id=pedido_id))
+    _incrementar({
+        id_user: {campo: signo * valor for campo, valor in totales.items()}
+        for id_user, totales in ventas.items()
+    })
+
+
+def recalcular_vendedores_de(producto_ids):
+    """Recalcula a los vendedores de estos productos (cambió una línea de un pedido completado).
+
+    Es poco frecuente (las líneas se crean con el checkout, antes de completar),
+    así que no vale la pena llevar el delta exacto.
+    """
+    vendedores = (
+        Producto.objects.filter(pk__in=producto_ids)
+        .exclude(id_user=None)
+        .values_list('id_user', flat=True)
+        .distinct()
+    )
+    recalcular_estadisticas(list(vendedores))
+
+
+# ==========================================
+# 2. RECÁLCULO POR LOTES
+# ==========================================
+def recalcular_estadisticas(id_users):
+    """Recalcula desde Producto/Detalle las estadísticas de los vendedores indicados.
+
+    Son dos consultas agregadas (productos y ventas) y un upsert. Deja
+    `UserProfile.products_sold` igual a `unidades_vendidas`. Devuelve cuántos
+    vendedores se recalcularon.
+    """
+    id_users = sorted(set(id_users))
+    if not id_users:
+        return 0
+    productos = dict(
+        Producto.objects.filter(id_user__in=id_users)
+        .values('id_user')
+        .annotate(n=Count('pk'))
+        .values_list('id_user', 'n')
+    )
+    ventas = _ventas_por_vendedor(
+        Detalle.objects.filter(producto__id_user__in=id_users, pedido__estado=COMPLETADO)
+    )
+    filas = [
+        EstadisticaVendedor(
+            id_user=id_user,
+            productos_publicados=productos.get(id_user, 0),
+            **ventas.get(id_user, dict.fromkeys(CAMPOS_VENTAS, 0)),
+        )
+        for id_user in id_users
+    ]
+    with transaction.atomic():
+        EstadisticaVendedor.objects.bulk_create(
+            filas,
+            update_conflicts=True,
+            unique_fields=['id_user'],
+            update_fields=['productos_publicados', *CAMPOS_VENTAS, 'actualizado'],
+        )
+        UserProfile.objects.filter(user_id__in=id_users).update(
+            products_sold=Coalesce(
+                Subquery(EstadisticaVendedor.objects.filter(pk=OuterRef('user_id')).values('unidades_vendidas')),
+                Value(0),
+            ),
+        )
+    return len(filas)
@@ -0,0 +1,125 @@
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, connection, transaction
+from PIL import Image, ImageOps
+
+from .models import Producto, ImagenProducto
+
+logger = logging.getLogger(__name__)
+
+
+# ==========================================
+# 1. POOL DE WORKERS
+# ==========================================
+# Las subidas se leen en memoria dentro del request y el procesamiento
+# (Pillow + guardar en S3/GCS) corre en un pool de hilos del proceso, después
+# del commit. Un reinicio del worker pierde los trabajos que estaban en cola.
+
+@lru_cache(maxsize=None)
+def get_executor():
+    return ThreadPoolExecutor(
+        max_workers=settings.IMAGE_PROCESSING['WORKERS'],
+        thread_name_prefix='imagenes',
+    )
+
+
+def _ejecutar(tarea, *args):
+    if settings.IMAGE_PROCESSING['SYNC']:
+        tarea(*args)
+    else:
+        get_executor().submit(_en_hilo, tarea, *args)
+
+
+def _en_hilo(tarea, *args):
+    close_old_connections()
+    try:
+        tarea(*args)
+    except Exception:
+        logger.exception('Error procesando imagen de producto')
+    finally:
+        # Los hilos no deben quedarse con una conexión abierta cada uno
+        connection.close()
+
+
+def encolar_imagenes_producto(producto, imagen_principal=None, galeria=()):
+    """Lee las subidas y las manda al pool cuando la transacción hace commit."""
+    trabajos = []
+    if imagen_principal is not None:
+        trabajos.append((procesar_imagen_principal, producto.pk, imagen_principal.read()))
+    for archivo in galeria:
+        trabajos.append((procesar_imagen_galeria, producto.pk, archivo.read()))
+
+    def enviar():
+        for tarea, *args in trabajos:
+            _ejecutar(tarea, *args)
+
+    if trabajos:
+        transaction.on_commit(enviar)
+
+
+# ==========================================
+# 2. PROCESAMIENTO CON PILLOW
+# ==========================================
+def _guardar(storage, nombre, imagen, formato):
+    buffer = BytesIO()
+    opciones = {'quality': settings.IMAGE_PROCESSING['QUALITY']}
+    if formato == 'JPEG':
+        opciones.update(optimize=True, progressive=True)
+    # Pillow no copia el EXIF si no se le pasa `exif=`: la imagen sale limpia
+    imagen.save(buffer, formato, **opciones)
+    return storage.save(nombre, ContentFile(buffer.getvalue()))
+
+
+def procesar_imagen(field, contenido):
+    """Re-codifica la imagen sin EXIF y genera miniaturas WebP/JPEG.
+
+    Devuelve `(nombre_guardado, variantes)` donde `variantes` es
+    `{"320": {"webp": ruta, "jpeg": ruta}, ...}`.
+    """
+    config = settings.IMAGE_PROCESSING
+    with Image.open(BytesIO(contenido)) as original:
+        # Aplicamos la orientación del EXIF antes de descartarlo
+        imagen = ImageOps.exif_transpose(original).convert('RGB')
+
+    if imagen.width > config['MAX_WIDTH']:
+        imagen = ImageOps.contain(imagen, (config['MAX_WIDTH'], imagen.height))
+
+    nombre = field.generate_filename(None, f'{uuid.uuid4().hex}.jpg')
+    nombre = _guardar(field.storage, nombre, imagen, 'JPEG')
+    base, _ = os.path.splitext(nombre)
+
+    variantes = {}
+    for ancho in config['WIDTHS']:
+        if ancho >= imagen.width:
+            continue
+        miniatura = ImageOps.contain(imagen, (ancho, imagen.height))
+        variantes[str(ancho)] = {
+            'webp': _guardar(field.storage, f'{base}_{ancho}.webp', miniatura, 'WEBP'),
+            'jpeg': _guardar(field.storage, f'{base}_{ancho}.jpg', miniatura, 'JPEG'),
+        }
+    return nombre, variantes
+
+
+def procesar_imagen_galeria(producto_id, contenido):
+    if not Producto.objects.filter(pk=producto_id).exists():
+        return
+    nombre, variantes = procesar_imagen(ImagenProducto._meta.get_field('imagen'), contenido)
+    # create() dispara las señales (updated_at del producto y cache)
+    ImagenProducto.objects.create(producto_id=producto_id, imagen=nombre, variantes=variantes)
+
+
+def procesar_imagen_principal(producto_id, contenido):
+    producto = Producto.objects.filter(pk=producto_id).defer('search_vector').first()
+    if producto is None:
+        return
+    nombre, variantes = procesar_imagen(Producto._meta.get_field('image'), contenido)
+    producto.image = nombre
+    producto.image_variantes = variantes
+    producto.save(update_fields=['image', 'image_variantes', 'updated_at'])
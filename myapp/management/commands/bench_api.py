@@ -0,0 +1,198 @@
+import json
+import subprocess
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.pagination import Cursor
+from rest_framework.test import APIClient
+
+from myapp.benchmarks import contar_consultas, resumen_latencias
+from myapp.cache import get_response_cache
+from myapp.models import Categoria, Detalle, Mensaje, Pedido, Producto, Vendedor
+from myapp.pagination import ProductoCursorPagination
+from myapp.views import LoginAPIView
+
+from .generar_datos import PASSWORD, PREFIJO
+
+ENDPOINTS = {
+    'productos': 'GET /api/productos/',
+    'productos_profundo': 'GET /api/productos/?cursor=<mitad del catálogo>',
+    'productos_busqueda': 'GET /api/productos/?search=camisa',
+    'por_categoria': 'GET /api/productos/por_categoria/<categoría>/',
+    'pedidos': 'GET /api/pedidos/',
+    'mensajes': 'GET /api/mensajes/?vendedor=<id>',
+    'login': 'POST /api/login/',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark en proceso de los endpoints principales (APIClient, sin red): '
+        'requests/s, latencias p50/p95/p99 y consultas SQL por endpoint, en JSON. '
+        'Usar sobre los datos de generar_datos; --comparar contrasta con una corrida anterior.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', action='append', choices=sorted(ENDPOINTS), help='Por defecto, todos.')
+        parser.add_argument('--iteraciones', type=int, default=100)
+        parser.add_argument('--calentamiento', type=int, default=5, help='Requests previos sin medir.')
+        parser.add_argument(
+            '--max-segundos', type=float, default=60,
+            help='Corta un endpoint que tarde más que esto (p. ej. listados sin paginar).',
+        )
+        parser.add_argument(
+            '--cache', action='store_true',
+            help='Dejar activo el cache de respuestas (por defecto se desactiva para medir la consulta real).',
+        )
+        parser.add_argument('--salida', help='Guardar el JSON en este archivo además de imprimirlo.')
+        parser.add_argument('--comparar', help='JSON de una corrida anterior para calcular ratios.')
+
+    def handle(self, *args, **options):
+        anterior = None
+        if options['comparar']:
+            with open(options['comparar']) as archivo:
+                anterior = json.load(archivo)
+
+        ajustes = {'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver']}
+        if not options['cache']:
+            ajustes['RESPONSE_CACHE'] = {**settings.RESPONSE_CACHE, 'BACKEND': 'none'}
+
+        get_response_cache.cache_clear()
+        try:
+            with override_settings(**ajustes), mock.patch.object(LoginAPIView, 'throttle_classes', []):
+                contexto = self.preparar()
+                resultados = {
+                    nombre: self.medir(nombre, contexto, options)
+                    for nombre in options['endpoint'] or ENDPOINTS
+                }
+        finally:
+            get_response_cache.cache_clear()
+
+        informe = {'meta': self.meta(options), 'endpoints': resultados}
+        if anterior is not None:
+            informe['comparacion'] = self.comparar(anterior.get('endpoints', {}), resultados)
+
+        texto = json.dumps(informe, indent=2, ensure_ascii=False)
+        if options['salida']:
+            with open(options['salida'], 'w') as archivo:
+                archivo.write(texto + '\n')
+        self.stdout.write(texto)
+
+    # --- preparación ---
+    def preparar(self):
+        """Elige los datos concretos que usa cada endpoint."""
+        User = get_user_model()
+        usuario = User.objects.filter(username__startswith=PREFIJO).order_by('pk').first()
+        if usuario is None:
+            raise CommandError('No hay datos de benchmark: ejecute primero generar_datos.')
+
+        categoria = (
+            Categoria.objects.filter(category_id__startswith=PREFIJO).order_by('pk').first()
+            or Categoria.objects.order_by('pk').first()
+        )
+        vendedor = Vendedor.objects.filter(nombre__startswith=PREFIJO).order_by('pk').first()
+
+        # Cursor a mitad del catálogo: con keyset debería costar lo mismo que la primera página
+        total = Producto.objects.count()
+        mitad = Producto.objects.order_by('product_id').values_list('pk', flat=True)[total // 2:total // 2 + 1]
+        paginador = ProductoCursorPagination()
+        paginador.base_url = '/api/productos/'
+        profundo = paginador.encode_cursor(Cursor(offset=0, reverse=False, position=mitad[0])) if total else None
+
+        return {
+            'usuario': usuario,
+            'categoria': categoria.pk if categoria else 'sin-categoria',
+            'vendedor': vendedor.pk if vendedor else 0,
+            'profundo': profundo or '/api/productos/',
+        }
+
+    def peticion(self, nombre, contexto):
+        """Devuelve `(cliente, método, ruta, datos)` para el endpoint."""
+        cliente = APIClient()
+        if nombre in ('pedidos', 'mensajes'):
+            cliente.force_authenticate(contexto['usuario'])
+        if nombre == 'login':
+            return cliente, 'post', '/api/login/', {'user': contexto['usuario'].username, 'password': PASSWORD}
+        rutas = {
+            'productos': '/api/productos/',
+            'productos_profundo': contexto['profundo'],
+            'productos_busqueda': '/api/productos/?search=camisa',
+            'por_categoria': f"/api/productos/por_categoria/{contexto['categoria']}/",
+            'pedidos': '/api/pedidos/',
+            'mensajes': f"/api/mensajes/?vendedor={contexto['vendedor']}",
+        }
+        return cliente, 'get', rutas[nombre], None
+
+    # --- medición ---
+    def medir(self, nombre, contexto, options):
+        cliente, metodo, ruta, datos = self.peticion(nombre, contexto)
+        llamar = getattr(cliente, metodo)
+        kwargs = {'data': datos, 'format': 'json'} if datos is not None else {}
+
+        for _ in range(options['calentamiento']):
+            llamar(ruta, **kwargs)
+
+        latencias, consultas, estados = [], [], {}
+        limite = time.monotonic() + options['max_segundos']
+        for _ in range(options['iteraciones']):
+            with contar_consultas() as contador:
+                t0 = time.perf_counter()
+                response = llamar(ruta, **kwargs)
+                latencias.append((time.perf_counter() - t0) * 1000)
+            consultas.append(contador[0])
+            estados[str(response.status_code)] = estados.get(str(response.status_code), 0) + 1
+            if time.monotonic() > limite:
+                break
+
+        resultado = {
+            'endpoint': ENDPOINTS[nombre],
+            **resumen_latencias(latencias, sum(latencias) / 1000),
+            'consultas_promedio': round(sum(consultas) / len(consultas), 1),
+            'consultas_max': max(consultas),
+            'bytes': len(response.content),
+            'estados': estados,
+        }
+        self.stderr.write(f"{nombre}: {resultado['rps']} req/s, p99 {resultado['p99_ms']} ms, "
+                          f"{resultado['consultas_promedio']} consultas")
+        return resultado
+
+    def meta(self, options):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'commit': commit,
+            'fecha': timezone.now().isoformat(timespec='seconds'),
+            'cache_respuestas': options['cache'],
+            'iteraciones': options['iteraciones'],
+            'datos': {
+                'productos': Producto.objects.count(),
+                'categorias': Categoria.objects.count(),
+                'pedidos': Pedido.objects.count(),
+                'detalles': Detalle.objects.count(),
+                'mensajes': Mensaje.objects.count(),
+            },
+        }
+
+    @staticmethod
+    def comparar(anterior, actual):
+        """Ratios actual/anterior por endpoint (rps > 1 es mejor; p99 < 1 es mejor)."""
+        comparacion = {}
+        for nombre, datos in actual.items():
+            base = anterior.get(nombre)
+            if not base:
+                continue
+            comparacion[nombre] = {
+                campo: round(datos[campo] / base[campo], 2) if base.get(campo) else None
+                for campo in ('rps', 'p50_ms', 'p99_ms', 'consultas_promedio')
+            }
+        return comparacion
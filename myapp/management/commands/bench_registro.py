@@ -0,0 +1,65 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import override_settings
+
+from myapp.serializers import RegisterSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Registra N usuarios con la misma parte local del correo (juan@d1, juan@d2, ...) '
+        'y mide tiempo y consultas por registro a medida que crecen las colisiones de username. '
+        'Todo se deshace al final salvo que se pase --keep.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=10000)
+        parser.add_argument('--local', default='bench', help='Parte local del correo.')
+        parser.add_argument('--lote', type=int, default=1000, help='Cada cuántos registros se reporta.')
+        parser.add_argument('--keep', action='store_true', help='No deshacer los usuarios creados.')
+        parser.add_argument(
+            '--hash-real', action='store_true',
+            help='Usar el hasher configurado (PBKDF2). Por defecto MD5 para medir solo la asignación.',
+        )
+
+    def handle(self, *args, **options):
+        hashers = None if options['hash_real'] else ['django.contrib.auth.hashers.MD5PasswordHasher']
+        with override_settings(**({'PASSWORD_HASHERS': hashers} if hashers else {})):
+            with transaction.atomic():
+                resultados = self.registrar(options)
+                if not options['keep']:
+                    transaction.set_rollback(True)
+        self.stdout.write(json.dumps(resultados, indent=2))
+
+    def registrar(self, options):
+        lotes = []
+        inicio_total = time.perf_counter()
+        for desde in range(0, options['usuarios'], options['lote']):
+            hasta = min(desde + options['lote'], options['usuarios'])
+            consultas = []
+            with connection.execute_wrapper(lambda execute, *a: consultas.append(1) or execute(*a)):
+                inicio = time.perf_counter()
+                for i in range(desde, hasta):
+                    serializer = RegisterSerializer(data={
+                        'user': f"{options['local']}@dominio{i}.com",
+                        'user_name': 'Usuario Bench',
+                        'password': 'clave-bench-123',
+                    })
+                    serializer.is_valid(raise_exception=True)
+                    serializer.save()
+                duracion = time.perf_counter() - inicio
+            cantidad = hasta - desde
+            lotes.append({
+                'registros': f'{desde + 1}-{hasta}',
+                'ms_por_registro': round(duracion * 1000 / cantidad, 3),
+                'consultas_por_registro': round(len(consultas) / cantidad, 2),
+            })
+            self.stderr.write(f"{hasta} registrados ({lotes[-1]['ms_por_registro']} ms/registro)")
+        return {
+            'usuarios': options['usuarios'],
+            'segundos_total': round(time.perf_counter() - inicio_total, 2),
+            'lotes': lotes,
+        }
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from myapp.benchmarks import resumen_latencias
+
+MODOS = {
+    'wsgi': ['api.wsgi'],
+    'asgi': ['api.asgi:application', '-k', 'uvicorn_worker.UvicornWorker'],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Prueba de carga HTTP: levanta gunicorn en modo WSGI (workers sync) y/o ASGI '
+        '(workers uvicorn) con la misma cantidad de workers, les manda GETs con N '
+        'conexiones keep-alive concurrentes y compara requests/s y latencias p50/p95/p99.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modo', choices=['wsgi', 'asgi', 'ambos'], default='ambos')
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--concurrencia', type=int, default=50, help='Conexiones simultáneas.')
+        parser.add_argument('--duracion', type=float, default=10, help='Segundos de medición por modo.')
+        parser.add_argument('--calentamiento', type=float, default=2, help='Segundos previos sin medir.')
+        parser.add_argument('--ruta', action='append', help='Rutas a pedir (rota entre ellas).')
+        parser.add_argument('--header', action='append', default=[], help='"Nombre: valor" (p. ej. Authorization).')
+        parser.add_argument('--puerto', type=int, default=8765)
+        parser.add_argument(
+            '--vistas-sync', action='store_true',
+            help='En modo ASGI usar las vistas DRF de siempre (ASYNC_VIEWS=0) para aislar su efecto.',
+        )
+        parser.add_argument('--url', help='Medir un servidor ya levantado en vez de arrancar gunicorn.')
+
+    def handle(self, *args, **options):
+        rutas = options['ruta'] or ['/api/productos/', '/api/categorias/']
+        headers = [h.split(':', 1) for h in options['header']]
+        if any(len(h) != 2 for h in headers):
+            raise CommandError('Los headers van como "Nombre: valor".')
+
+        resultados = {}
+        if options['url']:
+            partes = urlsplit(options['url'])
+            resultados['externo'] = self.medir(partes.hostname, partes.port or 80, rutas, headers, options)
+        else:
+            modos = ['wsgi', 'asgi'] if options['modo'] == 'ambos' else [options['modo']]
+            for modo in modos:
+                with self.servidor(modo, options):
+                    resultados[modo] = self.medir('127.0.0.1', options['puerto'], rutas, headers, options)
+                self.stderr.write(f'{modo}: {resultados[modo]}')
+
+        if 'wsgi' in resultados and 'asgi' in resultados:
+            wsgi, asgi = resultados['wsgi'], resultados['asgi']
+            resultados['asgi_vs_wsgi'] = {
+                'rps': round(asgi['rps'] / wsgi['rps'], 2) if wsgi['rps'] else None,
+                'p99_ms': round(asgi['p99_ms'] / wsgi['p99_ms'], 2) if wsgi['p99_ms'] else None,
+            }
+        self.stdout.write(json.dumps(resultados, indent=2))
+
+    # --- servidor ---
+    @contextmanager
+    def servidor(self, modo, options):
+        vistas_async = modo == 'asgi' and not options['vistas_sync']
+        proceso = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', *MODOS[modo],
+             '-w', str(options['workers']), '-b', f"127.0.0.1:{options['puerto']}",
+             '--log-level', 'warning'],
+            cwd=settings.BASE_DIR,
+            env=dict(os.environ, ASYNC_VIEWS='1' if vistas_async else '0'),
+        )
+        try:
+            self.esperar_puerto(options['puerto'], proceso)
+            yield proceso
+        finally:
+            proceso.send_signal(signal.SIGTERM)
+            proceso.wait(timeout=30)
+
+    @staticmethod
+    def esperar_puerto(puerto, proceso, timeout=30):
+        limite = time.monotonic() + timeout
+        while time.monotonic() < limite:
+            if proceso.poll() is not None:
+                raise CommandError('gunicorn terminó al arrancar (¿falta uvicorn-worker?).')
+            try:
+                socket.create_connection(('127.0.0.1', puerto), timeout=0.5).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f'gunicorn no abrió el puerto {puerto} en {timeout}s.')
+
+    # --- generador de carga ---
+    def medir(self, host, puerto, rutas, headers, options):
+        return asyncio.run(self._medir(host, puerto, rutas, headers, options))
+
+    async def _medir(self, host, puerto, rutas, headers, options):
+        extra = ''.join(f'{nombre.strip()}: {valor.strip()}\r\n' for nombre, valor in headers)
+        peticiones = [
+            f'GET {ruta} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n{extra}\r\n'.encode()
+            for ruta in rutas
+        ]
+        latencias, errores = [], {}
+        inicio = time.monotonic()
+        medir_desde = inicio + options['calentamiento']
+        fin = medir_desde + options['duracion']
+
+        async def cliente(numero):
+            lector = escritor = None
+            i = numero
+            while time.monotonic() < fin:
+                try:
+                    if escritor is None:
+                        lector, escritor = await asyncio.open_connection(host, puerto)
+                    t0 = time.perf_counter()
+                    escritor.write(peticiones[i % len(peticiones)])
+                    estado, seguir = await self._leer_respuesta(lector)
+                    ms = (time.perf_counter() - t0) * 1000
+                except (OSError, asyncio.IncompleteReadError, ValueError) as exc:
+                    estado, seguir, ms = type(exc).__name__, False, None
+                if time.monotonic() >= medir_desde:
+                    if estado == 200:
+                        latencias.append(ms)
+                    else:
+                        errores[str(estado)] = errores.get(str(estado), 0) + 1
+                if not seguir and escritor is not None:
+                    escritor.close()
+                    lector = escritor = None
+                i += 1
+            if escritor is not None:
+                escritor.close()
+
+        await asyncio.gather(*(cliente(n) for n in range(options['concurrencia'])))
+        return {**resumen_latencias(latencias, options['duracion']), 'errores': errores}
+
+    @staticmethod
+    async def _leer_respuesta(lector):
+        """Lee una respuesta HTTP/1.1 completa; devuelve `(status, keep_alive)`."""
+        linea = await lector.readuntil(b'\r\n')
+        estado = int(linea.split()[1])
+        largo, chunked, keep_alive = None, False, True
+        while True:
+            linea = await lector.readuntil(b'\r\n')
+            if linea == b'\r\n':
+                break
+            nombre, _, valor = linea.decode('latin-1').partition(':')
+            nombre, valor = nombre.strip().lower(), valor.strip().lower()
+            if nombre == 'content-length':
+                largo = int(valor)
+            elif nombre == 'transfer-encoding' and 'chunked' in valor:
+                chunked = True
+            elif nombre == 'connection' and valor == 'close':
+                keep_alive = False
+        if chunked:
+            while True:
+                tamano = int((await lector.readuntil(b'\r\n')).split(b';')[0], 16)
+                await lector.readexactly(tamano + 2)
+                if tamano == 0:
+                    break
+        elif largo is not None:
+            await lector.readexactly(largo)
+        else:
+            await lector.read()
+            keep_alive = False
+        return estado, keep_alive
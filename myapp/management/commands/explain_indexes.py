@@ -0,0 +1,95 @@
+import json
+import re
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from myapp.models import Producto, Pedido, Mensaje
+from myapp.search import ProductoFullTextSearchFilter
+
+
+def busqueda_de_la_api():
+    """La primera página de `?search=camisa`, armada por el mismo filtro que la API."""
+    request = SimpleNamespace(query_params={'search': 'camisa'})
+    queryset = ProductoFullTextSearchFilter().filter_queryset(request, Producto.objects.all(), SimpleNamespace())
+    return queryset.order_by('-search_rank', 'product_id')[:50]
+
+
+# Consultas habituales del proyecto y el índice que debería resolver cada una.
+CONSULTAS = [
+    ('busqueda_texto_completo', 'producto_search_idx', busqueda_de_la_api),
+    ('productos_de_un_usuario', 'producto_id_user_idx',
+     lambda: Producto.objects.filter(id_user=1)),
+    ('login_por_email_o_username', 'auth_user_email_lower_idx',
+     lambda: get_user_model().objects.alias(email_lower=Lower('email'), username_lower=Lower('username'))
+     .filter(Q(email_lower='maria@example.com') | Q(username_lower='maria@example.com'))),
+    ('mensajes_de_un_cliente', 'mensaje_cliente_fecha_idx',
+     lambda: Mensaje.objects.filter(cliente_id=1).order_by('-fecha')[:50]),
+    ('mensajes_recientes', 'mensaje_fecha_idx',
+     lambda: Mensaje.objects.order_by('-fecha')[:50]),
+    ('pedidos_recientes', 'pedido_fecha_idx',
+     lambda: Pedido.objects.order_by('-fecha_pedido')[:50]),
+    ('pedidos_por_estado', 'pedido_estado_fecha_idx',
+     lambda: Pedido.objects.filter(estado='Pendiente').order_by('-fecha_pedido')[:50]),
+]
+
+INDICE_EN_PLAN = re.compile(r'(?:Index Scan|Index Only Scan|Bitmap Index Scan)(?: Backward)? (?:using|on) (\w+)')
+
+
+class Command(BaseCommand):
+    help = (
+        'Ejecuta EXPLAIN sobre las consultas habituales del proyecto e informa '
+        'qué índice usa cada una (solo PostgreSQL).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--disable-seqscan', action='store_true',
+            help='SET enable_seqscan = off: comprueba que el índice es utilizable aunque la tabla sea pequeña.',
+        )
+        parser.add_argument('--json', action='store_true', help='Imprime el reporte como JSON.')
+        parser.add_argument(
+            '--strict', action='store_true',
+            help='Termina con error si alguna consulta no usa el índice esperado.',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('explain_indexes necesita PostgreSQL.')
+
+        reporte = []
+        with transaction.atomic():
+            if options['disable_seqscan']:
+                with connection.cursor() as cursor:
+                    # SET LOCAL: solo dura hasta el final de esta transacción
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            for nombre, esperado, consulta in CONSULTAS:
+                plan = consulta().explain()
+                usados = sorted(set(INDICE_EN_PLAN.findall(plan)))
+                reporte.append({
+                    'consulta': nombre,
+                    'indice_esperado': esperado,
+                    'indices_usados': usados,
+                    'ok': esperado in usados,
+                    'plan': plan,
+                })
+
+        if options['json']:
+            self.stdout.write(json.dumps(reporte, indent=2))
+        else:
+            for fila in reporte:
+                estilo = self.style.SUCCESS if fila['ok'] else self.style.WARNING
+                usados = ', '.join(fila['indices_usados']) or 'ninguno (seq scan)'
+                self.stdout.write(estilo(
+                    f"{'OK ' if fila['ok'] else 'NO '} {fila['consulta']}: "
+                    f"espera {fila['indice_esperado']}, usa {usados}"
+                ))
+
+        fallidas = [fila['consulta'] for fila in reporte if not fila['ok']]
+        if options['strict'] and fallidas:
+            raise CommandError(f"Consultas sin su índice: {', '.join(fallidas)}")
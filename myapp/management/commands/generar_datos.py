@@ -0,0 +1,210 @@
+import io
+import random
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from myapp.conditional import subir_versiones
+from myapp.conteo import invalidar_conteos
+from myapp.conversaciones import reconstruir_conversaciones
+from myapp.models import ESTADO_CHOICES, Categoria, Detalle, Mensaje, Pedido, Producto, Vendedor
+
+PREFIJO = 'bench-'
+PASSWORD = 'bench-clave-123'
+
+PALABRAS = (
+    'camisa pantalón zapato mesa silla lámpara teléfono cargador audífonos reloj mochila bolso '
+    'cuaderno lapicero taza plato sartén olla licuadora ventilador almohada sábana toalla jabón '
+    'perfume crema bicicleta casco balón raqueta guitarra teclado ratón monitor cable batería '
+    'algodón cuero madera metal vidrio plástico rojo azul verde negro blanco nuevo usado grande '
+    'pequeño original artesanal importado oferta'
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera datos sintéticos para los benchmarks (bench_api): productos, categorías, '
+        'pedidos con detalles, vendedores con mensajes y usuarios para login. Todo lleva el '
+        f'prefijo "{PREFIJO}" y se borra con --limpiar. Escribe en la base configurada.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=10_000, help='10000, 100000, 1000000...')
+        parser.add_argument('--categorias', type=int, help='Por defecto productos / 1000 (mínimo 10).')
+        parser.add_argument('--pedidos', type=int, help='Por defecto productos / 10.')
+        parser.add_argument('--detalles-por-pedido', type=int, default=3)
+        parser.add_argument('--mensajes', type=int, help='Por defecto productos / 10.')
+        parser.add_argument('--vendedores', type=int, default=50)
+        parser.add_argument('--usuarios', type=int, default=10, help='Usuarios para el benchmark de login.')
+        parser.add_argument('--lote', type=int, default=5000)
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--limpiar', action='store_true', help='Solo borrar los datos generados.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Los datos sintéticos solo se generan en PostgreSQL.')
+        self.lote = options['lote']
+        if options['limpiar']:
+            self.limpiar()
+            return
+
+        random.seed(options['semilla'])
+        productos = options['productos']
+        categorias = options['categorias'] or max(10, productos // 1000)
+        pedidos = productos // 10 if options['pedidos'] is None else options['pedidos']
+        mensajes = productos // 10 if options['mensajes'] is None else options['mensajes']
+
+        inicio = time.perf_counter()
+        self.crear_usuarios(options['usuarios'])
+        categoria_ids = self.crear_categorias(categorias)
+        muestra = self.crear_productos(productos, categoria_ids)
+        self.crear_pedidos(pedidos, options['detalles_por_pedido'], muestra)
+        self.crear_mensajes(mensajes, options['vendedores'], muestra)
+        # bulk_create no dispara las señales de las estadísticas de vendedor
+        # ni las que cambian el ETag y los totales cacheados de los listados
+        call_command('recalcular_estadisticas', stdout=io.StringIO())
+        subir_versiones('productos', *(f'categoria:{c}' for c in categoria_ids))
+        invalidar_conteos(*(f'categoria:{c}' for c in categoria_ids))
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.stdout.write(self.style.SUCCESS(
+            f'{productos} productos, {categorias} categorías, {pedidos} pedidos, {mensajes} mensajes '
+            f'en {time.perf_counter() - inicio:.0f}s'
+        ))
+
+    def progreso(self, nombre, hechos, total):
+        self.stderr.write(f'\r{nombre}: {hechos}/{total}', ending='\n' if hechos >= total else '')
+
+    # --- generadores ---
+    def crear_usuarios(self, cantidad):
+        User = get_user_model()
+        # Un solo hash para todos: hashear N veces con PBKDF2 tardaría minutos
+        password = make_password(PASSWORD)
+        User.objects.bulk_create(
+            [User(username=f'{PREFIJO}user-{i}', email=f'{PREFIJO}user-{i}@example.com', password=password)
+             for i in range(cantidad)],
+            ignore_conflicts=True,
+        )
+
+    def crear_categorias(self, cantidad):
+        ids = [f'{PREFIJO}cat-{i}' for i in range(cantidad)]
+        Categoria.objects.bulk_create(
+            [Categoria(category_id=pk, category_name=f'Bench {i}') for i, pk in enumerate(ids)],
+            ignore_conflicts=True,
+        )
+        return ids
+
+    def crear_productos(self, cantidad, categoria_ids):
+        """Crea los productos por lotes y devuelve una muestra de sus ids (para pedidos y mensajes)."""
+        muestra = []
+        for desde in range(0, cantidad, self.lote):
+            lote = []
+            for _ in range(min(self.lote, cantidad - desde)):
+                nombre = ' '.join(random.sample(PALABRAS, 3)).capitalize()
+                lote.append(Producto(
+                    product_id=str(uuid.uuid4()),
+                    category_id=random.choice(categoria_ids),
+                    id_user=random.randint(1, 1000),
+                    product_name=nombre[:50],
+                    description=' '.join(random.choices(PALABRAS, k=25)),
+                    state=1,
+                    price=Decimal(random.randint(100, 100_000)) / 100,
+                ))
+            with transaction.atomic():
+                Producto.objects.bulk_create(lote)
+            muestra.extend(p.pk for p in random.sample(lote, min(len(lote), 200)))
+            self.progreso('productos', desde + len(lote), cantidad)
+        return muestra
+
+    def crear_pedidos(self, cantidad, detalles_por_pedido, muestra):
+        estados = [valor for valor, _ in ESTADO_CHOICES]
+        for desde in range(0, cantidad, self.lote):
+            n = min(self.lote, cantidad - desde)
+            with transaction.atomic():
+                pedidos = Pedido.objects.bulk_create([
+                    Pedido(monto_total=0, estado=random.choice(estados),
+                           comentario=f'{PREFIJO}pedido')
+                    for _ in range(n)
+                ])
+                detalles = []
+                for pedido in pedidos:
+                    for producto_id in random.sample(muestra, min(detalles_por_pedido, len(muestra))):
+                        detalles.append(Detalle(
+                            pedido_id=pedido.pk, producto_id=producto_id,
+                            cantidad=random.randint(1, 5), precio_unidad=Decimal(random.randint(100, 10_000)) / 100,
+                        ))
+                Detalle.objects.bulk_create(detalles, batch_size=self.lote)
+            self.progreso('pedidos', desde + n, cantidad)
+
+        with connection.cursor() as cursor:
+            # Fechas repartidas en el último año y total consistente con los detalles
+            cursor.execute(
+                """
+                UPDATE myapp_pedido p
+                SET fecha_pedido = now() - random() * interval '365 days',
+                    monto_total = d.total
+                FROM (SELECT pedido_id, SUM(cantidad * precio_unidad) AS total
+                      FROM myapp_detalle GROUP BY pedido_id) d
+                WHERE d.pedido_id = p.id AND p.comentario = %s
+                """,
+                [f'{PREFIJO}pedido'],
+            )
+
+    def crear_mensajes(self, cantidad, vendedores, muestra):
+        vendedor_ids = [
+            v.pk for v in Vendedor.objects.bulk_create(
+                [Vendedor(nombre=f'{PREFIJO}vendedor-{i}') for i in range(vendedores)]
+            )
+        ]
+        for desde in range(0, cantidad, self.lote):
+            n = min(self.lote, cantidad - desde)
+            with transaction.atomic():
+                Mensaje.objects.bulk_create([
+                    Mensaje(
+                        vendedor_id=random.choice(vendedor_ids), cliente_id=random.randint(1, 1000),
+                        producto_id=random.choice(muestra) if random.random() < 0.5 else None,
+                        texto=' '.join(random.choices(PALABRAS, k=12)), es_vendedor=random.random() < 0.5,
+                    )
+                    for _ in range(n)
+                ])
+            self.progreso('mensajes', desde + n, cantidad)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE myapp_mensaje SET fecha = now() - random() * interval '90 days' WHERE vendedor_id = ANY(%s)",
+                [vendedor_ids],
+            )
+        # bulk_create no dispara las señales de la bandeja
+        for desde in range(0, len(vendedor_ids), 10):
+            reconstruir_conversaciones(vendedor_ids[desde:desde + 10])
+
+    # --- limpieza ---
+    def limpiar(self):
+        # SQL directo: con 1M de filas el .delete() del ORM cargaría todo en memoria
+        patron = f'{PREFIJO}%'
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM myapp_detalle WHERE pedido_id IN (SELECT id FROM myapp_pedido WHERE comentario = %s)',
+                [f'{PREFIJO}pedido'],
+            )
+            cursor.execute('DELETE FROM myapp_pedido WHERE comentario = %s', [f'{PREFIJO}pedido'])
+            vendedores = 'SELECT id FROM myapp_vendedor WHERE nombre LIKE %s'
+            cursor.execute(f'DELETE FROM myapp_conversacion WHERE vendedor_id IN ({vendedores})', [patron])
+            cursor.execute(f'DELETE FROM myapp_mensaje WHERE vendedor_id IN ({vendedores})', [patron])
+            cursor.execute('DELETE FROM myapp_vendedor WHERE nombre LIKE %s', [patron])
+            cursor.execute('SELECT category_id FROM categoria WHERE category_id LIKE %s', [patron])
+            categorias = [fila[0] for fila in cursor.fetchall()]
+            cursor.execute('DELETE FROM myapp_producto WHERE category_id LIKE %s', [patron])
+            productos = cursor.rowcount
+            cursor.execute('DELETE FROM categoria WHERE category_id LIKE %s', [patron])
+            subir_versiones('productos')
+            invalidar_conteos(*(f'categoria:{c}' for c in categorias))
+        get_user_model().objects.filter(username__startswith=PREFIJO).delete()
+        call_command('recalcular_estadisticas', stdout=io.StringIO())
+        self.stdout.write(self.style.SUCCESS(f'Datos de benchmark borrados ({productos} productos).'))
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from myapp.estadisticas import recalcular_estadisticas
+from myapp.models import EstadisticaVendedor, Producto
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula las estadísticas de vendedor (productos publicados, unidades vendidas, '
+        'ingresos y pedidos completados) desde Producto/Detalle, por lotes de vendedores. '
+        'Cada lote va en su propia transacción.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500, help='Vendedores por lote.')
+        parser.add_argument('--vendedor', type=int, action='append', help='Solo estos vendedores (id_user).')
+
+    def handle(self, *args, **options):
+        if options['vendedor']:
+            ids = sorted(set(options['vendedor']))
+        else:
+            # También los que ya tienen fila: si no les queda nada, vuelven a cero
+            ids = sorted(
+                set(Producto.objects.exclude(id_user=None).values_list('id_user', flat=True).distinct())
+                | set(EstadisticaVendedor.objects.values_list('pk', flat=True))
+            )
+
+        inicio = time.perf_counter()
+        total = 0
+        for desde in range(0, len(ids), options['lote']):
+            lote = ids[desde:desde + options['lote']]
+            total += recalcular_estadisticas(lote)
+            self.stdout.write(f'Vendedores {lote[0]}..{lote[-1]}: {total} recalculados')
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} vendedores recalculados en {time.perf_counter() - inicio:.1f}s'
+        ))
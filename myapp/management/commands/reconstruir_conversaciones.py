@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from myapp.conversaciones import reconstruir_conversaciones
+from myapp.models import Vendedor
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconstruye desde cero la tabla de resúmenes de conversación (bandeja) a partir '
+        'de Mensaje, por lotes de vendedores. Cada lote va en su propia transacción.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=100, help='Vendedores por lote.')
+        parser.add_argument('--vendedor', type=int, action='append', help='Solo estos vendedores.')
+
+    def handle(self, *args, **options):
+        ids = Vendedor.objects.order_by('pk').values_list('pk', flat=True)
+        if options['vendedor']:
+            ids = ids.filter(pk__in=options['vendedor'])
+        ids = list(ids)
+
+        inicio = time.perf_counter()
+        total = 0
+        for desde in range(0, len(ids), options['lote']):
+            lote = ids[desde:desde + options['lote']]
+            total += reconstruir_conversaciones(lote)
+            self.stdout.write(f'Vendedores {lote[0]}..{lote[-1]}: {total} conversaciones')
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} conversaciones reconstruidas en {time.perf_counter() - inicio:.1f}s'
+        ))
@@ -0,0 +1,54 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+
+from myapp.analitica import reconstruir_dias
+from myapp.estadisticas import COMPLETADO
+from myapp.models import Pedido
+
+
+def _fecha(valor):
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise CommandError(f'Fecha inválida: {valor} (se espera AAAA-MM-DD).')
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconstruye las ventas diarias (myapp_venta_diaria y myapp_resumen_diario) desde '
+        'Pedido/Detalle, por tramos de días. Cada tramo va en su propia transacción, así que '
+        'se puede cortar y retomar con --desde.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=_fecha, help='AAAA-MM-DD. Por defecto el primer pedido completado.')
+        parser.add_argument('--hasta', type=_fecha, help='AAAA-MM-DD. Por defecto hoy.')
+        parser.add_argument('--dias-por-lote', type=int, default=31)
+
+    def handle(self, *args, **options):
+        hasta = options['hasta'] or timezone.localdate()
+        desde = options['desde']
+        if desde is None:
+            primero = Pedido.objects.filter(estado=COMPLETADO).aggregate(primero=Min('fecha_pedido'))['primero']
+            if primero is None:
+                self.stdout.write('No hay pedidos completados.')
+                return
+            desde = timezone.localdate(primero)
+        if desde > hasta:
+            raise CommandError('--desde es posterior a --hasta.')
+
+        inicio = time.perf_counter()
+        dias = 0
+        tramo = desde
+        while tramo <= hasta:
+            fin = min(tramo + timedelta(days=options['dias_por_lote'] - 1), hasta)
+            dias += reconstruir_dias(tramo, fin)
+            self.stdout.write(f'{tramo}..{fin}: {dias} días con ventas')
+            tramo = fin + timedelta(days=1)
+        self.stdout.write(self.style.SUCCESS(
+            f'Ventas diarias reconstruidas ({desde}..{hasta}) en {time.perf_counter() - inicio:.1f}s'
+        ))
@@ -0,0 +1,353 @@
+import bisect
+import json
+import logging
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework import serializers
+from rest_framework.renderers import BaseRenderer
+
+logger = logging.getLogger(__name__)
+
+# Medición del request en curso (None fuera de un request instrumentado)
+_medicion = ContextVar('metricas_medicion', default=None)
+
+LIMITES_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+LIMITES_CONSULTAS = (1, 2, 3, 5, 10, 20, 50, 100, 250, 500)
+LIMITES_BYTES = (512, 2048, 8192, 32768, 131072, 524288, 2097152, 8388608)
+
+
+# ==========================================
+# 1. HISTOGRAMAS RODANTES
+# ==========================================
+class HistogramaRodante:
+    """Histograma de buckets fijos sobre las últimas `ventanas` x `segundos`.
+
+    Cada ventana guarda sus propios conteos; al resumir se suman las que
+    siguen vigentes, así los percentiles reflejan los últimos minutos y no
+    todo lo que lleva vivo el proceso. Aparte se lleva el acumulado desde
+    que arrancó el proceso, que es lo que espera un scraper (contadores que
+    solo crecen).
+    """
+
+    def __init__(self, limites, segundos=60, ventanas=5):
+        self.limites = limites
+        self.segundos = segundos
+        self._ventanas = deque(maxlen=ventanas)  # [(inicio, conteos, suma, n), ...]
+        self._acumulado = ([0] * (len(limites) + 1), [0.0], [0])
+
+    def _ventana_actual(self, ahora):
+        inicio = ahora - ahora % self.segundos
+        if not self._ventanas or self._ventanas[-1][0] != inicio:
+            self._ventanas.append((inicio, [0] * (len(self.limites) + 1), [0.0], [0]))
+        return self._ventanas[-1]
+
+    def observar(self, valor, ahora=None):
+        bucket = bisect.bisect_left(self.limites, valor)
+        _, *ventana = self._ventana_actual(time.time() if ahora is None else ahora)
+        for conteos, suma, n in (ventana, self._acumulado):
+            conteos[bucket] += 1
+            suma[0] += valor
+            n[0] += 1
+
+    def resumen(self, ahora=None):
+        ahora = time.time() if ahora is None else ahora
+        desde = ahora - self.segundos * self._ventanas.maxlen
+        conteos, suma, n = [0] * (len(self.limites) + 1), 0.0, 0
+        for inicio, c, s, k in self._ventanas:
+            if inicio + self.segundos > desde:
+                conteos = [a + b for a, b in zip(conteos, c)]
+                suma += s[0]
+                n += k[0]
+        return {
+            'n': n,
+            'suma': round(suma, 2),
+            'promedio': round(suma / n, 2) if n else None,
+            'p50': self._percentil(conteos, n, 50),
+            'p95': self._percentil(conteos, n, 95),
+            'p99': self._percentil(conteos, n, 99),
+            'buckets': conteos,
+            'acumulado': {
+                'buckets': list(self._acumulado[0]),
+                'suma': round(self._acumulado[1][0], 2),
+                'n': self._acumulado[2][0],
+            },
+        }
+
+    def _percentil(self, conteos, n, p):
+        # Cota superior del bucket donde cae el percentil ("+Inf" si es el último;
+        # como texto, porque infinito no es JSON válido)
+        if not n:
+            return None
+        objetivo, acumulado = p / 100 * n, 0
+        for i, conteo in enumerate(conteos):
+            acumulado += conteo
+            if acumulado >= objetivo:
+                return self.limites[i] if i < len(self.limites) else '+Inf'
+        return '+Inf'
+
+
+class RegistroMetricas:
+    """Histogramas por vista (nombre de la URL) de un proceso."""
+
+    METRICAS = {
+        'total_ms': LIMITES_MS,
+        'sql_ms': LIMITES_MS,
+        'serializer_ms': LIMITES_MS,
+        'consultas': LIMITES_CONSULTAS,
+        'bytes': LIMITES_BYTES,
+    }
+
+    def __init__(self, segundos=60, ventanas=5):
+        self.segundos = segundos
+        self.ventanas = ventanas
+        self._vistas = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, vista, valores, estado, n_mas_1):
+        with self._lock:
+            datos = self._vistas.get(vista)
+            if datos is None:
+                datos = self._vistas[vista] = {
+                    'histogramas': {
+                        nombre: HistogramaRodante(limites, self.segundos, self.ventanas)
+                        for nombre, limites in self.METRICAS.items()
+                    },
+                    'estados': Counter(),
+                    'n_mas_1': 0,
+                }
+            for nombre, histograma in datos['histogramas'].items():
+                histograma.observar(valores[nombre])
+            datos['estados'][f'{estado // 100}xx'] += 1
+            datos['n_mas_1'] += n_mas_1
+
+    def resumen(self):
+        with self._lock:
+            return {
+                vista: {
+                    **{nombre: h.resumen() for nombre, h in datos['histogramas'].items()},
+                    'estados': dict(datos['estados']),
+                    'n_mas_1': datos['n_mas_1'],
+                }
+                for vista, datos in sorted(self._vistas.items())
+            }
+
+    def clear(self):
+        with self._lock:
+            self._vistas.clear()
+
+
+@lru_cache(maxsize=None)
+def get_registro():
+    config = settings.REQUEST_METRICS
+    return RegistroMetricas(config['VENTANA_SEGUNDOS'], config['VENTANAS'])
+
+
+# ==========================================
+# 2. CONTADORES SQL Y DE SERIALIZACIÓN
+# ==========================================
+def _contar_consulta(execute, sql, params, many, context):
+    medicion = _medicion.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    t0 = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion['sql_ms'] += (time.perf_counter() - t0) * 1000
+        medicion['consultas'] += 1
+        medicion['sentencias'][sql] += 1
+
+
+def _agregar_contador(connection, **kwargs):
+    if _contar_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_contar_consulta)
+
+
+@contextmanager
+def midiendo_serializacion():
+    """Suma al request en curso el tiempo de serialización del bloque.
+
+    Lo usan `.data` de los serializers y la proyección de myapp.proyeccion.
+    Solo cuenta el bloque más externo (un serializer anidado no se suma dos veces).
+    """
+    medicion = _medicion.get()
+    if medicion is None or medicion['serializando']:
+        yield
+        return
+    medicion['serializando'] = True
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicion['serializer_ms'] += (time.perf_counter() - t0) * 1000
+        medicion['serializando'] = False
+
+
+def _medir_data(propiedad):
+    def data(self):
+        with midiendo_serializacion():
+            return propiedad.fget(self)
+
+    data.instrumentado = True
+    data.original = propiedad
+    return property(data)
+
+
+@lru_cache(maxsize=None)
+def _instalar_contador_sql():
+    connection_created.connect(_agregar_contador, dispatch_uid='myapp.metricas')
+    for connection in connections.all(initialized_only=True):
+        _agregar_contador(connection)
+
+
+def instalar():
+    """Engancha los contadores una sola vez por proceso (lo llama el middleware).
+
+    - Un execute_wrapper en cada conexión (también las que se abren en los
+      hilos de sync_to_async); fuera de un request medido no hace nada.
+    - `.data` de Serializer/ListSerializer para medir la serialización, solo
+      con REQUEST_METRICS['ENABLED']: es un parche global a DRF y no debe
+      quedar puesto porque alguien instanció el middleware a mano.
+    """
+    _instalar_contador_sql()
+    if not settings.REQUEST_METRICS['ENABLED']:
+        return
+    for clase in (serializers.Serializer, serializers.ListSerializer):
+        if not getattr(clase.data.fget, 'instrumentado', False):
+            clase.data = _medir_data(clase.data)
+
+
+# ==========================================
+# 3. MIDDLEWARE
+# ==========================================
+def _nueva_medicion():
+    return {'consultas': 0, 'sql_ms': 0.0, 'serializer_ms': 0.0, 'serializando': False, 'sentencias': Counter()}
+
+
+class MetricasMiddleware:
+    """Mide cada request: vista, tiempo total, consultas SQL y su tiempo,
+    serialización y tamaño de la respuesta.
+
+    - Lo agrega a la respuesta como `Server-Timing` (visible en las DevTools).
+    - Lo escribe como una línea JSON en el logger `myapp.metricas`.
+    - Lo acumula en los histogramas de get_registro() (/api/internal/metricas/).
+
+    Un request con más de N_MAS_1_UMBRAL consultas se marca como posible N+1
+    y se loguea como warning con la sentencia que más se repitió.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        instalar()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        medicion = _nueva_medicion()
+        token = _medicion.set(medicion)
+        t0 = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        return self._terminar(request, response, medicion, t0)
+
+    async def __acall__(self, request):
+        medicion = _nueva_medicion()
+        token = _medicion.set(medicion)
+        t0 = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        return self._terminar(request, response, medicion, t0)
+
+    def _terminar(self, request, response, medicion, t0):
+        config = settings.REQUEST_METRICS
+        total_ms = (time.perf_counter() - t0) * 1000
+        match = getattr(request, 'resolver_match', None)
+        # Sin ruta (404 del resolver) todo cae en una sola serie
+        vista = (match.view_name if match else None) or '<sin-ruta>'
+        tamano = 0 if response.streaming else len(response.content)
+        n_mas_1 = medicion['consultas'] > config['N_MAS_1_UMBRAL']
+
+        valores = {
+            'total_ms': total_ms,
+            'sql_ms': medicion['sql_ms'],
+            'serializer_ms': medicion['serializer_ms'],
+            'consultas': medicion['consultas'],
+            'bytes': tamano,
+        }
+        get_registro().registrar(vista, valores, response.status_code, n_mas_1)
+
+        if config['SERVER_TIMING']:
+            partes = [
+                f'total;dur={total_ms:.1f}',
+                f'sql;dur={medicion["sql_ms"]:.1f};desc="{medicion["consultas"]} consultas"',
+                f'serializer;dur={medicion["serializer_ms"]:.1f}',
+            ]
+            if n_mas_1:
+                partes.append('n1;desc="posible N+1"')
+            response['Server-Timing'] = ', '.join(partes)
+
+        registro = {
+            'vista': vista,
+            'metodo': request.method,
+            'ruta': request.path,
+            'estado': response.status_code,
+            **{nombre: round(valor, 2) for nombre, valor in valores.items()},
+            'n_mas_1': n_mas_1,
+        }
+        if n_mas_1:
+            sentencia, repeticiones = medicion['sentencias'].most_common(1)[0]
+            registro['sentencia_repetida'] = {'sql': sentencia[:500], 'veces': repeticiones}
+            logger.warning(json.dumps(registro, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(registro, ensure_ascii=False))
+        return response
+
+
+# ==========================================
+# 4. FORMATO PROMETHEUS PARA EL ENDPOINT
+# ==========================================
+class PrometheusRenderer(BaseRenderer):
+    """`?format=prometheus`: los histogramas (acumulados) en el formato de texto de Prometheus."""
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = renderer_context and renderer_context.get('response')
+        if response is not None and response.status_code >= 400:
+            return json.dumps(data)
+
+        lineas = []
+        for nombre, limites in RegistroMetricas.METRICAS.items():
+            metrica = f'myapp_request_{nombre}'
+            lineas.append(f'# TYPE {metrica} histogram')
+            for vista, datos in data.items():
+                total = datos[nombre]['acumulado']
+                acumulado = 0
+                for limite, conteo in zip([*limites, '+Inf'], total['buckets']):
+                    acumulado += conteo
+                    lineas.append(f'{metrica}_bucket{{vista="{vista}",le="{limite}"}} {acumulado}')
+                lineas.append(f'{metrica}_sum{{vista="{vista}"}} {total["suma"]}')
+                lineas.append(f'{metrica}_count{{vista="{vista}"}} {total["n"]}')
+        lineas.append('# TYPE myapp_request_n_mas_1_total counter')
+        for vista, datos in data.items():
+            lineas.append(f'myapp_request_n_mas_1_total{{vista="{vista}"}} {datos["n_mas_1"]}')
+        return '\n'.join(lineas) + '\n'
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:31
+
+from django.db import migrations, models
+
+
+# SearchFilter (icontains) genera `UPPER("product_name"::text) LIKE UPPER('%q%')`,
+# así que el índice trigram tiene que ser sobre esa misma expresión.
+def crear_indice_trigram(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS producto_nombre_trgm_idx ON myapp_producto '
+        'USING gin ((UPPER(product_name::text)) gin_trgm_ops)'
+    )
+
+
+def borrar_indice_trigram(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS producto_nombre_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0003_producto_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mensaje',
+            index=models.Index(fields=['cliente_id', 'fecha'], name='mensaje_cliente_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mensaje',
+            index=models.Index(fields=['fecha'], name='mensaje_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['fecha_pedido'], name='pedido_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['estado', 'fecha_pedido'], name='pedido_estado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['id_user'], name='producto_id_user_idx'),
+        ),
+        migrations.RunPython(crear_indice_trigram, borrar_indice_trigram),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0005_producto_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagenproducto',
+            name='variantes',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='image_variantes',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
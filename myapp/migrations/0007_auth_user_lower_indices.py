@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """Índices funcionales para el login por email/username sin distinguir mayúsculas.
+
+    auth_user pertenece a django.contrib.auth, así que no se declaran en un Meta:
+    se crean aquí con el mismo `LOWER(...)` que genera la consulta de LoginAPIView.
+    """
+
+    dependencies = [
+        ('myapp', '0006_variantes_imagen'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS auth_user_email_lower_idx ON auth_user (LOWER(email))',
+            'DROP INDEX IF EXISTS auth_user_email_lower_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS auth_user_username_lower_idx ON auth_user (LOWER(username))',
+            'DROP INDEX IF EXISTS auth_user_username_lower_idx',
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0007_auth_user_lower_indices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cliente_id', models.IntegerField()),
+                ('ultimo_texto', models.CharField(blank=True, max_length=200)),
+                ('ultimo_es_vendedor', models.BooleanField(default=False)),
+                ('ultima_fecha', models.DateTimeField()),
+                ('total_mensajes', models.PositiveIntegerField(default=0)),
+                ('cliente_leido_hasta', models.DateTimeField(blank=True, null=True)),
+                ('vendedor_leido_hasta', models.DateTimeField(blank=True, null=True)),
+                ('no_leidos_cliente', models.PositiveIntegerField(default=0)),
+                ('no_leidos_vendedor', models.PositiveIntegerField(default=0)),
+                ('producto', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='myapp.producto')),
+                ('ultimo_mensaje', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='myapp.mensaje')),
+                ('vendedor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversaciones', to='myapp.vendedor')),
+            ],
+            options={
+                'db_table': 'myapp_conversacion',
+                'managed': True,
+                'indexes': [models.Index(fields=['cliente_id', '-ultima_fecha'], name='conversacion_cliente_idx'), models.Index(fields=['vendedor', '-ultima_fecha'], name='conversacion_vendedor_idx')],
+                'constraints': [models.UniqueConstraint(fields=('vendedor', 'cliente_id', 'producto'), name='conversacion_unica', nulls_distinct=False)],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0009_pedido_idempotencia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticaVendedor',
+            fields=[
+                ('id_user', models.IntegerField(db_column='id_user', primary_key=True, serialize=False)),
+                ('productos_publicados', models.IntegerField(default=0)),
+                ('unidades_vendidas', models.IntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('pedidos_completados', models.IntegerField(default=0)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Estadística de vendedor',
+                'verbose_name_plural': 'Estadísticas de vendedores',
+                'db_table': 'myapp_estadistica_vendedor',
+                'managed': True,
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0010_estadistica_vendedor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDiario',
+            fields=[
+                ('fecha', models.DateField(primary_key=True, serialize=False)),
+                ('pedidos', models.IntegerField(default=0)),
+                ('unidades', models.IntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'db_table': 'myapp_resumen_diario',
+                'managed': True,
+            },
+        ),
+        migrations.CreateModel(
+            name='VentaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('category_id', models.CharField(blank=True, max_length=36, null=True)),
+                ('id_user', models.IntegerField(blank=True, null=True)),
+                ('unidades', models.IntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('lineas', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'myapp_venta_diaria',
+                'managed': True,
+                'indexes': [models.Index(fields=['category_id', 'fecha'], name='venta_diaria_categoria_idx'), models.Index(fields=['id_user', 'fecha'], name='venta_diaria_vendedor_idx')],
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'category_id', 'id_user'), name='venta_diaria_unica', nulls_distinct=False)],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+# El índice trigram de 0004 servía al `UPPER(product_name) LIKE` de SearchFilter.
+# ?search= ahora va por search_vector (producto_search_idx) y nada más genera esa
+# expresión: el índice solo encarecía cada INSERT/UPDATE de productos.
+def borrar_indice_trigram(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS producto_nombre_trgm_idx')
+
+
+def crear_indice_trigram(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS producto_nombre_trgm_idx ON myapp_producto '
+        'USING gin ((UPPER(product_name::text)) gin_trgm_ops)'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0012_producto_updated_at_y_versiones'),
+    ]
+
+    operations = [
+        migrations.RunPython(borrar_indice_trigram, crear_indice_trigram),
+    ]
@@ -1,4 +1,6 @@
 import uuid
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
 from django.contrib.auth import get_user_model
 
@@ -54,6 +56,8 @@ class Producto(models.Model):
     )
     
     image = models.ImageField(upload_to='productos/%Y/%m/%d/', blank=True, null=True)
+    # Miniaturas generadas por myapp.images: {"320": {"webp": ruta, "jpeg": ruta}, ...}
+    image_variantes = models.JSONField(default=dict, blank=True)
     
     category = models.ForeignKey(
         Categoria, 
@@ -73,9 +77,31 @@ class Producto(models.Model):
     state = models.IntegerField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
 
+    # Se actualiza en cada save(); también lo tocan las señales cuando cambian
+    # la galería o la categoría, porque ambas van anidadas en la respuesta.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Vector de búsqueda (español): nombre con peso A, descripción con peso B.
+    # Es una columna generada, así que PostgreSQL la mantiene en cada INSERT/UPDATE.
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('product_name', weight='A', config='spanish')
+            + SearchVector('description', weight='B', config='spanish')
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
     class Meta:
         managed = True 
         db_table = 'myapp_producto' 
+        indexes = [
+            models.Index(fields=['id_user'], name='producto_id_user_idx'),
+            GinIndex(fields=['search_vector'], name='producto_search_idx'),
+            # MAX(updated_at) de los ETag de listados sin recorrer la tabla
+            models.Index(fields=['updated_at'], name='producto_updated_idx'),
+            models.Index(fields=['category', 'updated_at'], name='producto_cat_updated_idx'),
+        ]
 
     def __str__(self):
         return self.product_name
@@ -85,6 +111,7 @@ class Producto(models.Model):
 class ImagenProducto(models.Model):
     producto = models.ForeignKey(Producto, related_name='imagenes_extra', on_delete=models.CASCADE)
     imagen = models.ImageField(upload_to='productos/galeria/%Y/%m/%d/')
+    variantes = models.JSONField(default=dict, blank=True)
 
     class Meta:
         managed = True
@@ -118,6 +145,10 @@ class Pedido(models.Model):
         managed = True 
         verbose_name = 'Pedido'
         verbose_name_plural = 'Pedidos'
+        indexes = [
+            models.Index(fields=['fecha_pedido'], name='pedido_fecha_idx'),
+            models.Index(fields=['estado', 'fecha_pedido'], name='pedido_estado_fecha_idx'),
+        ]
 
 # ==========================
 # 5. MODELO DETALLE
@@ -134,6 +165,27 @@ class Detalle(models.Model):
         verbose_name = 'Detalle de Pedido'
         verbose_name_plural = 'Detalles de Pedido'
         unique_together = (('pedido', 'producto'),)
+
+
+# ==========================
+# 5.1 CLAVES DE IDEMPOTENCIA DEL CHECKOUT
+# ==========================
+class PedidoIdempotencia(models.Model):
+    """Header Idempotency-Key ya usado por un usuario y el pedido que produjo.
+
+    `huella` es el hash del carrito: repetir la clave con otro carrito es un
+    error, no un reintento.
+    """
+    usuario = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='+')
+    clave = models.CharField(max_length=255)
+    huella = models.CharField(max_length=64)
+    pedido = models.ForeignKey(Pedido, on_delete=models.CASCADE, null=True, related_name='+')
+    creado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        managed = True
+        db_table = 'myapp_pedido_idempotencia'
+        unique_together = (('usuario', 'clave'),)
         
         
         # modelo mensajes   
@@ -170,4 +222,142 @@ class Mensaje(models.Model):
 
     class Meta:
         managed = True
-        db_table = 'myapp_mensaje'
\ No newline at end of file
+        db_table = 'myapp_mensaje'
+        indexes = [
+            models.Index(fields=['cliente_id', 'fecha'], name='mensaje_cliente_fecha_idx'),
+            models.Index(fields=['fecha'], name='mensaje_fecha_idx'),
+        ]
+
+# ✅ 3. RESUMEN DE CONVERSACIÓN (bandeja de entrada)
+class Conversacion(models.Model):
+    """Una fila por conversación (vendedor, cliente, producto) con el último
+    mensaje y los no leídos de cada lado.
+
+    Se mantiene al guardar cada Mensaje (ver myapp.conversaciones) para que la
+    bandeja no tenga que hacer GROUP BY sobre toda la tabla de mensajes.
+    """
+    vendedor = models.ForeignKey(Vendedor, on_delete=models.CASCADE, related_name='conversaciones')
+    cliente_id = models.IntegerField()
+    # CASCADE y no SET_NULL: al borrar el producto sus mensajes pasan a la
+    # conversación sin producto, que se recalcula en la señal de Producto
+    producto = models.ForeignKey('Producto', on_delete=models.CASCADE, null=True, blank=True)
+
+    ultimo_mensaje = models.ForeignKey(Mensaje, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    ultimo_texto = models.CharField(max_length=200, blank=True)
+    ultimo_es_vendedor = models.BooleanField(default=False)
+    ultima_fecha = models.DateTimeField()
+    total_mensajes = models.PositiveIntegerField(default=0)
+
+    # Hasta cuándo leyó cada lado y cuántos mensajes del otro lado tiene sin leer
+    cliente_leido_hasta = models.DateTimeField(null=True, blank=True)
+    vendedor_leido_hasta = models.DateTimeField(null=True, blank=True)
+    no_leidos_cliente = models.PositiveIntegerField(default=0)
+    no_leidos_vendedor = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        managed = True
+        db_table = 'myapp_conversacion'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['vendedor', 'cliente_id', 'producto'],
+                name='conversacion_unica',
+                nulls_distinct=False,
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['cliente_id', '-ultima_fecha'], name='conversacion_cliente_idx'),
+            models.Index(fields=['vendedor', '-ultima_fecha'], name='conversacion_vendedor_idx'),
+        ]
+
+
+# ==========================
+# 7. ESTADÍSTICAS DE VENDEDOR
+# ==========================
+class EstadisticaVendedor(models.Model):
+    """Totales de un vendedor (`Producto.id_user`), mantenidos por el servidor.
+
+    Se actualizan de forma incremental desde las señales (ver
+    myapp.estadisticas) y se recalculan con `manage.py recalcular_estadisticas`.
+    Solo cuentan las ventas de pedidos en estado Completado.
+    """
+    id_user = models.IntegerField(primary_key=True, db_column='id_user')
+    productos_publicados = models.IntegerField(default=0)
+    unidades_vendidas = models.IntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    pedidos_completados = models.IntegerField(default=0)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        managed = True
+        db_table = 'myapp_estadistica_vendedor'
+        verbose_name = 'Estadística de vendedor'
+        verbose_name_plural = 'Estadísticas de vendedores'
+
+
+# ==========================
+# 8. VENTAS DIARIAS (ANALÍTICA)
+# ==========================
+# Agregados de los pedidos completados por día (zona de TIME_ZONE). Los
+# mantiene myapp.analitica al completar/cancelar pedidos y se reconstruyen
+# con `manage.py reconstruir_ventas_diarias`. Categoría y vendedor son
+# columnas sueltas (no FK) para que el histórico sobreviva a los borrados.
+class VentaDiaria(models.Model):
+    """Ventas de un día por (categoría, vendedor). Todas las métricas son sumables."""
+    fecha = models.DateField()
+    category_id = models.CharField(max_length=36, null=True, blank=True)
+    id_user = models.IntegerField(null=True, blank=True)
+    unidades = models.IntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    lineas = models.IntegerField(default=0)
+
+    class Meta:
+        managed = True
+        db_table = 'myapp_venta_diaria'
+        # NULLS NOT DISTINCT requiere PostgreSQL 15+: producto sin categoría o sin
+        # vendedor es un grupo más. En versiones anteriores Django omite la opción
+        # (warning models.W047 en migrate) y los INSERT ... ON CONFLICT de
+        # myapp.analitica duplicarían esas filas.
+        constraints = [
+            models.UniqueConstraint(
+                fields=['fecha', 'category_id', 'id_user'],
+                name='venta_diaria_unica',
+                nulls_distinct=False,
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['category_id', 'fecha'], name='venta_diaria_categoria_idx'),
+            models.Index(fields=['id_user', 'fecha'], name='venta_diaria_vendedor_idx'),
+        ]
+
+
+class ResumenDiario(models.Model):
+    """Totales del día. Aparte porque `pedidos` no se puede sumar entre
+    categorías/vendedores (un pedido puede tener líneas de varios)."""
+    fecha = models.DateField(primary_key=True)
+    pedidos = models.IntegerField(default=0)
+    unidades = models.IntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        managed = True
+        db_table = 'myapp_resumen_diario'
+
+
+# ==========================
+# 9. VERSIONES DE LISTADOS (GET CONDICIONAL)
+# ==========================
+class VersionListado(models.Model):
+    """Contador que sube con cada alta, baja o cambio de un listado
+    (`'productos'`, `'categoria:<id>'`).
+
+    Junto con MAX(updated_at) forma el ETag de los listados sin un COUNT(*)
+    (ver myapp.conditional). Vive en la base, así que todos los workers ven
+    la misma versión; se incrementa al confirmar la escritura, fuera de su
+    transacción, para no bloquear las demás escrituras del catálogo.
+    """
+    nombre = models.CharField(max_length=100, primary_key=True)
+    version = models.BigIntegerField(default=0)
+
+    class Meta:
+        managed = True
+        db_table = 'myapp_version_listado'
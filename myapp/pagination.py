@@ -0,0 +1,100 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+from .conteo import contar
+
+
+# ==========================================
+# 0. TOTAL EN LAS RESPUESTAS PAGINADAS
+# ==========================================
+class ConteoPaginationMixin:
+    """Agrega `count` y `count_exact` a la respuesta del cursor.
+
+    El total sale de `view.get_conteo(queryset)` (totales precalculados o
+    cacheados) o de `myapp.conteo.contar`. `count_exact` es False cuando es
+    una estimación de PostgreSQL.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        get_conteo = getattr(view, 'get_conteo', None)
+        self.conteo = get_conteo(queryset) if get_conteo is not None else contar(queryset)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data = {'count': self.conteo.total, 'count_exact': self.conteo.exacto, **response.data}
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        schema = super().get_paginated_response_schema(schema)
+        schema['properties'] = {
+            'count': {'type': 'integer', 'example': 123},
+            'count_exact': {'type': 'boolean', 'description': 'False si `count` es una estimación.'},
+            **schema['properties'],
+        }
+        return schema
+
+
+# ==========================================
+# 1. PAGINACIÓN POR CURSOR DEL CATÁLOGO
+# ==========================================
+class ProductoCursorPagination(ConteoPaginationMixin, CursorPagination):
+    """Paginación keyset para los listados de productos.
+
+    El cursor guarda el último `product_id` entregado y la siguiente página se
+    pide con `WHERE product_id > cursor ORDER BY product_id LIMIT n`, que usa
+    el índice de la clave primaria. Por eso una página profunda cuesta lo mismo
+    que la primera (no hay OFFSET que recorrer).
+
+    El cliente puede pedir `?page_size=N`, limitado por PRODUCTOS_MAX_PAGE_SIZE.
+
+    Con búsqueda de texto (queryset anotado con `search_rank`) el orden es por
+    relevancia y el cursor guarda el rank del último resultado.
+    """
+    ordering = 'product_id'
+    search_ordering = ('-search_rank', 'product_id')
+    page_size = settings.PRODUCTOS_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.PRODUCTOS_MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        if 'search_rank' in queryset.query.annotations:
+            return self.search_ordering
+        return super().get_ordering(request, queryset, view)
+
+
+# ==========================================
+# 2. PAGINACIÓN DEL HISTORIAL DE MENSAJES
+# ==========================================
+class MensajeCursorPagination(ConteoPaginationMixin, CursorPagination):
+    """Historial de una conversación, del más nuevo al más viejo.
+
+    Keyset sobre `fecha` (índice mensaje_cliente_fecha_idx al filtrar por cliente).
+    """
+    ordering = '-fecha'
+    page_size = settings.MENSAJES_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class ConversacionCursorPagination(CursorPagination):
+    """Bandeja de entrada: conversaciones por último mensaje, más reciente primero."""
+    ordering = '-ultima_fecha'
+    page_size = settings.MENSAJES_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+# ==========================================
+# 3. PAGINACIÓN DE PEDIDOS
+# ==========================================
+class PedidoCursorPagination(ConteoPaginationMixin, CursorPagination):
+    """Pedidos del más nuevo al más viejo.
+
+    Keyset sobre `fecha_pedido` (índice pedido_fecha_idx): antes el listado
+    devolvía la tabla entera en cada request.
+    """
+    ordering = '-fecha_pedido'
+    page_size = settings.PEDIDOS_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 200
@@ -0,0 +1,84 @@
+import hashlib
+import json
+from collections import Counter
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+
+from .models import Detalle, Pedido, PedidoIdempotencia, Producto
+
+
+class ClaveIdempotenciaReutilizada(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = 'La clave Idempotency-Key ya se usó con otro carrito.'
+    default_code = 'idempotency_key_reused'
+
+
+# ==========================================
+# CHECKOUT TRANSACCIONAL
+# ==========================================
+def agrupar_items(items):
+    """`[{'producto', 'cantidad'}, ...]` -> `{producto_id: cantidad}` (suma repetidos)."""
+    cantidades = Counter()
+    for item in items:
+        cantidades[item['producto']] += item['cantidad']
+    return dict(cantidades)
+
+
+def huella_carrito(cantidades, comentario):
+    contenido = json.dumps([sorted(cantidades.items()), comentario or ''], separators=(',', ':'))
+    return hashlib.sha256(contenido.encode()).hexdigest()
+
+
+def realizar_pedido(usuario, clave, items, comentario=None):
+    """Crea el pedido completo en una transacción. Devuelve `(pedido, creado)`.
+
+    1. Registra la clave de idempotencia (INSERT con índice único). Una
+       petición concurrente con la misma clave espera a que esta termine y
+       luego devuelve el mismo pedido (`creado=False`).
+    2. Bloquea todos los productos con un solo SELECT ... FOR UPDATE (en
+       orden de product_id para no provocar deadlocks entre carritos).
+    3. Calcula `monto_total` con los precios bloqueados y crea las líneas
+       con un `bulk_create`.
+
+    Cualquier error deshace todo, incluida la clave, y el cliente puede
+    reintentar con la misma.
+    """
+    cantidades = agrupar_items(items)
+    huella = huella_carrito(cantidades, comentario)
+
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                registro = PedidoIdempotencia.objects.create(usuario=usuario, clave=clave, huella=huella)
+        except IntegrityError:
+            registro = PedidoIdempotencia.objects.get(usuario=usuario, clave=clave)
+            if registro.huella != huella:
+                raise ClaveIdempotenciaReutilizada()
+            return registro.pedido, False
+
+        productos = {
+            p.pk: p
+            for p in Producto.objects.select_for_update()
+            .filter(pk__in=cantidades)
+            .order_by('pk')
+            .only('product_id', 'price')
+        }
+        faltantes = sorted(set(cantidades) - set(productos))
+        if faltantes:
+            raise serializers.ValidationError({'items': [f'Producto inexistente: {pk}' for pk in faltantes]})
+
+        monto_total = sum(
+            (productos[pk].price * cantidad for pk, cantidad in cantidades.items()),
+            Decimal('0.00'),
+        )
+        pedido = Pedido.objects.create(monto_total=monto_total, comentario=comentario)
+        Detalle.objects.bulk_create([
+            Detalle(pedido=pedido, producto_id=pk, cantidad=cantidad, precio_unidad=productos[pk].price)
+            for pk, cantidad in cantidades.items()
+        ])
+        registro.pedido = pedido
+        registro.save(update_fields=['pedido'])
+    return pedido, True
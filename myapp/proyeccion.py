@@ -0,0 +1,134 @@
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .metricas import midiendo_serializacion
+
+
+# ==========================================
+# PROYECCIÓN CON values() PARA LOS LISTADOS
+# ==========================================
+# Serializar una página con DRF crea una instancia del modelo por fila y, por
+# cada campo, llama a get_attribute() + to_representation(). Para los
+# serializers de listado (campos planos) eso se puede precompilar: se lee la
+# página con `values()` y cada campo queda como `(nombre, columna, conversor)`.
+# El resultado es el mismo JSON; si algún campo no se puede proyectar
+# (anidado, método, source con puntos...) se usa el serializer normal.
+
+def _identidad(valor):
+    return valor
+
+
+def _conversor_decimal(field, model_field):
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if (
+        coerce_to_string and not field.localize and not field.normalize_output
+        and field.decimal_places == model_field.decimal_places
+    ):
+        # La columna ya tiene esa escala: basta con formatear (sin quantize)
+        formato = f'.{field.decimal_places}f'
+        return lambda valor: format(valor, formato)
+    return field.to_representation
+
+
+def _conversor_archivo(field, model_field, request):
+    if not getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+        return lambda nombre: nombre or None
+    storage = model_field.storage
+
+    def url(nombre):
+        if not nombre:
+            return None
+        ruta = storage.url(nombre)
+        return request.build_absolute_uri(ruta) if request is not None else ruta
+    return url
+
+
+def _compilar_campo(field, model, request):
+    """`(columna, conversor)` para un campo, o None si no se puede proyectar."""
+    if isinstance(field, (serializers.BaseSerializer, serializers.ManyRelatedField)):
+        return None
+    if field.source == '*' or '.' in field.source:
+        return None
+    try:
+        model_field = model._meta.get_field(field.source)
+    except FieldDoesNotExist:
+        return None
+
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        if field.pk_field is not None or not model_field.many_to_one:
+            return None
+        return model_field.attname, _identidad
+    if model_field.is_relation:
+        return None
+    if isinstance(field, serializers.FileField):
+        return field.source, _conversor_archivo(field, model_field, request)
+    if isinstance(field, serializers.DecimalField):
+        return field.source, _conversor_decimal(field, model_field)
+    if type(field) in (serializers.CharField, serializers.IntegerField, serializers.BooleanField):
+        # Lo que devuelve el driver ya es str / int / bool
+        return field.source, _identidad
+    # El resto (fechas, JSON, choices, campos propios...) con su to_representation
+    return field.source, field.to_representation
+
+
+class Proyeccion:
+    def __init__(self, campos):
+        self.campos = campos  # [(nombre, columna, conversor), ...]
+        self.columnas = list(dict.fromkeys(columna for _, columna, _ in campos))
+
+    def convertir(self, filas):
+        campos = self.campos
+        with midiendo_serializacion():
+            return [
+                {
+                    nombre: None if (valor := fila[columna]) is None else conversor(valor)
+                    for nombre, columna, conversor in campos
+                }
+                for fila in filas
+            ]
+
+
+def compilar_proyeccion(serializer, request=None):
+    """Proyección de `serializer` (instancia sin datos) o None si no aplica."""
+    if not settings.FAST_JSON['PROYECCION']:
+        return None
+    model = serializer.Meta.model
+    campos = []
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        compilado = _compilar_campo(field, model, request)
+        if compilado is None:
+            return None
+        campos.append((field.field_name, *compilado))
+    return Proyeccion(campos)
+
+
+class ListadoRapidoMixin:
+    """`list` con la proyección de arriba cuando el serializer lo permite.
+
+    Funciona con cualquier paginación de DRF: las columnas del orden del
+    cursor se agregan al `values()` (el cursor sabe leer diccionarios).
+    """
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_serializer()
+        proyeccion = compilar_proyeccion(serializer, request)
+        if proyeccion is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        columnas = list(proyeccion.columnas)
+        paginator = self.paginator
+        if paginator is not None and hasattr(paginator, 'get_ordering'):
+            for campo in paginator.get_ordering(request, queryset, self):
+                columnas.append(campo.lstrip('-'))
+        filas = queryset.prefetch_related(None).values(*dict.fromkeys(columnas))
+
+        page = self.paginate_queryset(filas)
+        if page is not None:
+            return self.get_paginated_response(proyeccion.convertir(page))
+        return Response(proyeccion.convertir(filas))
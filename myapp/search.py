@@ -0,0 +1,51 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Count, F, FloatField
+from django.db.models.functions import Cast
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+
+
+# ==========================================
+# BÚSQUEDA DE TEXTO COMPLETO DE PRODUCTOS
+# ==========================================
+class ProductoFullTextSearchFilter(BaseFilterBackend):
+    """Busca `?search=` en `Producto.search_vector` (índice GIN, español).
+
+    Reemplaza a SearchFilter (`ILIKE '%q%'`, sin índice y solo sobre el nombre).
+    Acepta sintaxis tipo web ("frase exacta", -excluir, or). Anota
+    `search_rank` para que la paginación ordene por relevancia y deja en la
+    vista un queryset perezoso con el conteo por categoría (facetas).
+    """
+    search_param = api_settings.SEARCH_PARAM
+    search_config = 'spanish'
+
+    def get_search_terms(self, request):
+        return request.query_params.get(self.search_param, '').strip()
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        query = SearchQuery(terms, config=self.search_config, search_type='websearch')
+        # ts_rank devuelve `real`; en double precision el valor que guarda el
+        # cursor se compara exacto en la página siguiente.
+        queryset = queryset.filter(search_vector=query).annotate(
+            search_rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+        )
+        view.search_facets = (
+            queryset.order_by()
+            .values('category_id', category_name=F('category__category_name'))
+            .annotate(count=Count('pk'))
+            .order_by('-count', 'category_id')
+        )
+        return queryset
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.search_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Búsqueda de texto completo en nombre y descripción.',
+            'schema': {'type': 'string'},
+        }]
@@ -1,12 +1,132 @@
+import secrets
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Prefetch
+from django.db.models.functions import Lower
 from rest_framework import serializers
-from .models import Categoria, Producto, Imagen, Pedido, Detalle, ImagenProducto, Mensaje, UserProfile
+from .models import Categoria, Producto, Imagen, Pedido, Detalle, ImagenProducto, Mensaje, UserProfile, Conversacion, EstadisticaVendedor
 from django.contrib.auth.models import User
+from .images import encolar_imagenes_producto
 
-# --- SERIALIZER SOLO LECTURA PARA USUARIO (solo los campos públicos necesarios) ---
-class UserPublicSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = User
-        fields = ['id', 'username', 'first_name', 'last_name', 'email']
+
+# ==========================================
+# CARGA ANTICIPADA DE RELACIONES (evita N+1)
+# ==========================================
+class EagerLoadingMixin:
+    """Permite que cada serializer de lectura declare las relaciones que usa.
+
+    - `select_related_fields`: FKs que se leen en cada fila (se resuelven con JOIN).
+    - `prefetch_related_fields`: relaciones inversas o M2M (una consulta extra por
+      relación, sin importar cuántas filas haya).
+    - `only_fields`: si se indica, limita las columnas leídas (`QuerySet.only`).
+
+    Las vistas llaman a `setup_eager_loading(queryset)` para que el número de
+    consultas sea constante aunque la página crezca.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+    only_fields = ()
+
+    @classmethod
+    def get_prefetch_related(cls):
+        return cls.prefetch_related_fields
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        prefetch = cls.get_prefetch_related()
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        if cls.only_fields:
+            queryset = queryset.only(*cls.only_fields)
+        return queryset
+
+
+# ==========================================
+# CAMPOS A PEDIDO (?fields= / ?expand=)
+# ==========================================
+def lista_param(query_params, nombre):
+    """`?fields=a,b` -> `['a', 'b']` (None si el parámetro no vino)."""
+    valor = query_params.get(nombre)
+    if valor is None:
+        return None
+    return [campo.strip() for campo in valor.split(',') if campo.strip()]
+
+
+class SparseFieldsMixin(EagerLoadingMixin):
+    """Serializer de lectura cuyos campos elige el cliente.
+
+    - `campos_por_defecto`: lo que se devuelve si no se pide nada (None = todos).
+    - `?fields=a,b`: solo esos campos.
+    - `?expand=x`: agrega el campo x; si está en `expandable_fields` se usa su
+      versión expandida (p. ej. la categoría anidada en vez de su id).
+
+    Las vistas pasan `campos` y `expand` al serializer y a
+    `setup_eager_loading`, que arma el queryset para exactamente esos campos:
+    `only()` con sus columnas y JOIN / prefetch solo de las relaciones que se
+    van a serializar. Las tuplas de EagerLoadingMixin no se usan aquí.
+    """
+    campos_por_defecto = None
+    expandable_fields = {}
+
+    def __init__(self, *args, campos=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        disponibles = set(self.fields) | set(self.expandable_fields)
+        errores = {}
+        for param, nombres in (('fields', campos), ('expand', expand)):
+            desconocidos = sorted(set(nombres or ()) - disponibles)
+            if desconocidos:
+                errores[param] = [f'Campo desconocido: {nombre}' for nombre in desconocidos]
+        if errores:
+            raise serializers.ValidationError(errores)
+
+        expand = set(expand or ())
+        for nombre in expand & set(self.expandable_fields):
+            self.fields[nombre] = self.expandable_fields[nombre]()
+        elegidos = campos if campos is not None else self.campos_por_defecto
+        if elegidos is not None:
+            elegidos = set(elegidos) | expand
+            for nombre in list(self.fields):
+                if nombre not in elegidos:
+                    self.fields.pop(nombre)
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, campos=None, expand=None):
+        model = cls.Meta.model
+        columnas, select, prefetch = {model._meta.pk.name}, [], []
+        for field in cls(campos=campos, expand=expand).fields.values():
+            if field.write_only:
+                continue
+            partes = field.source.split('.')
+            try:
+                model_field = model._meta.get_field(partes[0])
+            except FieldDoesNotExist:
+                columnas = None  # source='*', propiedad o método: no se sabe qué columnas lee
+                continue
+
+            if model_field.one_to_many or model_field.many_to_many:
+                hijo = getattr(field, 'child', None)
+                if hasattr(hijo, 'setup_eager_loading'):
+                    relacionados = hijo.setup_eager_loading(model_field.related_model._default_manager.all())
+                    prefetch.append(Prefetch(partes[0], queryset=relacionados))
+                else:
+                    prefetch.append(partes[0])
+                continue
+            if model_field.is_relation and (len(partes) > 1 or isinstance(field, serializers.BaseSerializer)):
+                select.append(partes[0])
+            if columnas is not None:
+                columnas.add('__'.join(partes))
+
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        if columnas is not None:
+            queryset = queryset.only(*columnas)
+        return queryset
 
 
 class UserProfileSerializer(serializers.ModelSerializer):
@@ -15,35 +135,80 @@ class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserProfile
         fields = ['user', 'phone', 'address', 'member_since', 'rating', 'products_sold']
+        # Los calcula el servidor (myapp.estadisticas), no se editan por PATCH
+        read_only_fields = ['rating', 'products_sold']
+
+
+class EstadisticaVendedorSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = EstadisticaVendedor
+        fields = [
+            'id_user', 'productos_publicados', 'unidades_vendidas', 'ingresos',
+            'pedidos_completados', 'actualizado',
+        ]
+
+
+# --- SERIALIZER SOLO LECTURA PARA USUARIO (solo los campos públicos necesarios) ---
+# ?expand=profile agrega el perfil (mismo SELECT, con JOIN). Tiene teléfono y
+# dirección: solo sale para el propio usuario o el staff.
+class UserPublicSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {'profile': lambda: UserProfileSerializer(read_only=True)}
+
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'first_name', 'last_name', 'email']
+
+    def to_representation(self, instance):
+        datos = super().to_representation(instance)
+        request = self.context.get('request')
+        user = getattr(request, 'user', None)
+        if 'profile' in datos and not (user and (user.is_staff or user.pk == instance.pk)):
+            del datos['profile']
+        return datos
 
 
 # ==========================================
 # 0. SERIALIZER PARA REGISTRO DE USUARIOS
 # ==========================================
+USERNAME_BASE_MAX = 140  # auth_user.username admite 150: deja lugar al sufijo
+USERNAME_SUFIJOS = (6, 6, 8, 9)  # dígitos del sufijo aleatorio en cada reintento
+
+
 class RegisterSerializer(serializers.Serializer):
     # Accept frontend field names: 'user' (email), 'user_name' (full name), 'password'
     user = serializers.EmailField(write_only=True)
     user_name = serializers.CharField(write_only=True)
     password = serializers.CharField(write_only=True)
 
+    @staticmethod
+    def correo_registrado(email):
+        # lower(email) usa el índice funcional de la migración 0007
+        return User.objects.alias(email_lower=Lower('email')).filter(email_lower=email.lower()).exists()
+
     def validate_user(self, value):
-        if User.objects.filter(email=value).exists():
+        if self.correo_registrado(value):
             raise serializers.ValidationError("El correo ya está registrado.")
         return value
 
+    @staticmethod
+    def candidatos_username(username_base):
+        """Primero la parte local del correo; si ya existe, sufijos aleatorios.
+
+        No se consulta qué usernames existen (antes era un exists() por cada
+        colisión): se intenta el INSERT y la restricción UNIQUE decide. Con 6
+        dígitos la probabilidad de chocar es mínima y el número de intentos
+        está acotado, haya 10 o 100.000 usuarios con la misma parte local.
+        """
+        username_base = username_base[:USERNAME_BASE_MAX]
+        yield username_base
+        for digitos in USERNAME_SUFIJOS:
+            yield f"{username_base}{secrets.randbelow(10 ** digitos)}"
+
     def create(self, validated_data):
         email = validated_data.get('user')
         full_name = validated_data.get('user_name', '')
         password = validated_data.get('password')
 
-        # Create a username from email local part or from name
-        username_base = email.split('@')[0]
-        username = username_base
-        counter = 1
-        while User.objects.filter(username=username).exists():
-            username = f"{username_base}{counter}"
-            counter += 1
-
         first_name = ''
         last_name = ''
         parts = full_name.strip().split()
@@ -52,19 +217,41 @@ class RegisterSerializer(serializers.Serializer):
         if len(parts) > 1:
             last_name = ' '.join(parts[1:])
 
-        user = User.objects.create_user(
-            username=username,
-            email=email,
-            password=password,
-            first_name=first_name,
-            last_name=last_name
-        )
-        return user
+        # Usuario y perfil (señal post_save) en una sola transacción
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # Serializa los registros con el mismo correo: sin esto dos requests
+                # simultáneos pasan validate_user y crean el correo duplicado.
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT pg_advisory_xact_lock(hashtext(lower(%s)))', [email])
+                if self.correo_registrado(email):
+                    raise serializers.ValidationError({'user': ["El correo ya está registrado."]})
+
+            # Create a username from email local part (UNIQUE + reintento).
+            # El hash de la contraseña se calcula una sola vez, no por intento.
+            user = User(
+                email=User.objects.normalize_email(email),
+                first_name=first_name,
+                last_name=last_name,
+            )
+            user.set_password(password)
+            for username in self.candidatos_username(email.split('@')[0]):
+                user.username = User.normalize_username(username)
+                try:
+                    with transaction.atomic():
+                        user.save()
+                    return user
+                except IntegrityError as exc:
+                    error = exc
+            raise error
 
 # ==========================================
 # 1. SERIALIZER DE CATEGORÍA (DEBE IR PRIMERO)
 # ==========================================
 class CategoriaSerializer(serializers.ModelSerializer):
+    # Subir al cambiar la forma de la respuesta (invalida el cache de respuestas)
+    cache_version = 1
+
     class Meta:
         model = Categoria
         fields = '__all__'
@@ -80,22 +267,52 @@ class ImagenSerializer(serializers.ModelSerializer):
 # ==========================================
 # 3. SERIALIZER DE IMAGEN PRODUCTO (Galería)
 # ==========================================
+class VariantesImagenField(serializers.ReadOnlyField):
+    """Convierte las rutas de las miniaturas en URLs (igual que ImageField)."""
+
+    def to_representation(self, variantes):
+        request = self.context.get('request')
+        urls = {}
+        for ancho, formatos in (variantes or {}).items():
+            urls[ancho] = {}
+            for formato, ruta in formatos.items():
+                url = default_storage.url(ruta)
+                urls[ancho][formato] = request.build_absolute_uri(url) if request is not None else url
+        return urls
+
+
 class ImagenProductoSerializer(serializers.ModelSerializer):
+    variantes = VariantesImagenField()
+
     class Meta:
         model = ImagenProducto
-        fields = ['id', 'imagen']
+        fields = ['id', 'imagen', 'variantes']
 
 # ==========================================
 # 4. SERIALIZERS DE PRODUCTO
 # ==========================================
 # LECTURA: Usa CategoriaSerializer (que ya está definido arriba ✅)
-class ProductoReadSerializer(serializers.ModelSerializer):
+class ProductoReadSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     category = CategoriaSerializer(read_only=True)
     imagenes_extra = ImagenProductoSerializer(many=True, read_only=True) 
+    image_variantes = VariantesImagenField()
+
+    # Subir al cambiar la forma de la respuesta (invalida el cache de respuestas)
+    cache_version = 3
 
     class Meta:
         model = Producto
-        fields = '__all__'
+        exclude = ['search_vector']
+
+
+# LISTADOS: versión compacta para grillas (sin descripción ni galería, la
+# categoría solo como id). Lo demás se pide con ?expand=category,imagenes_extra,description
+class ProductoListSerializer(ProductoReadSerializer):
+    category = serializers.PrimaryKeyRelatedField(read_only=True)
+
+    campos_por_defecto = ('product_id', 'product_name', 'price', 'image', 'image_variantes', 'category')
+    expandable_fields = {'category': lambda: CategoriaSerializer(read_only=True)}
+    cache_version = 1
 
 # ESCRITURA
 class ProductoWriteSerializer(serializers.ModelSerializer):
@@ -112,34 +329,62 @@ class ProductoWriteSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Producto
-        fields = '__all__'
+        exclude = ['search_vector', 'image_variantes']
         read_only_fields = ['product_id']
 
+    # Las imágenes no se guardan en el request: se encolan para que un worker
+    # las re-codifique (sin EXIF) y genere las miniaturas. Aparecen en el
+    # producto cuando termina el procesamiento.
     def create(self, validated_data):
         uploaded_images = validated_data.pop('uploaded_images', [])
+        image = validated_data.pop('image', None)
         producto = Producto.objects.create(**validated_data)
-        for img in uploaded_images:
-            ImagenProducto.objects.create(producto=producto, imagen=img)
+        encolar_imagenes_producto(producto, image, uploaded_images)
         return producto
     
     def update(self, instance, validated_data):
         uploaded_images = validated_data.pop('uploaded_images', [])
         delete_image_ids = validated_data.pop('delete_image_ids', [])
+        # image=None (borrar la imagen) se aplica directo; un archivo nuevo se encola
+        image = validated_data.pop('image') if validated_data.get('image') else None
+        if 'image' in validated_data:
+            validated_data['image_variantes'] = {}
         
         instance = super().update(instance, validated_data)
         
         if delete_image_ids:
             ImagenProducto.objects.filter(id__in=delete_image_ids, producto=instance).delete()
             
-        for img in uploaded_images:
-            ImagenProducto.objects.create(producto=instance, imagen=img)
+        encolar_imagenes_producto(instance, image, uploaded_images)
         return instance
 
+# IMPORTACIÓN MASIVA: mismas reglas de campo que ProductoWriteSerializer, sin
+# imágenes. La categoría se valida contra un set precargado (context['categorias'])
+# en lugar de una consulta por fila.
+class ProductoImportSerializer(serializers.ModelSerializer):
+    category = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+
+    class Meta:
+        model = Producto
+        fields = ['category', 'id_user', 'product_name', 'description', 'state', 'price']
+
+    def validate_category(self, value):
+        if not value:
+            return None
+        if value not in self.context['categorias']:
+            raise serializers.ValidationError(f'La categoría "{value}" no existe.')
+        return value
+
 # ==========================================
 # 5. SERIALIZERS DE DETALLE (Mover arriba de Pedido)
 # ==========================================
-class DetalleReadSerializer(serializers.ModelSerializer):
+class DetalleReadSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     producto_nombre = serializers.CharField(source='producto.product_name', read_only=True)
+
+    # Del producto solo se necesita el nombre: JOIN con únicamente esa columna
+    select_related_fields = ('producto',)
+    only_fields = ('pedido', 'producto', 'cantidad', 'precio_unidad', 'producto__product_name')
+
     class Meta:
         model = Detalle
         fields = ['producto', 'producto_nombre', 'cantidad', 'precio_unidad']
@@ -152,22 +397,79 @@ class DetalleWriteSerializer(serializers.ModelSerializer):
 # ==========================================
 # 6. SERIALIZERS DE PEDIDO
 # ==========================================
-class PedidoReadSerializer(serializers.ModelSerializer):
+# Los detalles se traen con una sola consulta (Prefetch con el queryset de
+# DetalleReadSerializer: JOIN solo al nombre del producto)
+class PedidoReadSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     detalles = DetalleReadSerializer(many=True, read_only=True) 
+
     class Meta:
         model = Pedido
         fields = ['id', 'fecha_pedido', 'monto_total', 'estado', 'comentario', 'detalles']
 
+
+# LISTADOS: sin líneas (ni su consulta); ?expand=detalles las agrega
+class PedidoListSerializer(PedidoReadSerializer):
+    campos_por_defecto = ('id', 'fecha_pedido', 'monto_total', 'estado', 'comentario')
+
 class PedidoWriteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Pedido
         fields = ['id', 'estado', 'comentario']
         read_only_fields = ['id']
 
+class CheckoutItemSerializer(serializers.Serializer):
+    producto = serializers.CharField(max_length=36)
+    cantidad = serializers.IntegerField(min_value=1)
+
+class CheckoutSerializer(serializers.Serializer):
+    """Carrito completo para POST /api/pedidos/checkout/ (precios y total los pone el servidor)."""
+    items = CheckoutItemSerializer(many=True, allow_empty=False)
+    comentario = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
 # ==========================================
 # 7. SERIALIZER DE MENSAJE
 # ==========================================
 class MensajeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Mensaje
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is not None and not request.user.is_staff:
+            # Los fija MensajeViewSet.perform_create: un cliente no escribe por otro
+            # ni como vendedor
+            for nombre in ('cliente_id', 'es_vendedor'):
+                fields[nombre].read_only = True
+        return fields
+
+
+# ==========================================
+# 7.1 SERIALIZER DE CONVERSACIÓN (BANDEJA)
+# ==========================================
+class ConversacionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Conversacion
+        fields = [
+            'id', 'vendedor', 'cliente_id', 'producto',
+            'ultimo_mensaje', 'ultimo_texto', 'ultimo_es_vendedor', 'ultima_fecha',
+            'total_mensajes', 'no_leidos_cliente', 'no_leidos_vendedor',
+        ]
+        read_only_fields = fields
+
+
+# ==========================================
+# 8. PARÁMETROS DE LA ANALÍTICA DE VENTAS
+# ==========================================
+class VentasConsultaSerializer(serializers.Serializer):
+    desde = serializers.DateField()
+    hasta = serializers.DateField()
+    agrupar = serializers.ChoiceField(choices=['dia', 'categoria', 'vendedor'], default='dia')
+    categoria = serializers.CharField(max_length=36, required=False)
+    vendedor = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        if attrs['desde'] > attrs['hasta']:
+            raise serializers.ValidationError({'hasta': 'Debe ser igual o posterior a "desde".'})
+        return attrs
@@ -1,7 +1,18 @@
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete
 from django.dispatch import receiver
-from .models import UserProfile
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from .auth_cache import get_user_cache
+from .cache import invalidar_producto, invalidar_categoria
+from .conditional import subir_versiones
+from .conteo import invalidar_conteos
+from django.db import transaction
+from .chat import publicar_mensaje
+from .conversaciones import registrar_mensaje, actualizar_texto, recalcular_conversacion
+from .estadisticas import COMPLETADO, sumar_productos, registrar_pedido, recalcular_vendedores_de
+from . import analitica
+from .models import UserProfile, Producto, ImagenProducto, Categoria, Mensaje, Conversacion, Pedido, Detalle
 
 User = get_user_model()
 
@@ -9,8 +20,205 @@ User = get_user_model()
 def create_profile(sender, instance, created, **kwargs):
     if not created:
         return
-    try:
-        UserProfile.objects.get_or_create(user=instance)
-    except Exception:
-        # Evita romper el flujo de registro si algo falla
-        pass
+    # Un solo INSERT ... ON CONFLICT DO NOTHING (get_or_create hacía SELECT +
+    # SAVEPOINT + INSERT). Va en la transacción del registro: si falla, el
+    # usuario tampoco se crea y el error llega tal cual.
+    UserProfile.objects.bulk_create([UserProfile(user=instance)], ignore_conflicts=True)
+
+
+# ==========================================
+# INVALIDACIÓN DEL CACHE DE RESPUESTAS
+# ==========================================
+@receiver(pre_save, sender=Producto)
+def recordar_valores_anteriores(sender, instance, **kwargs):
+    # Si el producto cambia de categoría hay que invalidar también la anterior;
+    # si cambia de vendedor, moverlo en las estadísticas
+    anterior = None
+    if not instance._state.adding:
+        anterior = Producto.objects.filter(pk=instance.pk).values_list('category_id', 'id_user').first()
+    instance._categoria_anterior, instance._vendedor_anterior = anterior or (None, None)
+    instance._era_nuevo = anterior is None
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+def invalidar_cache_producto(sender, instance, **kwargs):
+    categorias = {instance.category_id, getattr(instance, '_categoria_anterior', None)} - {None}
+    invalidar_producto(instance.pk, *categorias)
+    # ETag de los listados: cualquier cambio puede sacar la fila de un filtro
+    subir_versiones('productos', *(f'categoria:{c}' for c in categorias))
+    invalidar_conteos(*(f'categoria:{c}' for c in categorias))
+
+
+@receiver(post_save, sender=ImagenProducto)
+@receiver(post_delete, sender=ImagenProducto)
+def invalidar_cache_imagen(sender, instance, **kwargs):
+    # La galería va anidada en el producto: cuenta como modificación (ETag)
+    Producto.objects.filter(pk=instance.producto_id).update(updated_at=timezone.now())
+    category_id = (
+        Producto.objects.filter(pk=instance.producto_id).values_list('category_id', flat=True).first()
+    )
+    invalidar_producto(instance.producto_id, category_id)
+
+
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+def invalidar_cache_categoria(sender, instance, **kwargs):
+    # Los productos incluyen el nombre de su categoría: renovar su ETag
+    Producto.objects.filter(category_id=instance.pk).update(updated_at=timezone.now())
+    invalidar_categoria(instance.pk)
+
+
+# ==========================================
+# INVALIDACIÓN DEL CACHE DE USUARIOS
+# ==========================================
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidar_cache_usuario(sender, instance, **kwargs):
+    get_user_cache().invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def invalidar_cache_token(sender, instance, **kwargs):
+    get_user_cache().invalidate_token(instance.key)
+
+
+# ==========================================
+# CHAT: PUBLICAR MENSAJES NUEVOS
+# ==========================================
+@receiver(post_save, sender=Mensaje)
+def publicar_mensaje_nuevo(sender, instance, created, **kwargs):
+    if not created:
+        return
+    from .serializers import MensajeSerializer
+    payload = MensajeSerializer(instance).data
+    # Solo después del commit: nadie debe ver un mensaje que luego se deshace
+    transaction.on_commit(lambda: publicar_mensaje(instance, payload))
+
+
+# ==========================================
+# CHAT: RESUMEN DE CONVERSACIONES (BANDEJA)
+# ==========================================
+# bulk_create/update() de mensajes no disparan estas señales: después de una
+# carga masiva hay que correr `manage.py reconstruir_conversaciones`.
+@receiver(post_save, sender=Mensaje)
+def actualizar_conversacion(sender, instance, created, **kwargs):
+    if created:
+        registrar_mensaje(instance)
+    else:
+        actualizar_texto(instance)
+
+
+@receiver(post_delete, sender=Mensaje)
+def recalcular_conversacion_mensaje(sender, instance, **kwargs):
+    recalcular_conversacion(instance.vendedor_id, instance.cliente_id, instance.producto_id)
+
+
+@receiver(pre_delete, sender=Producto)
+def recordar_conversaciones_producto(sender, instance, **kwargs):
+    # Sus mensajes quedan con producto=NULL: se suman a la conversación general
+    instance._conversaciones = list(
+        Conversacion.objects.filter(producto=instance).values_list('vendedor_id', 'cliente_id')
+    )
+
+
+@receiver(post_delete, sender=Producto)
+def recalcular_conversaciones_producto(sender, instance, **kwargs):
+    for vendedor_id, cliente_id in getattr(instance, '_conversaciones', ()):
+        recalcular_conversacion(vendedor_id, cliente_id, None)
+
+
+# ==========================================
+# ESTADÍSTICAS DE VENDEDOR Y VENTAS DIARIAS
+# ==========================================
+# Como en la bandeja: bulk_create/update() no disparan señales. Después de una
+# carga masiva hay que correr `manage.py recalcular_estadisticas` y
+# `manage.py reconstruir_ventas_diarias`.
+@receiver(post_save, sender=Producto)
+def contar_producto(sender, instance, **kwargs):
+    if instance._era_nuevo:
+        sumar_productos({instance.id_user: 1})
+    elif instance._vendedor_anterior != instance.id_user:
+        sumar_productos({instance._vendedor_anterior: -1, instance.id_user: 1})
+
+
+@receiver(post_delete, sender=Producto)
+def descontar_producto(sender, instance, **kwargs):
+    sumar_productos({instance.id_user: -1})
+
+
+@receiver(pre_save, sender=Pedido)
+def recordar_estado_anterior(sender, instance, update_fields=None, **kwargs):
+    if instance._state.adding or (update_fields is not None and not {'estado', 'fecha_pedido'} & set(update_fields)):
+        instance._estado_anterior = None if instance._state.adding else instance.estado
+        instance._fecha_anterior = instance.fecha_pedido
+        return
+    instance._estado_anterior, instance._fecha_anterior = (
+        Pedido.objects.filter(pk=instance.pk).values_list('estado', 'fecha_pedido').first() or (None, None)
+    )
+
+
+@receiver(post_save, sender=Pedido)
+def contar_pedido(sender, instance, **kwargs):
+    antes = getattr(instance, '_estado_anterior', None) == COMPLETADO
+    ahora = instance.estado == COMPLETADO
+    if antes != ahora:
+        signo = 1 if ahora else -1
+        registrar_pedido(instance.pk, signo)
+        analitica.registrar_pedido(instance, signo)
+    elif ahora and instance._fecha_anterior is not None:
+        # Un pedido completado que cambia de día: sus ventas se mudan de día
+        dia_anterior = timezone.localdate(instance._fecha_anterior)
+        if dia_anterior != timezone.localdate(instance.fecha_pedido):
+            analitica.registrar_pedido(instance, -1, fecha=dia_anterior)
+            analitica.registrar_pedido(instance, 1)
+
+
+@receiver(pre_delete, sender=Pedido)
+def descontar_pedido(sender, instance, **kwargs):
+    # Antes del borrado: después ya no quedan sus detalles para restar
+    if instance.estado == COMPLETADO:
+        registrar_pedido(instance.pk, -1)
+        analitica.registrar_pedido(instance, -1)
+
+
+def _es_cascada_de_pedido(origin):
+    return isinstance(origin, Pedido) or getattr(origin, 'model', None) is Pedido
+
+
+def _leer_linea(pk):
+    return Detalle.objects.filter(pk=pk).values(*analitica.LINEA).first()
+
+
+@receiver(pre_save, sender=Detalle)
+def recordar_linea_anterior(sender, instance, **kwargs):
+    instance._linea_anterior = None if instance._state.adding else _leer_linea(instance.pk)
+
+
+@receiver(pre_delete, sender=Detalle)
+def recordar_linea_borrada(sender, instance, origin=None, **kwargs):
+    instance._linea_anterior = None if _es_cascada_de_pedido(origin) else _leer_linea(instance.pk)
+
+
+@receiver(post_save, sender=Detalle)
+@receiver(post_delete, sender=Detalle)
+def recalcular_detalle(sender, instance, origin=None, created=False, **kwargs):
+    """Resta la línea como estaba y la suma como quedó (solo en pedidos completados).
+
+    Un borrado en cascada del pedido ya lo restó descontar_pedido.
+    """
+    if _es_cascada_de_pedido(origin):
+        return
+    borrado = kwargs['signal'] is post_delete
+    lineas = [
+        (linea, signo)
+        for linea, signo in ((getattr(instance, '_linea_anterior', None), -1),
+                             (None if borrado else _leer_linea(instance.pk), 1))
+        if linea is not None and linea['pedido__estado'] == COMPLETADO
+    ]
+    if not lineas:
+        return
+    recalcular_vendedores_de({linea['producto_id'] for linea, _ in lineas})
+    for linea, signo in lineas:
+        analitica.registrar_linea(linea, signo)
@@ -1,3 +1,1415 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import shutil
+import tempfile
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+import brotli
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import DatabaseError, IntegrityError, connections, transaction
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import AsyncRequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from PIL import Image
+
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework import serializers, throttling
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from rest_framework.authtoken.models import Token
+
+from .async_views import VISTAS_ASYNC, con_vistas_async
+from .auth_cache import get_user_cache
+from .cache import get_response_cache
+from .checks import revisar_cache_de_replicas
+from .conteo import Conteo, contar
+from .metricas import HistogramaRodante, MetricasMiddleware, get_registro
+from .renderers import FastJSONRenderer
+from .throttling import LoginAccountThrottle
+from .views import ProductoViewSet
+from .models import Categoria, Producto, ImagenProducto, Pedido, Detalle, UserProfile, Vendedor, Mensaje, Conversacion, PedidoIdempotencia, EstadisticaVendedor, ResumenDiario, VentaDiaria
+
+
+def crear_producto(categoria, nombre='Producto', imagenes=0, **extra):
+    producto = Producto.objects.create(
+        category=categoria,
+        product_name=nombre,
+        state=1,
+        price=Decimal('10.00'),
+        **extra
+    )
+    for i in range(imagenes):
+        ImagenProducto.objects.create(producto=producto, imagen=f'productos/galeria/img{i}.jpg')
+    return producto
+
+
+class ApiTestCase(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        cache = get_response_cache()
+        if cache is not None:
+            cache.clear()
+        get_user_cache().clear()
+        caches['default'].clear()
+
+
+# ==========================================
+# 1. CATÁLOGO DE PRODUCTOS
+# ==========================================
+class ProductoCatalogoTests(ApiTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categoria = Categoria.objects.create(category_id='cat-1', category_name='Ropa')
+        cls.otra = Categoria.objects.create(category_id='cat-2', category_name='Hogar')
+        cls.productos = [
+            crear_producto(cls.categoria if i % 2 else cls.otra, f'Producto {i}', imagenes=2)
+            for i in range(6)
+        ]
+
+    def test_listado_paginado_por_cursor(self):
+        url = reverse('producto-list')
+        vistos = []
+        response = self.client.get(url, {'page_size': 4})
+        self.assertEqual(len(response.data['results']), 4)
+        vistos += [p['product_id'] for p in response.data['results']]
+
+        response = self.client.get(response.data['next'])
+        vistos += [p['product_id'] for p in response.data['results']]
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(vistos, sorted(str(p.product_id) for p in self.productos))
+
+    def test_listado_consultas_constantes(self):
+        url = reverse('producto-list')
+        # Compacto: ETag (versión + MAX) + reltuples y, con tan pocas filas, el
+        # COUNT exacto + productos, sin JOIN ni galería
+        with self.assertNumQueries(5):
+            response = self.client.get(url, {'page_size': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual((response.data['count'], response.data['count_exact']), (6, True))
+        self.assertEqual(
+            set(response.data['results'][0]),
+            {'product_id', 'product_name', 'price', 'image', 'image_variantes', 'category'},
+        )
+        # ETag (versión + MAX) + conteo + productos (JOIN categoría) + prefetch de la galería
+        with self.assertNumQueries(6):
+            response = self.client.get(url, {'page_size': 6, 'expand': 'category,imagenes_extra'})
+        self.assertEqual(len(response.data['results']), 6)
+        for item in response.data['results']:
+            self.assertIn(item['category']['category_name'], ('Ropa', 'Hogar'))
+            self.assertEqual(len(item['imagenes_extra']), 2)
+
+    def test_campos_a_pedido_cambian_el_sql(self):
+        url = reverse('producto-detail', args=[self.productos[0].product_id])
+        with CaptureQueriesContext(connections['default']) as consultas:
+            response = self.client.get(url, {'fields': 'product_id,product_name'})
+        self.assertEqual(response.data, {'product_id': str(self.productos[0].product_id), 'product_name': 'Producto 0'})
+        # ETag + una sola consulta, sin description, JOIN ni prefetch
+        self.assertEqual(len(consultas), 2)
+        self.assertNotIn('description', consultas[1]['sql'])
+        self.assertNotIn('JOIN', consultas[1]['sql'])
+
+        response = self.client.get(reverse('producto-list'), {'fields': 'product_name', 'expand': 'description'})
+        self.assertEqual(set(response.data['results'][0]), {'product_name', 'description'})
+
+        response = self.client.get(reverse('producto-list'), {'fields': 'precio', 'expand': 'nada'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {'fields', 'expand'})
+
+    def test_detalle_consultas_constantes(self):
+        url = reverse('producto-detail', args=[self.productos[0].product_id])
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_por_categoria_consultas_constantes(self):
+        url = reverse('productos-por-categoria', args=[self.categoria.category_id])
+        with self.assertNumQueries(4):  # versión + MAX + COUNT de la categoría + productos
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(response.data['count'], 3)
+
+    def test_cache_de_respuestas_e_invalidacion(self):
+        if get_response_cache() is None:
+            self.skipTest('RESPONSE_CACHE desactivado')
+        url = reverse('producto-detail', args=[self.productos[1].product_id])
+        lista = reverse('productos-por-categoria', args=[self.categoria.category_id])
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(lista)['X-Cache'], 'MISS')
+        with self.assertNumQueries(1):  # solo el ETag
+            response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+        # Mover el producto de categoría invalida su detalle y ambas listas
+        producto = self.productos[1]
+        producto.category = self.otra
+        with self.captureOnCommitCallbacks(execute=True):
+            producto.save()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['category']['category_id'], 'cat-2')
+        response = self.client.get(lista)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['results']), 2)
+
+        # Otro producto no afecta al detalle ya cacheado
+        crear_producto(self.otra, 'Nuevo', imagenes=1)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+
+    def test_get_condicional_detalle(self):
+        url = reverse('producto-detail', args=[self.productos[2].product_id])
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # Una imagen nueva en la galería cambia el ETag del producto
+        ImagenProducto.objects.create(producto=self.productos[2], imagen='productos/galeria/nueva.jpg')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_escrituras_no_bloquean_la_version_del_listado(self):
+        with CaptureQueriesContext(connections['default']) as consultas, \
+                self.captureOnCommitCallbacks() as callbacks:
+            crear_producto(self.categoria, 'Nuevo')
+        # El UPDATE de 'productos' bloquearía la fila hasta el commit de esta escritura
+        self.assertFalse([c for c in consultas if 'myapp_version_listado' in c['sql']])
+        with CaptureQueriesContext(connections['default']) as consultas:
+            for callback in callbacks:
+                callback()
+        self.assertTrue([c for c in consultas if 'myapp_version_listado' in c['sql']])
+
+    def test_get_condicional_listados(self):
+        url = reverse('producto-list')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.productos[0].delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        # Un producto que sale de la categoría no sube el MAX(updated_at) de la
+        # lista: lo delata la versión del listado, sin COUNT(*)
+        url = reverse('productos-por-categoria', args=[self.categoria.category_id])
+        etag = self.client.get(url)['ETag']
+        with CaptureQueriesContext(connections['default']) as consultas:
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertFalse(any('COUNT(' in c['sql'] for c in consultas))
+        self.productos[1].category = self.otra
+        with self.captureOnCommitCallbacks(execute=True):
+            self.productos[1].save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        url = reverse('categoria-list')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.otra.category_name = 'Casa'
+        self.otra.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class CacheTransaccionesTests(TransactionTestCase):
+    """Con commits reales: el cache de respuestas frente a escrituras concurrentes."""
+
+    def setUp(self):
+        self.client = APIClient()
+        cache = get_response_cache()
+        if cache is None:
+            self.skipTest('RESPONSE_CACHE desactivado')
+        cache.clear()
+
+    def test_lectura_concurrente_antes_del_commit_no_queda_cacheada(self):
+        producto = crear_producto(Categoria.objects.create(category_id='cat-1', category_name='Ropa'), 'Viejo')
+        url = reverse('producto-detail', args=[producto.product_id])
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+
+        def leer_en_otra_conexion(respuestas):
+            try:
+                respuestas.append(APIClient().get(url))
+            finally:
+                connections['default'].close()
+
+        respuestas = []
+        with transaction.atomic():
+            producto.product_name = 'Nuevo'
+            producto.save()
+            # Otro hilo usa otra conexión: no ve el cambio sin confirmar
+            hilo = threading.Thread(target=leer_en_otra_conexion, args=(respuestas,))
+            hilo.start()
+            hilo.join()
+        self.assertEqual(respuestas[0].data['product_name'], 'Viejo')
+
+        response = self.client.get(url)
+        self.assertEqual((response['X-Cache'], response.data['product_name']), ('MISS', 'Nuevo'))
+
+
+class ProductoBusquedaTests(ApiTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        ropa = Categoria.objects.create(category_id='cat-1', category_name='Ropa')
+        hogar = Categoria.objects.create(category_id='cat-2', category_name='Hogar')
+        cls.en_nombre = crear_producto(ropa, 'Zapatos de cuero', description='Talla 40')
+        cls.en_descripcion = crear_producto(ropa, 'Botas', description='Parecidas a unos zapatos')
+        crear_producto(hogar, 'Mueble para zapatos')
+        crear_producto(hogar, 'Lámpara', description='Luz cálida')
+
+    def test_busqueda_por_relevancia_con_facetas(self):
+        response = self.client.get(reverse('producto-list'), {'search': 'zapato'})
+        nombres = [p['product_name'] for p in response.data['results']]
+        self.assertEqual(len(nombres), 3)
+        # El nombre pesa más que la descripción
+        self.assertEqual(nombres[-1], 'Botas')
+        self.assertNotIn('search_vector', response.data['results'][0])
+        self.assertEqual(response.data['facets'], [
+            {'category_id': 'cat-1', 'category_name': 'Ropa', 'count': 2},
+            {'category_id': 'cat-2', 'category_name': 'Hogar', 'count': 1},
+        ])
+
+    def test_busqueda_paginada_por_relevancia(self):
+        url = reverse('producto-list')
+        response = self.client.get(url, {'search': 'zapato', 'page_size': 2})
+        vistos = [p['product_name'] for p in response.data['results']]
+        response = self.client.get(response.data['next'])
+        vistos += [p['product_name'] for p in response.data['results']]
+        self.assertEqual(len(vistos), 3)
+        self.assertEqual(vistos[-1], 'Botas')
+
+
+def foto_con_exif(ancho=1600, alto=1200):
+    imagen = Image.new('RGB', (ancho, alto), 'red')
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotada 90°
+    exif[0x010F] = 'Telefono'  # Make
+    buffer = BytesIO()
+    imagen.save(buffer, 'JPEG', exif=exif)
+    return SimpleUploadedFile('foto.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+
+class ProductoImagenesTests(ApiTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categoria = Categoria.objects.create(category_id='cat-1', category_name='Ropa')
+        cls.usuario = get_user_model().objects.create_user('vendedor', 'v@example.com', 'clave-segura-123')
+
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        procesamiento = dict(settings.IMAGE_PROCESSING, SYNC=True)
+        ajustes = override_settings(MEDIA_ROOT=self.media, IMAGE_PROCESSING=procesamiento)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.client.force_authenticate(self.usuario)
+
+    def test_subida_se_procesa_despues_del_commit(self):
+        datos = {
+            'product_name': 'Camisa', 'state': 1, 'price': '12.50', 'category': 'cat-1',
+            'image': foto_con_exif(), 'uploaded_images': [foto_con_exif(), foto_con_exif(800, 600)],
+        }
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = self.client.post(reverse('producto-list'), datos, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        producto = Producto.objects.get(product_name='Camisa')
+        # Nada se guardó todavía dentro del request
+        self.assertFalse(producto.image)
+        self.assertEqual(producto.imagenes_extra.count(), 0)
+
+        for callback in callbacks:
+            callback()
+        producto.refresh_from_db()
+        # 1200px de ancho tras rotar: no hay variante de 1280
+        self.assertEqual(set(producto.image_variantes), {'320', '640'})
+        self.assertEqual(producto.imagenes_extra.count(), 2)
+
+        with Image.open(producto.image.path) as guardada:
+            # Orientación aplicada y EXIF descartado
+            self.assertEqual(guardada.size, (1200, 1600))
+            self.assertEqual(len(guardada.getexif()), 0)
+        with Image.open(f"{self.media}/{producto.image_variantes['320']['webp']}") as miniatura:
+            self.assertEqual((miniatura.format, miniatura.width), ('WEBP', 320))
+
+        response = self.client.get(reverse('producto-detail', args=[producto.pk]))
+        self.assertTrue(response.data['image_variantes']['640']['jpeg'].startswith('http://testserver/media/'))
+        self.assertEqual(len(response.data['imagenes_extra']), 2)
+
+
+@override_settings(BULK_IMPORT_BATCH_SIZE=2)
+class ProductoImportacionTests(ApiTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Categoria.objects.create(category_id='cat-1', category_name='Ropa')
+        cls.usuario = get_user_model().objects.create_user('vendedor', 'v@example.com', 'clave-segura-123')
+
+    def test_importar_csv_con_errores_por_fila(self):
+        csv_texto = (
+            'product_name,description,category,id_user,state,price\n'
+            'Camisa,Algodón,cat-1,7,1,10.50\n'
+            'Pantalón,,cat-1,,1,20\n'
+            'Sin precio,,cat-1,,1,\n'
+            'Gorra,,no-existe,,1,5\n'
+            'Bufanda,Lana,,,1,8\n'
+        )
+        archivo = SimpleUploadedFile('catalogo.csv', csv_texto.encode(), content_type='text/csv')
+        self.client.force_authenticate(self.usuario)
+        # 1 consulta de categorías + por lote: SAVEPOINT, INSERT, RELEASE (las
+        # versiones de los listados suben al confirmar, fuera de la importación)
+        # + estadísticas del vendedor 7 al final: SAVEPOINT, upsert, UPDATE, RELEASE
+        with self.assertNumQueries(11):
+            response = self.client.post(reverse('producto-importar'), {'archivo': archivo}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['creados'], 3)
+        self.assertEqual([e['fila'] for e in response.data['errores']], [3, 4])
+        self.assertIn('price', response.data['errores'][0]['errores'])
+        self.assertIn('category', response.data['errores'][1]['errores'])
+        self.assertEqual(Producto.objects.get(product_name='Camisa').id_user, 7)
+
+    def test_error_de_base_en_un_lote_no_corta_la_importacion(self):
+        csv_texto = 'product_name,category,id_user,state,price\n' + ''.join(
+            f'P{i},cat-1,7,1,10\n' for i in range(4)
+        )
+        archivo = SimpleUploadedFile('catalogo.csv', csv_texto.encode(), content_type='text/csv')
+        original = Producto.objects.bulk_create
+
+        def bulk_create(objs, **kwargs):
+            if objs[0].product_name == 'P0':
+                raise IntegrityError('clave duplicada')
+            return original(objs, **kwargs)
+
+        self.client.force_authenticate(self.usuario)
+        with mock.patch.object(Producto.objects, 'bulk_create', side_effect=bulk_create):
+            response = self.client.post(reverse('producto-importar'), {'archivo': archivo}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['creados'], 2)
+        self.assertEqual(response.data['errores'][0]['filas'], [1, 2])
+        self.assertEqual(sorted(Producto.objects.values_list('product_name', flat=True)), ['P2', 'P3'])
+        # Los lotes guardados igual se cuentan
+        self.assertEqual(EstadisticaVendedor.objects.get(pk=7).productos_publicados, 2)
+
+    def test_importar_ndjson_y_exportar(self):
+        lineas = [
+            json.dumps({'product_name': 'Mesa', 'state': 1, 'price': '99.90', 'category': 'cat-1'}),
+            '{no es json',
+            json.dumps({'product_name': 'Silla', 'state': 1, 'price': '45'}),
+        ]
+        archivo = SimpleUploadedFile('catalogo.ndjson', '\n'.join(lineas).encode())
+        self.client.force_authenticate(self.usuario)
+        response = self.client.post(reverse('producto-importar'), {'archivo': archivo}, format='multipart')
+        self.assertEqual(response.data['creados'], 2)
+        self.assertEqual(response.data['errores'][0]['fila'], 2)
+
+        response = self.client.get(reverse('producto-exportar'), {'formato': 'ndjson'})
+        self.assertTrue(response.streaming)
+        filas = [json.loads(linea) for linea in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(sorted(f['product_name'] for f in filas), ['Mesa', 'Silla'])
+        self.assertEqual({f['price'] for f in filas}, {'99.90', '45.00'})
+
+        response = self.client.get(reverse('producto-exportar'), {'category': 'cat-1'})
+        lineas = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lineas[0].split(','), ['product_id', 'product_name', 'description', 'category_id',
+                                                'id_user', 'state', 'price', 'updated_at'])
+        self.assertEqual(len(lineas), 2)
+
+    def test_exportar_bajo_asgi_con_iterador_async(self):
+        crear_producto(Categoria.objects.get(pk='cat-1'), 'Mesa')
+        request = AsyncRequestFactory().get(reverse('producto-exportar'), {'formato': 'ndjson'})
+        response = ProductoViewSet.as_view({'get': 'exportar'})(request)
+        # Un iterador sync se juntaría entero en memoria antes de enviarse
+        self.assertTrue(response.is_async)
+
+        async def leer():
+            return b''.join([parte async for parte in response])
+
+        filas = [json.loads(linea) for linea in async_to_sync(leer)().splitlines()]
+        self.assertEqual([f['product_name'] for f in filas], ['Mesa'])
+
+
+class ConteoListadosTests(ApiTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categoria = Categoria.objects.create(category_id='cat-1', category_name='Ropa')
+        for i in range(5):
+            crear_producto(cls.categoria, f'Producto {i}')
+
+    @override_settings(LIST_COUNT={**settings.LIST_COUNT, 'EXACT_THRESHOLD': 2})
+    def test_estimado_por_encima_del_umbral(self):
+        with connections['default'].cursor() as cursor:
+            cursor.execute('ANALYZE myapp_producto')
+        # Sin filtros: reltuples, sin recorrer la tabla
+        with self.assertNumQueries(1):
+            self.assertEqual(contar(Producto.objects.all()), Conteo(5, False))
+        # Con filtros: COUNT con LIMIT 3 y, como se pasa, la estimación de EXPLAIN
+        conteo = contar(Producto.objects.filter(price__gt=0))
+        self.assertFalse(conteo.exacto)
+        self.assertGreaterEqual(conteo.total, 3)
+        self.assertEqual(contar(Producto.objects.filter(product_name='Producto 1')), Conteo(1, True))
+
+    def test_total_por_categoria_cacheado_solo_en_cache_compartido(self):
+        url = reverse('productos-por-categoria', args=['cat-1'])
+
+        def contar_pagina(page_size):
+            # page_size distinto en cada request: ninguno sale del cache de respuestas
+            with CaptureQueriesContext(connections['default']) as consultas:
+                response = self.client.get(url, {'page_size': page_size})
+            return response.data['count'], any('COUNT(' in c['sql'] for c in consultas)
+
+        # LocMemCache es por proceso: cuenta en cada request
+        self.assertEqual(contar_pagina(1), (5, True))
+        self.assertEqual(contar_pagina(2), (5, True))
+
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        compartido = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directorio}
+        with override_settings(CACHES={**settings.CACHES, 'conteos': compartido},
+                               LIST_COUNT={**settings.LIST_COUNT, 'CACHE_ALIAS': 'conteos'}):
+            self.assertEqual(contar_pagina(3), (5, True))
+            self.assertEqual(contar_pagina(4), (5, False))
+
+            # Se invalida al confirmar la transacción, no antes
+            with self.captureOnCommitCallbacks(execute=True):
+                crear_producto(self.categoria, 'Nuevo')
+                self.assertEqual(contar_pagina(5), (5, False))
+            self.assertEqual(contar_pagina(6), (6, True))
+
+
+# ==========================================
+# 2. PEDIDOS Y DETALLES
+# ==========================================
+class PedidoLecturaTests(ApiTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        categoria = Categoria.objects.create(category_id='cat-1', category_name='Ropa')
+        productos = [crear_producto(categoria, f'Producto {i}') for i in range(3)]
+        for _ in range(4):
+            pedido = Pedido.objects.create(monto_total=Decimal('30.00'))
+            for producto in productos:
+                Detalle.objects.create(pedido=pedido, producto=producto, cantidad=1, precio_unidad=Decimal('10.00'))
+        cls.pedido = pedido
+
+    def test_listado_pedidos_consultas_constantes(self):
+        # Compacto: conteo (reltuples y, con tan pocas filas, COUNT exacto) + pedidos
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('pedido-list'))
+        self.assertEqual((response.data['count'], response.data['count_exact']), (4, True))
+        self.assertNotIn('detalles', response.data['results'][0])
+        # + 1 de detalles con JOIN al producto
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('pedido-list'), {'expand': 'detalles', 'page_size': 3})
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(len(response.data['results'][0]['detalles']), 3)
+        self.assertTrue(response.data['results'][0]['detalles'][0]['producto_nombre'].startswith('Producto'))
+        siguiente = self.client.get(response.data['next'])
+        self.assertEqual((len(siguiente.data['results']), siguiente.data['next']), (1, None))
+
+    def test_detalle_pedido_consultas_constantes(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('pedido-detail', args=[self.pedido.pk]))
+        self.assertEqual(len(response.data['detalles']), 3)
+
+    def test_listado_detalles_una_consulta(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('detalle-list'))
+        self.assertEqual(len(response.data), 12)
+
+
+class PedidoCheckoutTests(ApiTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        categoria = Categoria.objects.create(category_id='cat-1', category_name='Ropa')
+        cls.camisa = crear_producto(categoria, 'Camisa')
+        cls.gorra = crear_producto(categoria, 'Gorra')
+        Producto.objects.filter(pk=cls.camisa.pk).update(price=Decimal('12.50'))
+        Producto.objects.filter(pk=cls.gorra.pk).update(price=Decimal('7.00'))
+        cls.user = get_user_model().objects.create_user('comprador', 'c@example.com', 'x')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def checkout(self, items, clave='carrito-1'):
+        return self.client.post(
+            reverse('pedido-checkout'), {'items': items, 'comentario': 'rápido'},
+            format='json', HTTP_IDEMPOTENCY_KEY=clave,
+        )
+
+    def test_checkout_en_una_transaccion_e_idempotente(self):
+        items = [
+            {'producto': self.camisa.pk, 'cantidad': 1},
+            {'producto': self.gorra.pk, 'cantidad': 2},
+            {'producto': self.camisa.pk, 'cantidad': 1},
+        ]
+        # clave + SELECT FOR UPDATE + pedido + un INSERT de detalles + clave.pedido + lectura (2);
+        # el resto son savepoints (dentro del TestCase la transacción externa también lo es)
+        with self.assertNumQueries(11):
+            response = self.checkout(items)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['monto_total'], '39.00')
+        self.assertEqual(
+            sorted((d['producto_nombre'], d['cantidad']) for d in response.data['detalles']),
+            [('Camisa', 2), ('Gorra', 2)],
+        )
+
+        repetido = self.checkout(items)
+        self.assertEqual(repetido.status_code, 200)
+        self.assertEqual(repetido['Idempotent-Replayed'], 'true')
+        self.assertEqual(repetido.data['id'], response.data['id'])
+        self.assertEqual(Pedido.objects.count(), 1)
+
+        self.assertEqual(self.checkout(items[:1]).status_code, 422)
+
+    def test_cors_permite_la_clave_y_expone_el_replay(self):
+        origen = {'HTTP_ORIGIN': 'https://tienda.example.com'}
+        preflight = self.client.options(
+            reverse('pedido-checkout'), HTTP_ACCESS_CONTROL_REQUEST_METHOD='POST',
+            HTTP_ACCESS_CONTROL_REQUEST_HEADERS='authorization,content-type,idempotency-key', **origen,
+        )
+        self.assertIn('idempotency-key', preflight['Access-Control-Allow-Headers'])
+        response = self.client.get(reverse('producto-list'), **origen)
+        self.assertEqual(response['Access-Control-Expose-Headers'], 'Idempotent-Replayed')
+
+    def test_producto_inexistente_no_deja_nada(self):
+        response = self.checkout([{'producto': 'no-existe', 'cantidad': 1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Pedido.objects.exists())
+        self.assertFalse(PedidoIdempotencia.objects.exists())
+        self.assertEqual(self.client.post(reverse('pedido-checkout'), {}, format='json').status_code, 400)
+
+
+class EstadisticasVendedorTests(ApiTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendedor = get_user_model().objects.create_user('vende', 'v@example.com', 'x')
+        categoria = Categoria.objects.create(category_id='cat-1', category_name='Ropa')
+        cls.camisa = crear_producto(categoria, 'Camisa', id_user=cls.vendedor.pk)
+        cls.gorra = crear_producto(categoria, 'Gorra', id_user=cls.vendedor.pk)
+        cls.pedido = Pedido.objects.create(monto_total=Decimal('27.00'))
+        Detalle.objects.create(pedido=cls.pedido, producto=cls.camisa, cantidad=2, precio_unidad=Decimal('10.00'))
+        Detalle.objects.create(pedido=cls.pedido, producto=cls.gorra, cantidad=1, precio_unidad=Decimal('7.00'))
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.vendedor)
+
+    def estadisticas(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('user-public-estadisticas', args=[self.vendedor.pk]))
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_solo_el_vendedor_o_el_staff(self):
+        url = reverse('user-public-estadisticas', args=[self.vendedor.pk])
+        otro = get_user_model().objects.create_user('otro', 'o@example.com', 'x')
+        admin = get_user_model().objects.create_user('admin', 'a@example.com', 'x', is_staff=True)
+
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_authenticate(otro)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_authenticate(admin)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_incremental_al_completar_y_cancelar(self):
+        datos = self.estadisticas()
+        self.assertEqual((datos['productos_publicados'], datos['unidades_vendidas']), (2, 0))
+
+        self.pedido.estado = 'Completado'
+        self.pedido.save()
+        datos = self.estadisticas()
+        self.assertEqual(
+            (datos['unidades_vendidas'], datos['ingresos'], datos['pedidos_completados']), (3, '27.00', 1),
+        )
+        self.assertEqual(UserProfile.objects.get(user=self.vendedor).products_sold, 3)
+
+        # Guardar otra vez sin cambiar de estado no vuelve a sumar
+        self.pedido.save()
+        self.assertEqual(self.estadisticas()['unidades_vendidas'], 3)
+
+        self.pedido.estado = 'Cancelado'
+        self.pedido.save()
+        self.assertEqual(self.estadisticas()['ingresos'], '0.00')
+
+        otro = crear_producto(self.camisa.category, 'Otro', id_user=self.vendedor.pk)
+        self.assertEqual(self.estadisticas()['productos_publicados'], 3)
+        otro.delete()
+        self.assertEqual(self.estadisticas()['productos_publicados'], 2)
+
+    def test_recalcular_coincide_con_incremental(self):
+        Pedido.objects.filter(pk=self.pedido.pk).update(estado='Completado')  # sin señales
+        EstadisticaVendedor.objects.all().delete()
+        call_command('recalcular_estadisticas', stdout=StringIO())
+        datos = self.estadisticas()
+        self.assertEqual((datos['productos_publicados'], datos['unidades_vendidas'], datos['ingresos']), (2, 3, '27.00'))
+
+    def test_perfil_no_permite_editar_contadores(self):
+        self.client.force_authenticate(self.vendedor)
+        response = self.client.patch(
+            reverse('user-profile-get-or-update-profile'),
+            {'phone': '555', 'rating': '5.00', 'products_sold': 999}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['phone'], response.data['products_sold']), ('555', 0))
+        self.assertEqual(response.data['rating'], '0.00')
+
+
+class VentasDiariasTests(ApiTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_user('admin', 'admin@example.com', 'x', is_staff=True)
+        ropa = Categoria.objects.create(category_id='cat-1', category_name='Ropa')
+        hogar = Categoria.objects.create(category_id='cat-2', category_name='Hogar')
+        camisa = crear_producto(ropa, 'Camisa', id_user=1)
+        taza = crear_producto(hogar, 'Taza', id_user=2)
+        cls.pedidos = []
+        for lineas in ([(camisa, 2), (taza, 1)], [(camisa, 1)], [(taza, 3)]):
+            pedido = Pedido.objects.create(monto_total=Decimal('0'))
+            for producto, cantidad in lineas:
+                Detalle.objects.create(pedido=pedido, producto=producto, cantidad=cantidad, precio_unidad=Decimal('10.00'))
+            cls.pedidos.append(pedido)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.admin)
+        self.hoy = timezone.localdate().isoformat()
+
+    def ventas(self, **params):
+        return self.client.get(reverse('analitica-ventas'), {'desde': self.hoy, 'hasta': self.hoy, **params})
+
+    def completar(self, *pedidos):
+        for pedido in pedidos:
+            pedido.estado = 'Completado'
+            pedido.save()
+
+    def test_rollup_incremental_y_consultas(self):
+        self.completar(*self.pedidos[:2])
+        with self.assertNumQueries(2):  # filas + totales, solo de los agregados
+            response = self.ventas()
+        self.assertEqual(response.data['resultados'][0]['pedidos'], 2)
+        self.assertEqual(response.data['totales'], {'pedidos': 2, 'unidades': 4, 'ingresos': '40.00'})
+
+        por_categoria = self.ventas(agrupar='categoria').data['resultados']
+        self.assertEqual(
+            [(f['category_name'], f['unidades'], f['ingresos']) for f in por_categoria],
+            [('Ropa', 3, '30.00'), ('Hogar', 1, '10.00')],
+        )
+        self.assertEqual(self.ventas(agrupar='vendedor', vendedor=2).data['totales']['unidades'], 1)
+
+        # Cancelar un pedido completado lo descuenta
+        self.pedidos[0].estado = 'Cancelado'
+        self.pedidos[0].save()
+        self.assertEqual(self.ventas().data['totales'], {'pedidos': 1, 'unidades': 1, 'ingresos': '10.00'})
+
+    def test_backfill_igual_que_incremental(self):
+        self.completar(*self.pedidos)
+        self.pedidos[0].delete()  # borrar un pedido completado también lo descuenta
+        incremental = [self.ventas().data, self.ventas(agrupar='categoria').data]
+        self.assertEqual(incremental[0]['totales'], {'pedidos': 2, 'unidades': 4, 'ingresos': '40.00'})
+
+        ResumenDiario.objects.all().delete()
+        VentaDiaria.objects.all().delete()
+        call_command('reconstruir_ventas_diarias', stdout=StringIO())
+        self.assertEqual([self.ventas().data, self.ventas(agrupar='categoria').data], incremental)
+
+    def test_cambios_de_lineas_y_de_dia_por_delta(self):
+        self.completar(*self.pedidos)
+        ayer = (timezone.localdate() - timedelta(days=1)).isoformat()
+        detalle = self.pedidos[1].detalles.get()
+        detalle.cantidad = 4
+        with CaptureQueriesContext(connections['default']) as consultas:
+            detalle.save()
+        # Suma la diferencia: no borra ni vuelve a armar las filas del día
+        self.assertFalse([q for q in consultas if q['sql'].startswith('DELETE')])
+        self.pedidos[2].detalles.get().delete()
+        self.pedidos[0].fecha_pedido -= timedelta(days=1)
+        self.pedidos[0].save()
+
+        self.assertEqual(self.ventas().data['totales'], {'pedidos': 2, 'unidades': 4, 'ingresos': '40.00'})
+        incremental = [self.ventas(desde=ayer).data, self.ventas(desde=ayer, agrupar='categoria').data]
+        self.assertEqual(incremental[0]['resultados'][0], {'fecha': date.fromisoformat(ayer), 'pedidos': 1, 'unidades': 3, 'ingresos': '30.00'})
+
+        call_command('reconstruir_ventas_diarias', '--desde', ayer, stdout=StringIO())
+        self.assertEqual([self.ventas(desde=ayer).data, self.ventas(desde=ayer, agrupar='categoria').data], incremental)
+
+    def test_parametros_y_permisos(self):
+        self.assertEqual(self.ventas(agrupar='semana').status_code, 400)
+        self.assertEqual(self.client.get(reverse('analitica-ventas'), {'desde': '2026-02-01', 'hasta': '2026-01-01'}).status_code, 400)
+        self.client.force_authenticate(None)
+        self.assertIn(self.ventas().status_code, (401, 403))
+
+
+# ==========================================
+# 3. AUTENTICACIÓN
+# ==========================================
+class AutenticacionCacheTests(ApiTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user('cliente', 'c@example.com', 'clave-segura-123')
+        cls.token = Token.objects.create(user=cls.usuario)
+
+    def get_perfil(self, **headers):
+        return self.client.get(reverse('user-profile-get-or-update-profile'), **headers)
+
+    def test_header_x_user_id_cacheado(self):
+        self.assertEqual(self.get_perfil(HTTP_X_USER_ID=str(self.usuario.pk)).status_code, 200)
+        # Solo queda la consulta del perfil: el usuario sale del cache
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get_perfil(HTTP_X_USER_ID=str(self.usuario.pk)).status_code, 200)
+        self.assertEqual(self.get_perfil(HTTP_X_USER_ID='999999').status_code, 403)
+
+        self.usuario.is_active = False
+        self.usuario.save()
+        self.assertEqual(get_user_cache().get_user(self.usuario.pk).is_active, False)
+
+    def test_token_cacheado_e_invalidado(self):
+        auth = {'HTTP_AUTHORIZATION': f'Token {self.token.key}'}
+        self.assertEqual(self.get_perfil(**auth).status_code, 200)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get_perfil(**auth).status_code, 200)
+        stats = get_user_cache().stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits_local'], 2)
+
+        # 403 y no 401: la primera clase de autenticación no define authenticate_header
+        self.token.delete()
+        self.assertEqual(self.get_perfil(**auth).status_code, 403)
+
+
+class LoginTests(ApiTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user('Maria', 'Maria@Example.com', 'clave-segura-123')
+
+    def login(self, user, password='clave-segura-123', **extra):
+        return self.client.post(reverse('login'), {'user': user, 'password': password}, format='json', **extra)
+
+    def test_login_por_email_o_username_sin_mayusculas(self):
+        # 1a vez: SELECT usuario+token, INSERT del token
+        with self.assertNumQueries(2):
+            response = self.login('maria@example.COM')
+        self.assertEqual(response.status_code, 200)
+        token = response.data['token']
+        # Después: una sola consulta, sin escrituras
+        with self.assertNumQueries(1):
+            response = self.login('MARIA')
+        self.assertEqual(response.data['token'], token)
+        self.assertEqual(self.login('maria', 'otra').status_code, 400)
+
+    def test_valores_que_no_son_texto_dan_400(self):
+        for user, password in ((123, 'clave-segura-123'), (['maria'], 'x'), ('maria', {'a': 1})):
+            with self.assertNumQueries(0):
+                response = self.login(user, password)
+            self.assertEqual(response.status_code, 400, user)
+        response = self.client.post(reverse('login'), ['maria', 'clave'], format='json')
+        self.assertEqual(response.status_code, 400)
+
+    @mock.patch.object(LoginAccountThrottle, 'rate', '3/hour', create=True)
+    def test_limite_por_cuenta_rechaza_antes_de_consultar(self):
+        for _ in range(3):
+            self.assertEqual(self.login('maria', 'mala').status_code, 400)
+        with self.assertNumQueries(0):
+            response = self.login('MARIA', 'mala')
+        self.assertEqual(response.status_code, 429)
+        # Otra cuenta desde la misma IP sigue pudiendo intentar
+        self.assertEqual(self.login('otra', 'mala').status_code, 400)
+
+
+class RegistroTests(ApiTestCase):
+
+    def registrar(self, email):
+        datos = {'user': email, 'user_name': 'Juan Pérez', 'password': 'clave-segura-123'}
+        return self.client.post(reverse('registro'), datos, format='json')
+
+    def test_username_sin_consultas_por_colision(self):
+        User = get_user_model()
+        for i in range(3):
+            self.assertEqual(self.registrar(f'juan@dominio{i}.com').status_code, 201)
+        # validate_user, lock, email de nuevo, INSERT 'juan' (falla), INSERT con
+        # sufijo, INSERT perfil; +7 SAVEPOINT/ROLLBACK/RELEASE (el TestCase ya
+        # corre dentro de una transacción)
+        with self.assertNumQueries(13):
+            self.assertEqual(self.registrar('juan@dominio9.com').status_code, 201)
+        nombres = list(User.objects.filter(email__startswith='juan@').order_by('pk').values_list('username', flat=True))
+        self.assertEqual(nombres[0], 'juan')
+        self.assertEqual(len(set(nombres)), 4)
+        for nombre in nombres[1:]:
+            self.assertRegex(nombre, r'^juan[0-9]+$')
+        self.assertEqual(UserProfile.objects.filter(user__email__startswith='juan@').count(), 4)
+
+    def test_reintenta_si_el_sufijo_ya_existe(self):
+        get_user_model().objects.create_user('ana', 'x@example.com', 'x')
+        get_user_model().objects.create_user('ana123', 'y@example.com', 'x')
+        with mock.patch('myapp.serializers.secrets.randbelow', side_effect=[123, 456]):
+            self.assertEqual(self.registrar('ana@example.com').status_code, 201)
+        self.assertTrue(get_user_model().objects.filter(username='ana456', email='ana@example.com').exists())
+
+    def test_error_del_perfil_deshace_el_registro(self):
+        with mock.patch.object(UserProfile.objects, 'bulk_create', side_effect=DatabaseError('perfil roto')), \
+                self.assertRaisesMessage(DatabaseError, 'perfil roto'):
+            self.registrar('ana@example.com')
+        self.assertFalse(get_user_model().objects.filter(email='ana@example.com').exists())
+
+    def test_correo_duplicado(self):
+        self.registrar('ana@example.com')
+        response = self.registrar('ana@example.com')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'El correo ya está registrado.')
+
+
+class UsuariosPublicosTests(ApiTestCase):
+
+    def test_fields_y_expand_profile(self):
+        user = get_user_model().objects.create_user('ana', 'ana@example.com', 'x')
+        UserProfile.objects.update_or_create(user=user, defaults={'phone': '555'})
+        url = reverse('user-public-detail', args=[user.pk])
+
+        self.assertEqual(self.client.get(url, {'fields': 'id,username'}).data, {'id': user.pk, 'username': 'ana'})
+        # El perfil (teléfono, dirección) no es público
+        response = self.client.get(url, {'fields': 'username', 'expand': 'profile'})
+        self.assertEqual(response.data, {'username': 'ana'})
+        listado = self.client.get(reverse('user-public-list'), {'expand': 'profile'}).data
+        self.assertTrue(listado)
+        self.assertFalse(any('profile' in fila for fila in listado))
+        self.client.force_authenticate(get_user_model().objects.create_user('otro', 'otro@example.com', 'x'))
+        self.assertNotIn('profile', self.client.get(url, {'expand': 'profile'}).data)
+
+        self.client.force_authenticate(user)
+        with self.assertNumQueries(1):  # el perfil viene en el mismo SELECT
+            response = self.client.get(url, {'fields': 'username', 'expand': 'profile'})
+        self.assertEqual(response.data['profile']['phone'], '555')
+
+# ==========================================
+# 4. CHAT (REST + WEBSOCKET)
+# ==========================================
+class ChatTests(ApiTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('chat', 'chat@example.com', 'x')
+        cls.token = Token.objects.create(user=cls.user)
+        cls.vendedor = Vendedor.objects.create(nombre='Tienda')
+
+    def enviar(self, texto):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                reverse('mensaje-list'),
+                {'vendedor': self.vendedor.pk, 'cliente_id': self.user.pk, 'texto': texto},
+                format='json',
+            )
+
+    def test_historial_paginado_por_cursor(self):
+        for i in range(5):
+            self.enviar(f'hola {i}')
+        url = reverse('mensaje-list')
+        respuesta = self.client.get(url, {'vendedor': self.vendedor.pk, 'cliente_id': self.user.pk, 'page_size': 3})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([m['texto'] for m in respuesta.data['results']], ['hola 4', 'hola 3', 'hola 2'])
+        self.assertEqual((respuesta.data['count'], respuesta.data['count_exact']), (5, True))  # de la bandeja
+        siguiente = self.client.get(respuesta.data['next'])
+        self.assertEqual([m['texto'] for m in siguiente.data['results']], ['hola 1', 'hola 0'])
+
+    def test_historial_solo_del_propio_cliente(self):
+        self.enviar('privado')
+        otro = get_user_model().objects.create_user('otro', 'otro@example.com', 'x')
+        self.client.force_authenticate(otro)
+        url = reverse('mensaje-list')
+        respuesta = self.client.get(url, {'vendedor': self.vendedor.pk, 'cliente_id': self.user.pk})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual((respuesta.data['results'], respuesta.data['count']), ([], 0))
+        # Sin cliente_id el total de la bandeja es el del propio cliente
+        self.assertEqual(self.client.get(url, {'vendedor': self.vendedor.pk}).data['count'], 0)
+
+        # cliente_id y es_vendedor los pone el servidor
+        respuesta = self.client.post(
+            url, {'vendedor': self.vendedor.pk, 'cliente_id': self.user.pk, 'texto': 'suplantado', 'es_vendedor': True},
+            format='json',
+        )
+        self.assertEqual((respuesta.data['cliente_id'], respuesta.data['es_vendedor']), (otro.pk, False))
+
+        staff = get_user_model().objects.create_user('soporte', 'soporte@example.com', 'x', is_staff=True)
+        self.client.force_authenticate(staff)
+        respuesta = self.client.get(url, {'vendedor': self.vendedor.pk, 'cliente_id': self.user.pk})
+        self.assertEqual([m['texto'] for m in respuesta.data['results']], ['privado'])
+
+    def test_websocket_recibe_mensajes_nuevos(self):
+        from api.asgi import application
+
+        async def escenario():
+            entrada, salida = asyncio.Queue(), asyncio.Queue()
+            scope = {'type': 'websocket', 'path': '/ws/chat/', 'query_string': f'token={self.token.key}'.encode()}
+            await entrada.put({'type': 'websocket.connect'})
+            conexion = asyncio.ensure_future(application(scope, entrada.get, salida.put))
+            self.assertEqual((await salida.get())['type'], 'websocket.accept')
+
+            respuesta = await sync_to_async(self.enviar)('en vivo')
+            self.assertEqual(respuesta.status_code, 201)
+            evento = await asyncio.wait_for(salida.get(), timeout=2)
+
+            await entrada.put({'type': 'websocket.disconnect'})
+            await conexion
+            return json.loads(evento['text'])
+
+        self.assertEqual(async_to_sync(escenario)()['texto'], 'en vivo')
+
+    def test_websocket_sin_token_se_cierra(self):
+        from api.asgi import application
+
+        async def escenario():
+            enviados = []
+
+            async def recibir():
+                return {'type': 'websocket.connect'}
+
+            async def enviar(evento):
+                enviados.append(evento)
+
+            await application({'type': 'websocket', 'path': '/ws/chat/', 'query_string': b''}, recibir, enviar)
+            return enviados
+
+        self.assertEqual(async_to_sync(escenario)(), [{'type': 'websocket.close', 'code': 4401}])
+
+    def test_bandeja_con_resumen_y_no_leidos(self):
+        producto = crear_producto(Categoria.objects.create(category_id='cat-chat', category_name='Chat'))
+        self.enviar('pregunta')
+        for texto in ('respuesta 1', 'respuesta 2'):
+            Mensaje.objects.create(vendedor=self.vendedor, cliente_id=self.user.pk, texto=texto, es_vendedor=True)
+        Mensaje.objects.create(vendedor=self.vendedor, cliente_id=self.user.pk, producto=producto, texto='otro')
+
+        url = reverse('conversacion-list')
+        with self.assertNumQueries(1):  # el token ya está en cache: solo la página
+            respuesta = self.client.get(url, {'cliente_id': self.user.pk})
+        general, por_producto = sorted(respuesta.data['results'], key=lambda c: c['producto'] is not None)
+        self.assertEqual(
+            (general['total_mensajes'], general['ultimo_texto'], general['no_leidos_cliente']),
+            (3, 'respuesta 2', 2),
+        )
+        self.assertEqual(por_producto['no_leidos_vendedor'], 1)
+
+        leer = reverse('conversacion-leer', args=[general['id']])
+        self.assertEqual(self.client.post(leer, {'lado': 'vendedor'}, format='json').status_code, 403)
+        leida = self.client.post(leer, {'lado': 'cliente'}, format='json')
+        self.assertEqual(leida.data['no_leidos_cliente'], 0)
+
+        # Otro cliente no ve la bandeja ajena aunque pase su cliente_id
+        self.client.force_authenticate(get_user_model().objects.create_user('otro', 'otro@example.com', 'x'))
+        self.assertEqual(self.client.get(url, {'cliente_id': self.user.pk}).data['results'], [])
+        self.assertEqual(self.client.post(leer, {'lado': 'cliente'}, format='json').status_code, 404)
+        self.client.force_authenticate(None)
+
+        # Borrar un mensaje recalcula; la reconstrucción llega al mismo estado
+        Mensaje.objects.filter(texto='respuesta 2').get().delete()
+        antes = list(Conversacion.objects.order_by('producto').values(*ChatTests.CAMPOS_RESUMEN))
+        call_command('reconstruir_conversaciones', lote=1, stdout=StringIO())
+        despues = list(Conversacion.objects.order_by('producto').values(*ChatTests.CAMPOS_RESUMEN))
+        self.assertEqual(antes, despues)
+        self.assertEqual(Conversacion.objects.get(producto=None).ultimo_texto, 'respuesta 1')
+
+    CAMPOS_RESUMEN = (
+        'vendedor', 'cliente_id', 'producto', 'ultimo_mensaje', 'ultimo_texto', 'ultima_fecha',
+        'total_mensajes', 'no_leidos_cliente', 'no_leidos_vendedor',
+    )
+
+
+# ==========================================
+# 5. RÉPLICAS DE LECTURA
+# ==========================================
+@override_settings(DATABASE_REPLICAS=['replica_prueba'], REPLICA_STICKY_SECONDS=60)
+class ReplicaRoutingTests(ApiTestCase):
+    """La "réplica" es una segunda conexión a la base de pruebas.
+
+    Lo que TestCase crea en `default` no está confirmado, así que la réplica no
+    lo ve: si un GET no devuelve el mensaje es porque leyó de la réplica.
+    """
+    # '__all__' se resuelve en setUpClass, cuando el alias ya existe
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        connections.settings['replica_prueba'] = dict(connections['default'].settings_dict)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica_prueba'].close()
+        del connections['replica_prueba']
+        del connections.settings['replica_prueba']
+
+    def setUp(self):
+        super().setUp()
+        # TestCase corre cada prueba dentro de transacciones abiertas en
+        # `default`: para el router solo cuentan las que abra el request
+        externas = len(connections['default'].atomic_blocks)
+        en_transaccion = mock.patch(
+            'myapp.db_router._en_transaccion', lambda: len(connections['default'].atomic_blocks) > externas,
+        )
+        en_transaccion.start()
+        self.addCleanup(en_transaccion.stop)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('lector', 'l@example.com', 'x')
+        cls.vendedor = Vendedor.objects.create(nombre='Tienda')
+        Mensaje.objects.create(vendedor=cls.vendedor, cliente_id=cls.user.pk, texto='solo en el primario')
+
+    def textos(self, client):
+        return [m['texto'] for m in client.get(reverse('mensaje-list')).data['results']]
+
+    def test_get_lee_de_la_replica_y_se_fija_al_primario_tras_escribir(self):
+        # La sesión identifica al cliente para fijarlo al primario
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = 'sesion-1'
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.textos(self.client), [])
+
+        response = self.client.post(
+            reverse('mensaje-list'),
+            {'vendedor': self.vendedor.pk, 'cliente_id': self.user.pk, 'texto': 'nuevo'},
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.textos(self.client), ['nuevo', 'solo en el primario'])
+
+        # Otro cliente sin escrituras sigue leyendo de la réplica
+        otro = APIClient()
+        otro.cookies[settings.SESSION_COOKIE_NAME] = 'sesion-2'
+        otro.force_authenticate(self.user)
+        self.assertEqual(self.textos(otro), [])
+
+
+    def test_system_check_exige_cache_compartido_para_los_pines(self):
+        # 'default' es LocMemCache: cada worker tendría sus propios pines
+        self.assertEqual([e.id for e in revisar_cache_de_replicas(None)], ['myapp.E001'])
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        compartido = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directorio}
+        with override_settings(CACHES={**settings.CACHES, 'pines': compartido}, REPLICA_PIN_CACHE='pines'):
+            self.assertEqual(revisar_cache_de_replicas(None), [])
+
+
+class DbPoolStatsTests(ApiTestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        config = dict(connections['default'].settings_dict)
+        config.update(CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=True, OPTIONS={'pool': {'min_size': 1, 'max_size': 2}})
+        connections.settings['pool_prueba'] = config
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['pool_prueba'].close()
+        connections['pool_prueba'].close_pool()
+        del connections['pool_prueba']
+        del connections.settings['pool_prueba']
+
+    def test_estadisticas_del_pool(self):
+        admin = get_user_model().objects.create_user('admin', 'a@example.com', 'x', is_staff=True)
+        with connections['pool_prueba'].cursor() as cursor:
+            cursor.execute('SELECT 1')
+            self.client.force_authenticate(admin)
+            datos = self.client.get(reverse('internal-db-pool')).data
+
+        self.assertEqual(datos['default'], {'pool': False})
+        self.assertTrue(datos['pool_prueba']['pool'])
+        self.assertEqual(datos['pool_prueba']['max'], 2)
+        self.assertEqual(datos['pool_prueba']['en_uso'], 1)
+        self.assertGreaterEqual(datos['pool_prueba']['peticiones'], 1)
+
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(reverse('internal-db-pool')).status_code, 403)
+
+
+# ==========================================
+# 6. VISTAS ASYNC (MODO ASGI)
+# ==========================================
+class VistasAsyncTests(ApiTestCase):
+    """Las vistas de myapp.async_views responden lo mismo que las vistas DRF."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categoria = Categoria.objects.create(category_id='cat-1', category_name='Ropa')
+        cls.productos = [crear_producto(cls.categoria, f'Producto {i}', imagenes=2) for i in range(5)]
+        cls.user = get_user_model().objects.create_user('perfil', 'p@example.com', 'x')
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        super().setUp()
+        from myapp.urls import router
+        self.vistas = {p.name: p.callback for p in con_vistas_async(router.urls) if p.name in VISTAS_ASYNC}
+
+    def async_get(self, nombre, ruta, datos=None, **kwargs):
+        get_response_cache().clear()
+        request = AsyncRequestFactory().get(ruta, datos, headers=kwargs.pop('headers', None))
+        return async_to_sync(self.vistas[nombre])(request, **kwargs)
+
+    def drf_get(self, ruta, datos=None, **extra):
+        get_response_cache().clear()
+        return self.client.get(ruta, datos, **extra)
+
+    def test_listado_paginado_igual_que_drf(self):
+        url = reverse('producto-list')
+        drf = self.drf_get(url, {'page_size': 2}).json()
+        asincrona = json.loads(self.async_get('producto-list', url, {'page_size': 2}).content)
+        self.assertEqual(asincrona, drf)
+
+        # Los cursores son intercambiables en ambos sentidos
+        siguiente = asincrona['next'].replace('http://testserver', '')
+        drf2 = self.drf_get(siguiente).json()
+        asincrona2 = json.loads(self.async_get('producto-list', siguiente).content)
+        self.assertEqual(asincrona2, drf2)
+        anterior = asincrona2['previous'].replace('http://testserver', '')
+        self.assertEqual(json.loads(self.async_get('producto-list', anterior).content), drf)
+
+        # Búsqueda y campos a pedido usan la misma vista DRF por dentro
+        for datos in ({'search': 'producto'}, {'fields': 'product_name', 'expand': 'description'}):
+            asincrona = json.loads(self.async_get('producto-list', url, datos).content)
+            self.assertEqual(asincrona, self.drf_get(url, datos).json())
+        self.assertEqual(self.async_get('producto-list', url, {'cursor': 'basura'}).status_code, 404)
+
+    def test_detalle_etag_y_404(self):
+        url = reverse('producto-detail', args=[self.productos[0].pk])
+        drf = self.drf_get(url)
+        asincrona = self.async_get('producto-detail', url, pk=self.productos[0].pk)
+        self.assertEqual(json.loads(asincrona.content), drf.json())
+        self.assertEqual(asincrona['ETag'], drf['ETag'])
+
+        no_modificado = self.async_get(
+            'producto-detail', url, pk=self.productos[0].pk, headers={'If-None-Match': drf['ETag']},
+        )
+        self.assertEqual(no_modificado.status_code, 304)
+        self.assertEqual(self.async_get('producto-detail', '/api/productos/x/', pk='x').status_code, 404)
+
+    def test_categorias_y_perfil(self):
+        url = reverse('categoria-list')
+        self.assertEqual(json.loads(self.async_get('categoria-list', url).content), self.drf_get(url).json())
+
+        url = reverse('user-profile-get-or-update-profile')
+        credencial = {'Authorization': f'Token {self.token.key}'}
+        respuesta = self.async_get('user-profile-get-or-update-profile', url, headers=credencial)
+        self.assertEqual(json.loads(respuesta.content), self.drf_get(url, headers=credencial).json())
+        # Sin credenciales responde la vista DRF (mismo error de siempre)
+        self.assertEqual(
+            self.async_get('user-profile-get-or-update-profile', url).status_code,
+            self.drf_get(url).status_code,
+        )
+
+    def test_autenticacion_negociacion_y_throttling(self):
+        """El camino async corre `initial()` de DRF: mismos 401/403, 406 y 429."""
+        url = reverse('producto-list')
+        for headers in ({'Authorization': 'Token basura'}, {'X-User-Id': '999999'}):
+            respuesta = self.async_get('producto-list', url, headers=headers)
+            self.assertIn(respuesta.status_code, (401, 403))
+            self.assertEqual(respuesta.status_code, self.drf_get(url, headers=headers).status_code)
+
+        xml = self.async_get('producto-list', url, headers={'Accept': 'application/xml'})
+        self.assertEqual(xml.status_code, 406)
+        detalle = reverse('producto-detail', args=[self.productos[0].pk])
+        respuesta = self.async_get(
+            'producto-detail', detalle, pk=self.productos[0].pk, headers={'Accept': 'application/xml'},
+        )
+        self.assertEqual(respuesta.status_code, 406)
+
+        class SinCupo(throttling.BaseThrottle):
+            def allow_request(self, request, view):
+                return False
+
+        with mock.patch.object(ProductoViewSet, 'throttle_classes', [SinCupo]):
+            self.assertEqual(self.async_get('producto-list', url).status_code, 429)
+
+        perfil = reverse('user-profile-get-or-update-profile')
+        headers = {'Authorization': 'Token basura'}
+        respuesta = self.async_get('user-profile-get-or-update-profile', perfil, headers=headers)
+        self.assertEqual(respuesta.status_code, self.drf_get(perfil, headers=headers).status_code)
+
+
+# ==========================================
+# 7. BENCHMARKS
+# ==========================================
+class BenchmarkTests(ApiTestCase):
+
+    def test_generar_datos_y_bench_api(self):
+        salida = StringIO()
+        call_command(
+            'generar_datos', productos=30, pedidos=4, mensajes=6, vendedores=2, usuarios=1,
+            stdout=StringIO(), stderr=StringIO(),
+        )
+        self.assertEqual(Producto.objects.filter(category__category_id__startswith='bench-').count(), 30)
+        self.assertEqual(Detalle.objects.filter(pedido__comentario='bench-pedido').count(), 12)
+        self.assertEqual(Conversacion.objects.filter(vendedor__nombre__startswith='bench-').count(),
+                         Mensaje.objects.values('vendedor', 'cliente_id', 'producto').distinct().count())
+
+        # Umbral bajo: el listado cuenta como en una tabla grande (reltuples, sin COUNT)
+        with override_settings(LIST_COUNT={**settings.LIST_COUNT, 'EXACT_THRESHOLD': 10}):
+            call_command('bench_api', iteraciones=3, calentamiento=0, stdout=salida, stderr=StringIO())
+        informe = json.loads(salida.getvalue())
+        self.assertEqual(informe['meta']['datos']['productos'], 30)
+        for nombre, resultado in informe['endpoints'].items():
+            self.assertEqual(resultado['estados'], {'200': 3}, nombre)
+            self.assertIsNotNone(resultado['p99_ms'])
+        self.assertEqual(informe['endpoints']['productos']['consultas_max'], 4)
+
+        call_command('generar_datos', limpiar=True, stdout=StringIO())
+        self.assertFalse(Producto.objects.exists())
+        self.assertFalse(Vendedor.objects.exists())
+
+
+# ==========================================
+# 8. MÉTRICAS POR REQUEST
+# ==========================================
+@override_settings(
+    MIDDLEWARE=['myapp.metricas.MetricasMiddleware', *settings.MIDDLEWARE],
+    REQUEST_METRICS={**settings.REQUEST_METRICS, 'ENABLED': True},
+)
+class MetricasTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        get_registro().clear()
+        categoria = Categoria.objects.create(category_id='cat-1', category_name='Ropa')
+        for i in range(3):
+            crear_producto(categoria, f'Producto {i}')
+
+    def test_server_timing_log_e_histogramas(self):
+        with self.assertLogs('myapp.metricas', 'INFO') as logs:
+            response = self.client.get(reverse('producto-list'))
+
+        self.assertRegex(response['Server-Timing'], r'^total;dur=[\d.]+, sql;dur=[\d.]+;desc="\d+ consultas", serializer;dur=')
+        self.assertNotIn('n1;', response['Server-Timing'])
+        registro = json.loads(logs.records[0].getMessage())
+        self.assertEqual(registro['vista'], 'producto-list')
+        self.assertEqual(registro['bytes'], len(response.content))
+        self.assertGreater(registro['consultas'], 0)
+        self.assertGreater(registro['serializer_ms'], 0)
+
+        resumen = get_registro().resumen()['producto-list']
+        self.assertEqual(resumen['total_ms']['n'], 1)
+        self.assertEqual(resumen['consultas']['suma'], registro['consultas'])
+        self.assertEqual(resumen['estados'], {'2xx': 1})
+
+    def test_marca_posible_n_mas_1(self):
+        with override_settings(REQUEST_METRICS={**settings.REQUEST_METRICS, 'N_MAS_1_UMBRAL': 1}), \
+                self.assertLogs('myapp.metricas', 'WARNING') as logs:
+            response = self.client.get(reverse('producto-list'))
+
+        self.assertIn('n1;desc="posible N+1"', response['Server-Timing'])
+        registro = json.loads(logs.records[0].getMessage())
+        self.assertTrue(registro['n_mas_1'])
+        self.assertIn('SELECT', registro['sentencia_repetida']['sql'])
+        self.assertEqual(get_registro().resumen()['producto-list']['n_mas_1'], 1)
+
+    def test_sin_enabled_no_parchea_los_serializers(self):
+        clases = (serializers.Serializer, serializers.ListSerializer)
+        originales = [getattr(c.data.fget, 'original', c.data) for c in clases]
+        with mock.patch.object(clases[0], 'data', originales[0]), \
+                mock.patch.object(clases[1], 'data', originales[1]), \
+                override_settings(REQUEST_METRICS={**settings.REQUEST_METRICS, 'ENABLED': False}):
+            MetricasMiddleware(lambda request: None)
+            self.assertEqual([c.data for c in clases], originales)
+
+            with override_settings(REQUEST_METRICS={**settings.REQUEST_METRICS, 'ENABLED': True}):
+                MetricasMiddleware(lambda request: None)
+            self.assertTrue(all(c.data.fget.instrumentado for c in clases))
+
+    def test_percentil_fuera_de_los_buckets_es_json_valido(self):
+        histograma = HistogramaRodante([1, 10])
+        histograma.observar(50, ahora=0)
+        resumen = histograma.resumen(ahora=0)
+        self.assertEqual((resumen['p50'], resumen['p99']), ('+Inf', '+Inf'))
+        # float('inf') rompía el endpoint JSON: no es un valor JSON válido
+        json.dumps(resumen, allow_nan=False)
+
+    def test_endpoint_json_y_prometheus(self):
+        with self.assertLogs('myapp.metricas', 'INFO'):
+            self.client.get(reverse('producto-list'))
+            self.assertEqual(self.client.get(reverse('internal-metricas')).status_code, 403)
+
+            admin = get_user_model().objects.create_user('admin', 'a@example.com', 'x', is_staff=True)
+            self.client.force_authenticate(admin)
+            datos = self.client.get(reverse('internal-metricas')).json()
+            texto = self.client.get(reverse('internal-metricas'), {'format': 'prometheus'}).content.decode()
+
+        self.assertEqual(datos['producto-list']['total_ms']['n'], 1)
+        self.assertIn('myapp_request_total_ms_bucket{vista="producto-list",le="+Inf"} 1', texto)
+        self.assertIn('myapp_request_n_mas_1_total{vista="producto-list"} 0', texto)
+
+
+# ==========================================
+# 9. RENDIMIENTO DE RESPUESTAS (PROYECCIÓN, RENDERER, COMPRESIÓN)
+# ==========================================
+class RespuestasRapidasTests(ApiTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        categoria = Categoria.objects.create(category_id='cat-1', category_name='Ropa ñandú')
+        for i in range(30):
+            crear_producto(
+                categoria, f'Producto {i}', description='x' * 200,
+                image=f'productos/p{i}.jpg' if i % 2 else None,
+                image_variantes={'320': {'webp': f'productos/p{i}_320.webp'}} if i % 2 else {},
+            )
+        pedido = Pedido.objects.create(monto_total=Decimal('12.50'), comentario='Sin cebolla')
+        Detalle.objects.create(pedido=pedido, producto=Producto.objects.first(), cantidad=1, precio_unidad=Decimal('12.50'))
+
+    def test_proyeccion_igual_que_serializer(self):
+        for nombre, params in (('producto-list', {'page_size': 30}), ('producto-list', {'search': 'producto'}),
+                               ('pedido-list', {})):
+            rapida = self.client.get(reverse(nombre), params).json()
+            cache = get_response_cache()
+            if cache is not None:
+                cache.clear()  # que la segunda respuesta no salga del cache
+            with override_settings(FAST_JSON={**settings.FAST_JSON, 'PROYECCION': False}):
+                normal = self.client.get(reverse(nombre), params).json()
+            self.assertEqual(rapida, normal, nombre)
+        self.assertEqual(rapida['results'][0]['monto_total'], '12.50')
+
+    def test_renderer_igual_que_drf(self):
+        datos = {'precio': Decimal('1.50'), 'fecha': timezone.now(), 'texto': 'ñandú', 'lazy': gettext_lazy('Hola'),
+                 'lista': [1, 2.5, None, True]}
+        self.assertEqual(FastJSONRenderer().render(datos), JSONRenderer().render(datos))
+
+    def test_compresion_negociada(self):
+        url = reverse('producto-list')
+        response = self.client.get(url, {'page_size': 30}, headers={'Accept-Encoding': 'gzip, br'})
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(len(json.loads(brotli.decompress(response.content))['results']), 30)
+        self.assertTrue(response['ETag'].startswith('W/"'))
+
+        # El ETag débil sigue sirviendo para el GET condicional
+        no_modificado = self.client.get(url, {'page_size': 30}, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(no_modificado.status_code, 304)
+
+        response = self.client.get(url, {'page_size': 30}, headers={'Accept-Encoding': 'br;q=0, gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))['results']), 30)
+
+        # Respuestas chicas (p. ej. el login) no se comprimen
+        response = self.client.get(url, {'page_size': 1}, headers={'Accept-Encoding': 'gzip, br'})
+        self.assertFalse(response.has_header('Content-Encoding'))
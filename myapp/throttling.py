@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import SimpleRateThrottle
+
+
+# ==========================================
+# LÍMITES DEL LOGIN
+# ==========================================
+# DRF revisa los throttles en `initial()`, antes de llamar a `post()`: un
+# intento rechazado no llega a buscar al usuario ni a calcular el hash PBKDF2.
+# El cache es el de LOGIN_THROTTLE_CACHE: 'default' (locmem, por proceso) o un
+# alias compartido (Redis/Memcached) para contar entre todos los workers.
+
+class LoginThrottle(SimpleRateThrottle):
+
+    def __init__(self):
+        self.cache = caches[settings.LOGIN_THROTTLE_CACHE]
+        super().__init__()
+
+
+class LoginIPThrottle(LoginThrottle):
+    """Intentos de login por IP (rate 'login_ip')."""
+    scope = 'login_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class LoginAccountThrottle(LoginThrottle):
+    """Intentos de login por cuenta (rate 'login_account'), sin importar la IP."""
+    scope = 'login_account'
+
+    def get_cache_key(self, request, view):
+        datos = request.data if isinstance(request.data, dict) else {}
+        cuenta = datos.get('user') or datos.get('username')
+        if not cuenta or not isinstance(cuenta, str):
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': str(cuenta).strip().lower()}
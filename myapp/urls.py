@@ -1,4 +1,5 @@
 # Ubicación: api/myapp/urls.py
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
@@ -11,8 +12,15 @@ from .views import (
     RegisterAPIView,
     LoginAPIView,
     UserPublicViewSet,
-    UserProfileViewSet
+    UserProfileViewSet,
+    AuthCacheStatsAPIView,
+    DbPoolStatsAPIView,
+    MetricasAPIView,
+    VentasAnaliticaAPIView,
+    MensajeViewSet,
+    ConversacionViewSet,
 )
+from .async_views import con_vistas_async
 
 # ✅ AQUÍ SÍ CREAMOS EL ROUTER
 router = DefaultRouter()
@@ -25,12 +33,21 @@ router.register(r'pedidos', PedidoViewSet, basename='pedido')
 router.register(r'detalles', DetalleViewSet, basename='detalle')
 router.register(r'users', UserPublicViewSet, basename='user-public')
 router.register(r'user-profiles', UserProfileViewSet, basename='user-profile')
+router.register(r'mensajes', MensajeViewSet, basename='mensaje')
+router.register(r'conversaciones', ConversacionViewSet, basename='conversacion')
+
+# En modo ASGI los GET calientes del router los atienden vistas async
+router_urls = con_vistas_async(router.urls) if settings.ASYNC_VIEWS else router.urls
 
 urlpatterns = [
-    path('', include(router.urls)),
+    path('', include(router_urls)),
     path('registro/', RegisterAPIView.as_view(), name='registro'),
     path('login/', LoginAPIView.as_view(), name='login'),
     path('productos/por_categoria/<str:category_id>/', 
          ProductosPorCategoriaAPIView.as_view(), 
          name='productos-por-categoria'),
+    path('internal/auth-cache/', AuthCacheStatsAPIView.as_view(), name='internal-auth-cache'),
+    path('internal/db-pool/', DbPoolStatsAPIView.as_view(), name='internal-db-pool'),
+    path('internal/metricas/', MetricasAPIView.as_view(), name='internal-metricas'),
+    path('analitica/ventas/', VentasAnaliticaAPIView.as_view(), name='analitica-ventas'),
 ]
\ No newline at end of file
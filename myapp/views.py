@@ -1,58 +1,214 @@
 # myapp/views.py (Código Final Corregido)
 
-from rest_framework import viewsets, generics
-from rest_framework.filters import SearchFilter
+from rest_framework import viewsets, generics, mixins, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404 
-
-from .models import Categoria, Producto, Imagen, Pedido, Detalle, UserProfile
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.db.models import Sum
+from rest_framework.exceptions import PermissionDenied, ValidationError
+
+from .models import Categoria, Producto, Imagen, Pedido, Detalle, UserProfile, Mensaje, Conversacion, EstadisticaVendedor
+from .pagination import ProductoCursorPagination, MensajeCursorPagination, ConversacionCursorPagination, PedidoCursorPagination
+from .conversaciones import marcar_leida
+from .pedidos import realizar_pedido
+from .analitica import consultar_ventas
+from .conteo import Conteo, contar, contar_cacheado
+from .cache import CachedResponseMixin
+from .conditional import ConditionalGetMixin
+from .proyeccion import ListadoRapidoMixin
+from .search import ProductoFullTextSearchFilter
+from .bulk import FORMATOS, detectar_formato, importar_productos, exportar_productos, aexportar_productos
 from .serializers import (
+    SparseFieldsMixin,
+    lista_param,
     CategoriaSerializer,
     ProductoReadSerializer,
+    ProductoListSerializer,
     ProductoWriteSerializer,
     ImagenSerializer,
     PedidoReadSerializer,  
+    PedidoListSerializer,
     PedidoWriteSerializer,
     DetalleReadSerializer,
     DetalleWriteSerializer,
     RegisterSerializer,
     UserPublicSerializer,
-    UserProfileSerializer
+    UserProfileSerializer,
+    EstadisticaVendedorSerializer,
+    MensajeSerializer,
+    ConversacionSerializer,
+    CheckoutSerializer,
+    VentasConsultaSerializer,
 )
 from rest_framework.permissions import IsAuthenticated
 
+# ==========================================
+# CARGA ANTICIPADA SEGÚN EL SERIALIZER
+# ==========================================
+class EagerLoadingViewMixin:
+    """Aplica al queryset las relaciones que declara el serializer de la acción.
+
+    Si el serializer es de campos a pedido (SparseFieldsMixin), en los GET se
+    leen ?fields= / ?expand= y se pasan al serializer y a su queryset.
+    """
+
+    def get_campos_pedidos(self, serializer_class):
+        if self.request.method not in ('GET', 'HEAD') or not issubclass(serializer_class, SparseFieldsMixin):
+            return {}
+        params = self.request.query_params
+        return {'campos': lista_param(params, 'fields'), 'expand': lista_param(params, 'expand')}
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer_class = self.get_serializer_class()
+        setup_eager_loading = getattr(serializer_class, 'setup_eager_loading', None)
+        if setup_eager_loading is not None:
+            queryset = setup_eager_loading(queryset, **self.get_campos_pedidos(serializer_class))
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.update(self.get_campos_pedidos(self.get_serializer_class()))
+        return super().get_serializer(*args, **kwargs)
+
+
 # ==========================================
 # 0. VISTA SOLO LECTURA DE USUARIOS (PÚBLICA)
 # ==========================================
 from django.contrib.auth import get_user_model
+from rest_framework.permissions import BasePermission
+
 
-class UserPublicViewSet(viewsets.ReadOnlyModelViewSet):
+class EsElUsuarioOStaff(BasePermission):
+    """Solo el propio usuario (el <pk> de la URL) o el staff."""
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(user and user.is_authenticated and (user.is_staff or str(user.pk) == view.kwargs.get('pk')))
+
+
+class UserPublicViewSet(EagerLoadingViewMixin, viewsets.ReadOnlyModelViewSet):
     queryset = get_user_model().objects.all()
     serializer_class = UserPublicSerializer
+    lookup_value_regex = r'\d+'
+
+    @action(detail=True, methods=['get'], url_path='estadisticas', permission_classes=[EsElUsuarioOStaff])
+    def estadisticas(self, request, pk=None):
+        """
+        GET /api/users/<id>/estadisticas/ - Totales del usuario como vendedor.
+        Una lectura por clave primaria de la tabla que mantiene myapp.estadisticas.
+        Los ingresos son privados: solo los ve el propio vendedor o el staff.
+        """
+        estadistica = EstadisticaVendedor.objects.filter(pk=pk).first()
+        if estadistica is None:
+            # Sin productos ni ventas todavía: ceros (o 404 si el usuario no existe)
+            estadistica = EstadisticaVendedor(id_user=self.get_object().pk)
+        return Response(EstadisticaVendedorSerializer(estadistica).data)
 
 # ==========================================
 # 1. VISTA DE CATEGORÍAS 
 # ==========================================
-class CategoriaViewSet(viewsets.ModelViewSet):
+class CategoriaViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Categoria.objects.all()
     serializer_class = CategoriaSerializer
 
+    # `categoria` es una tabla legacy sin updated_at: el ETag sale del contenido
+    # de la tabla (son pocas filas y solo se leen dos columnas).
+    def get_list_validators(self):
+        filas = Categoria.objects.order_by('pk').values_list('category_id', 'category_name')
+        return repr(list(filas)), None
+
+    def get_object_validators(self):
+        fila = Categoria.objects.filter(pk=self.kwargs['pk']).values_list('category_name', flat=True).first()
+        if fila is None:
+            return None, None
+        return fila, None
+
+    def get_cache_tags(self):
+        if self.action == 'retrieve':
+            return [f"categoria:{self.kwargs['pk']}"]
+        return ['categorias']
+
 # ==========================
 # 2. VISTA DE PRODUCTOS (CORRECCIÓN FINAL DE BÚSQUEDA)
 # ==========================
-class ProductoViewSet(viewsets.ModelViewSet):
-    queryset = Producto.objects.all()
-    
-    filter_backends = [SearchFilter] 
+class ProductoViewSet(ConditionalGetMixin, CachedResponseMixin, ListadoRapidoMixin, EagerLoadingViewMixin, viewsets.ModelViewSet):
+    # search_vector solo se usa para filtrar: no hace falta leerlo
+    queryset = Producto.objects.defer('search_vector')
+    pagination_class = ProductoCursorPagination
     
-
-    # 3. Define la búsqueda de texto SOLO en el nombre del producto
-    search_fields = ['product_name']
+    # 3. Búsqueda de texto completo (?search=) en nombre y descripción,
+    # ordenada por relevancia y con facetas por categoría
+    filter_backends = [ProductoFullTextSearchFilter] 
+    search_facets = None
+    version_listado = 'productos'
     
     def get_serializer_class(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action == 'list':
+            return ProductoListSerializer
+        if self.action == 'retrieve':
             return ProductoReadSerializer
         return ProductoWriteSerializer
+
+    def get_conteo(self, queryset):
+        if self.search_facets is not None:
+            # Con búsqueda el total es la suma de las facetas, que igual se calculan
+            self.facetas = list(self.search_facets)
+            return Conteo(sum(faceta['count'] for faceta in self.facetas), True)
+        # Sin filtros, la estimación de PostgreSQL (reltuples) en vez de un
+        # COUNT cacheado: lo invalidaría cada alta o baja del catálogo
+        return contar(queryset)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.search_facets is not None:
+            facetas = getattr(self, 'facetas', None)
+            response.data['facets'] = facetas if facetas is not None else list(self.search_facets)
+        return response
+
+    @action(detail=False, methods=['post'], url_path='importar')
+    def importar(self, request):
+        """POST /api/productos/importar/ con `archivo` (CSV o NDJSON)."""
+        archivo = request.FILES.get('archivo')
+        if archivo is None:
+            return Response({"error": "Se requiere el campo 'archivo'."}, status=status.HTTP_400_BAD_REQUEST)
+        formato = detectar_formato(archivo.name, request.query_params.get('formato') or request.data.get('formato'))
+        if formato not in FORMATOS:
+            return Response({"error": "Formato no soportado: usa csv o ndjson."}, status=status.HTTP_400_BAD_REQUEST)
+
+        resultado = importar_productos(archivo, formato)
+        if resultado['creados']:
+            codigo = status.HTTP_201_CREATED
+        elif resultado['errores']:
+            codigo = status.HTTP_400_BAD_REQUEST
+        else:
+            codigo = status.HTTP_200_OK
+        return Response(resultado, status=codigo)
+
+    @action(detail=False, methods=['get'], url_path='exportar')
+    def exportar(self, request):
+        """GET /api/productos/exportar/?formato=csv|ndjson[&category=ID]"""
+        formato = request.query_params.get('formato', 'csv').lower()
+        if formato not in FORMATOS:
+            return Response({"error": "Formato no soportado: usa csv o ndjson."}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = Producto.objects.all()
+        if request.query_params.get('category'):
+            queryset = queryset.filter(category_id=request.query_params['category'])
+
+        # Bajo ASGI el generador tiene que ser async para no juntar todo el catálogo en memoria
+        exportar = aexportar_productos if isinstance(request._request, ASGIRequest) else exportar_productos
+        content_type = 'text/csv' if formato == 'csv' else 'application/x-ndjson'
+        response = StreamingHttpResponse(exportar(queryset, formato), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="productos.{formato}"'
+        return response
+
+    def get_cache_tags(self):
+        # El producto incluye su categoría anidada
+        if self.action == 'retrieve':
+            return [f"producto:{self.kwargs['pk']}", 'categorias']
+        return ['productos', 'categorias']
     
 # ==========================
 # 3. VISTA DE IMAGENES
@@ -64,18 +220,52 @@ class ImagenViewSet(viewsets.ModelViewSet):
 # ==========================
 # 4. VISTA DE PEDIDOS
 # ==========================
-class PedidoViewSet(viewsets.ModelViewSet):
+class PedidoViewSet(ListadoRapidoMixin, EagerLoadingViewMixin, viewsets.ModelViewSet):
     queryset = Pedido.objects.all()
+    pagination_class = PedidoCursorPagination
 
     def get_serializer_class(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action == 'list':
+            return PedidoListSerializer
+        if self.action == 'retrieve':
             return PedidoReadSerializer 
+        if self.action == 'checkout':
+            return CheckoutSerializer
         return PedidoWriteSerializer
 
+    @action(detail=False, methods=['post'], url_path='checkout', permission_classes=[IsAuthenticated])
+    def checkout(self, request):
+        """
+        Crea pedido y detalles en una sola petición y transacción.
+        Header obligatorio: Idempotency-Key (el reintento devuelve el mismo pedido).
+        Body: {"items": [{"producto": "<product_id>", "cantidad": 2}, ...], "comentario": "..."}
+        """
+        clave = request.headers.get('Idempotency-Key', '').strip()
+        if not clave or len(clave) > 255:
+            return Response(
+                {'detail': 'Falta el header Idempotency-Key (máx. 255 caracteres).'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        pedido, creado = realizar_pedido(
+            request.user, clave,
+            serializer.validated_data['items'],
+            serializer.validated_data.get('comentario'),
+        )
+        pedido = PedidoReadSerializer.setup_eager_loading(Pedido.objects.filter(pk=pedido.pk)).get()
+        respuesta = Response(
+            PedidoReadSerializer(pedido, context=self.get_serializer_context()).data,
+            status=status.HTTP_201_CREATED if creado else status.HTTP_200_OK,
+        )
+        if not creado:
+            respuesta['Idempotent-Replayed'] = 'true'
+        return respuesta
+
 # ==========================
 # 5. VISTA DE DETALLES
 # ==========================
-class DetalleViewSet(viewsets.ModelViewSet):
+class DetalleViewSet(EagerLoadingViewMixin, viewsets.ModelViewSet):
     queryset = Detalle.objects.all()
 
     def get_serializer_class(self):
@@ -87,12 +277,14 @@ class DetalleViewSet(viewsets.ModelViewSet):
     # ==========================
 # 6. NUEVA VISTA: FILTRADO POR CATEGORÍA
 # ==========================
-class ProductosPorCategoriaAPIView(generics.ListAPIView):
+class ProductosPorCategoriaAPIView(ConditionalGetMixin, CachedResponseMixin, ListadoRapidoMixin, EagerLoadingViewMixin, generics.ListAPIView):
     """
     Devuelve la lista de productos filtrados por una Category ID específica.
     Ruta de ejemplo: /api/productos/por_categoria/ID_DE_CATEGORIA/
     """
-    serializer_class = ProductoReadSerializer
+    queryset = Producto.objects.defer('search_vector')
+    serializer_class = ProductoListSerializer
+    pagination_class = ProductoCursorPagination
 
     def get_queryset(self):
         # 1. Obtiene el ID de la categoría de la URL
@@ -100,22 +292,123 @@ class ProductosPorCategoriaAPIView(generics.ListAPIView):
         
         # 2. Filtra la tabla de Productos donde la clave foránea coincida
         # Esto evita que choquen los filtros de DRF y usa la consulta directa de Django
-        queryset = Producto.objects.filter(category__category_id=category_id)
+        # (super() ya trae category e imagenes_extra cargados por el serializer)
+        queryset = super().get_queryset().filter(category__category_id=category_id)
         
         return queryset
 
+    def get_version_listado(self):
+        return f"categoria:{self.kwargs['category_id']}"
+
+    def get_conteo(self, queryset):
+        # Exacto y cacheado (si el cache es compartido): las señales de Producto lo invalidan
+        return contar_cacheado(f"categoria:{self.kwargs['category_id']}", queryset)
+
+    def get_cache_tags(self):
+        return [f"categoria-productos:{self.kwargs['category_id']}", 'categorias']
+
+
+# ==========================================
+# 6.1 VISTA DE MENSAJES (CHAT)
+# ==========================================
+class MensajeViewSet(mixins.ListModelMixin, mixins.CreateModelMixin, viewsets.GenericViewSet):
+    """Historial y envío de mensajes del chat.
+
+    GET  /api/mensajes/?vendedor=ID&cliente_id=ID[&producto=ID] - historial paginado por cursor
+    POST /api/mensajes/ - crea el mensaje; se empuja por WebSocket (/ws/chat/) a ambos lados
+
+    Como en el WebSocket (myapp.chat): un cliente solo ve y escribe sus propias
+    conversaciones (`cliente_id` = su usuario); el lado vendedor es para staff.
+    """
+    queryset = Mensaje.objects.all()
+    serializer_class = MensajeSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = MensajeCursorPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['vendedor', 'cliente_id', 'producto']
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.user.is_staff:
+            return queryset
+        return queryset.filter(cliente_id=self.request.user.pk)
+
+    def perform_create(self, serializer):
+        if self.request.user.is_staff:
+            serializer.save()
+        else:
+            serializer.save(cliente_id=self.request.user.pk, es_vendedor=False)
+
+    def get_conteo(self, queryset):
+        # El historial de un vendedor con un cliente: el total ya está en la bandeja
+        # (los filtros ya pasaron por django-filter, así que son válidos)
+        filtros = {campo: self.request.query_params.get(campo) for campo in self.filterset_fields}
+        if not self.request.user.is_staff:
+            if filtros['cliente_id'] not in (None, str(self.request.user.pk)):
+                return contar(queryset)  # otro cliente: el queryset ya está vacío
+            filtros['cliente_id'] = self.request.user.pk
+        if not (filtros['vendedor'] and filtros['cliente_id']):
+            return contar(queryset)
+        conversaciones = Conversacion.objects.filter(vendedor_id=filtros['vendedor'], cliente_id=filtros['cliente_id'])
+        if filtros['producto']:
+            conversaciones = conversaciones.filter(producto_id=filtros['producto'])
+        return Conteo(conversaciones.aggregate(total=Sum('total_mensajes'))['total'] or 0, True)
+
+
+class ConversacionViewSet(viewsets.ReadOnlyModelViewSet):
+    """Bandeja de entrada a partir de los resúmenes precalculados.
+
+    GET  /api/conversaciones/  - las del usuario como cliente; staff indica
+         ?vendedor=ID o ?cliente_id=ID. Una página cuesta lo mismo sin importar
+         cuántos mensajes haya (índices por lado + ultima_fecha)
+    POST /api/conversaciones/{id}/leer/ {"lado": "cliente" | "vendedor"}
+
+    Mismo alcance que MensajeViewSet: el lado vendedor es solo para staff.
+    """
+    queryset = Conversacion.objects.all()
+    serializer_class = ConversacionSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = ConversacionCursorPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['vendedor', 'cliente_id', 'producto']
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.user.is_staff:
+            return queryset
+        return queryset.filter(cliente_id=self.request.user.pk)
+
+    def list(self, request, *args, **kwargs):
+        if request.user.is_staff and not ({'vendedor', 'cliente_id'} & set(request.query_params)):
+            raise ValidationError({'detail': 'Indique cliente_id o vendedor.'})
+        return super().list(request, *args, **kwargs)
+
+    @action(detail=True, methods=['post'], url_path='leer')
+    def leer(self, request, pk=None):
+        lado = request.data.get('lado')
+        if lado not in ('cliente', 'vendedor'):
+            raise ValidationError({'lado': 'Debe ser "cliente" o "vendedor".'})
+        conversacion = self.get_object()
+        if lado == 'vendedor' and not request.user.is_staff:
+            raise PermissionDenied('Solo el staff marca como leído el lado vendedor.')
+        if lado == 'cliente' and conversacion.cliente_id != request.user.pk:
+            raise PermissionDenied('Solo el cliente marca como leída su conversación.')
+        marcar_leida(conversacion, lado)
+        return Response(self.get_serializer(conversacion).data)
+
 
 # ==========================================
 # 7. VISTA PARA REGISTRO DE USUARIOS
 # ==========================================
 from rest_framework.views import APIView
-from rest_framework.response import Response
-from rest_framework import status
 from rest_framework.permissions import AllowAny
 import logging
 from django.contrib.auth import get_user_model
 from django.contrib.auth import authenticate
 from rest_framework.authtoken.models import Token
+from django.db.models import Case, Q, When
+from django.db.models.functions import Lower
+from .throttling import LoginIPThrottle, LoginAccountThrottle
 
 
 class RegisterAPIView(APIView):
@@ -129,11 +422,16 @@ class RegisterAPIView(APIView):
         logging.getLogger('django.request').info(f"Registro request headers: {dict(request.headers)} from {request.META.get('REMOTE_ADDR')}")
         serializer = RegisterSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
-            return Response({"message": "Usuario creado correctamente."}, status=status.HTTP_201_CREATED)
+            try:
+                serializer.save()
+                return Response({"message": "Usuario creado correctamente."}, status=status.HTTP_201_CREATED)
+            except ValidationError as exc:
+                # El correo se registró en paralelo (se vuelve a comprobar con lock)
+                errors = exc.detail
+        else:
+            errors = serializer.errors
 
         # Normalizar errores a un único campo 'error' (el frontend actual lo espera así)
-        errors = serializer.errors
         error_text = ''
         if isinstance(errors, dict):
             first = next(iter(errors.values()))
@@ -156,28 +454,41 @@ class LoginAPIView(APIView):
     Devuelve token en caso de credenciales válidas y un mensaje de error en caso contrario.
     """
     permission_classes = [AllowAny]
+    throttle_classes = [LoginIPThrottle, LoginAccountThrottle]
 
     def post(self, request, *args, **kwargs):
-        logging.getLogger('django.request').info(f"Login request headers: {dict(request.headers)} from {request.META.get('REMOTE_ADDR')}; body: {request.data}")
-        data = request.data
+        # Nunca registrar el cuerpo: trae la contraseña en texto plano
+        logging.getLogger('django.request').debug(f"Login request from {request.META.get('REMOTE_ADDR')}")
+        # Un cuerpo JSON puede ser una lista o traer números/objetos en vez de texto
+        data = request.data if isinstance(request.data, dict) else {}
         user_input = data.get('user') or data.get('username')
         password = data.get('password')
 
         if not user_input or not password:
             return Response({"error": "Se requieren usuario y contraseña."}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(user_input, str) or not isinstance(password, str):
+            return Response({"error": "Usuario y contraseña deben ser texto."}, status=status.HTTP_400_BAD_REQUEST)
 
+        # Una sola consulta por email o username (índices sobre lower(), migración
+        # 0007), trayendo el token con el mismo JOIN. Si coinciden usuarios
+        # distintos gana el email, como antes.
         User = get_user_model()
-        # Intentar primero por email
-        user = User.objects.filter(email__iexact=user_input).first()
-        if not user:
-            # Intentar por username
-            user = User.objects.filter(username__iexact=user_input).first()
+        user_input = user_input.strip().lower()
+        por_email = Q(email_lower=user_input)
+        user = (
+            User.objects.select_related('auth_token')
+            .alias(email_lower=Lower('email'), username_lower=Lower('username'))
+            .filter(por_email | Q(username_lower=user_input))
+            .order_by(Case(When(por_email, then=0), default=1), 'pk')
+            .first()
+        )
 
         if not user or not user.check_password(password):
             return Response({"error": "Credenciales inválidas. Por favor verifica tu usuario/contraseña."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            token, _ = Token.objects.get_or_create(user=user)
+            # Solo se escribe la primera vez; luego el token ya vino en el JOIN
+            token = getattr(user, 'auth_token', None) or Token.objects.create(user=user)
             token_key = token.key
         except Exception:
             # Si la tabla de tokens no existe (migrations pendientes), devolver sin token
@@ -202,9 +513,6 @@ class LoginAPIView(APIView):
 # ==========================================
 # 9. VISTA DE PERFIL DE USUARIO
 # ==========================================
-from rest_framework.decorators import action
-from rest_framework.response import Response
-
 class UserProfileViewSet(viewsets.ViewSet):
     """ViewSet para gestionar el perfil del usuario autenticado.
     
@@ -235,4 +543,84 @@ class UserProfileViewSet(viewsets.ViewSet):
                 serializer.save(user=request.user)
                 return Response(serializer.data, status=status.HTTP_200_OK)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
\ No newline at end of file
+    
+
+# ==========================================
+# 10. VISTAS INTERNAS (solo staff)
+# ==========================================
+from django.db import connections
+from rest_framework.permissions import IsAdminUser
+from rest_framework.renderers import JSONRenderer
+from .auth_cache import get_user_cache
+from .metricas import PrometheusRenderer, get_registro
+
+
+class AuthCacheStatsAPIView(APIView):
+    """GET /api/internal/auth-cache/ - Aciertos/fallos del cache de usuarios de este proceso."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_user_cache().stats())
+
+
+
+class DbPoolStatsAPIView(APIView):
+    """GET /api/internal/db-pool/ - Estado del pool de conexiones de cada base (este proceso)."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({alias: estadisticas_pool(connections[alias]) for alias in connections})
+
+
+class MetricasAPIView(APIView):
+    """GET /api/internal/metricas/ - Histogramas por vista de este proceso (MetricasMiddleware).
+
+    JSON con percentiles de los últimos minutos; `?format=prometheus` para scrapear.
+    """
+    permission_classes = [IsAdminUser]
+    renderer_classes = [JSONRenderer, PrometheusRenderer]
+
+    def get(self, request):
+        return Response(get_registro().resumen())
+
+
+def estadisticas_pool(connection):
+    pool = getattr(connection, 'pool', None)
+    if pool is None:
+        return {'pool': False}
+    stats = pool.get_stats()
+    peticiones = stats.get('requests_num', 0)
+    return {
+        'pool': True,
+        'tamano': stats.get('pool_size', 0),
+        'min': stats.get('pool_min', 0),
+        'max': stats.get('pool_max', 0),
+        'en_uso': stats.get('pool_size', 0) - stats.get('pool_available', 0),
+        'disponibles': stats.get('pool_available', 0),
+        'esperando': stats.get('requests_waiting', 0),
+        'peticiones': peticiones,
+        'peticiones_en_cola': stats.get('requests_queued', 0),
+        'espera_ms_total': stats.get('requests_wait_ms', 0),
+        'espera_ms_promedio': round(stats.get('requests_wait_ms', 0) / peticiones, 2) if peticiones else 0,
+        'errores_timeout': stats.get('requests_errors', 0),
+        'conexiones_creadas': stats.get('connections_num', 0),
+        'conexiones_perdidas': stats.get('connections_lost', 0),
+        'devueltas_en_mal_estado': stats.get('returns_bad', 0),
+    }
+
+
+# ==========================================
+# 11. ANALÍTICA DE VENTAS (solo staff)
+# ==========================================
+class VentasAnaliticaAPIView(APIView):
+    """
+    GET /api/analitica/ventas/?desde=2026-01-01&hasta=2026-03-31&agrupar=dia|categoria|vendedor
+    Filtros opcionales: categoria=<category_id>, vendedor=<id_user>.
+    Responde desde las tablas de ventas diarias (myapp.analitica), sin recorrer pedidos.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        parametros = VentasConsultaSerializer(data=request.query_params)
+        parametros.is_valid(raise_exception=True)
+        return Response(consultar_ventas(**parametros.validated_data))